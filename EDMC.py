@@ -13,6 +13,7 @@ import json
 import os
 import queue
 import sys
+from datetime import datetime, timezone
 from time import sleep, time
 from typing import TYPE_CHECKING, Any
 from common_utils import log_locale, SERVER_RETRY
@@ -147,6 +148,11 @@ def main() -> None:  # noqa: C901, CCR001
         parser.add_argument('-s', metavar='FILE', help='write station shipyard data to FILE in CSV format')
         parser.add_argument('-t', metavar='FILE', help='write player status to FILE in CSV format')
         parser.add_argument('-d', metavar='FILE', help='write raw JSON data to FILE')
+        parser.add_argument(
+            '--capi-history-at', metavar='TIME',
+            help='with -d, write the stored raw CAPI responses as they were at TIME (ISO 8601, UTC if no offset) '
+                 'instead of querying Frontier'
+        )
         parser.add_argument('-n', action='store_true', help='send data to EDDN')
         parser.add_argument('-p', metavar='CMDR', help='Returns data from the specified player account')
         parser.add_argument('-j', help=argparse.SUPPRESS)  # Import JSON dump
@@ -218,6 +224,27 @@ def main() -> None:  # noqa: C901, CCR001
                 except AttributeError:
                     logger.debug(f"Unable to refresh CMDR {cmdr}.")
 
+        if args.capi_history_at:
+            if not args.d:
+                print('--capi-history-at requires -d', file=sys.stderr)
+                sys.exit(EXIT_ARGS)
+
+            try:
+                when = datetime.fromisoformat(args.capi_history_at)
+
+            except ValueError:
+                print(f'Invalid --capi-history-at time: {args.capi_history_at}', file=sys.stderr)
+                sys.exit(EXIT_ARGS)
+
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+
+            logger.debug(f'Writing raw CAPI data as of {when} to "{args.d}"')
+            with open(args.d, 'wb') as f:
+                f.write(str(companion.session.capi_raw_data.as_of(when)).encode('utf-8'))
+
+            sys.exit(EXIT_SUCCESS)
+
         if args.j:
             logger.debug('Import and collate from JSON dump')
             # Import and collate from JSON dump
@@ -7,6 +7,7 @@ Licensed under the GNU General Public License v2 or later.
 See LICENSE file.
 """
 import argparse
+import json
 import locale
 import webbrowser
 import platform
@@ -98,6 +99,50 @@ def get_sys_report(active_config: config.Config) -> str:
     report += f"- Game Build: {monitor.state['GameBuild']}\n"
     report += f"- Using Odyssey: {monitor.state['Odyssey']}\n"
     report += f"- Journal Dir Lockable: {lockable}\n"
+    report += get_plugin_timings_report(active_config)
+    return report
+
+
+def get_plugin_timings_report(active_config: config.Config, limit: int = 10) -> str:
+    """
+    Summarise the plugin callback timings last dumped by EDMC.
+
+    :param active_config: The config, to find the app directory.
+    :param limit: Maximum number of plugin hooks to list, slowest first.
+    :return: The report section, or an empty string if no timings are available.
+    """
+    # NB: Must match plug.TIMINGS_FILENAME.  Not imported from there to keep this tool light.
+    timings_path = active_config.app_dir_path / "plugin_timings.json"
+    try:
+        with open(timings_path, encoding="utf-8") as timings_file:
+            timings = json.load(timings_file)
+
+    except (OSError, ValueError):
+        return ""
+
+    rows = [
+        (plugin, hook, stats)
+        for plugin, hooks in timings.get("plugins", {}).items()
+        for hook, stats in hooks.items()
+    ]
+    rows.sort(key=lambda row: row[2]["total_ms"], reverse=True)
+
+    report = f"\nPlugin Callback Timings (as of {timings.get('timestamp')}):\n"
+    if not rows:
+        return report + "- No plugin callbacks recorded\n"
+
+    for plugin, hook, stats in rows[:limit]:
+        report += (
+            f"- {plugin} {hook}(): {stats['calls']} calls, mean {stats['mean_ms']:.1f}ms, "
+            f"max {stats['max_ms']:.1f}ms, {stats['slow']} over {timings.get('slow_threshold_ms')}ms\n"
+        )
+
+    for plugin, stats in timings.get("workers", {}).items():
+        report += (
+            f"- {plugin} worker: {stats['delivered']} delivered, {stats['overflows']} dropped, "
+            f"mean latency {stats['mean_latency_ms']:.1f}ms, max {stats['max_latency_ms']:.1f}ms\n"
+        )
+
     return report
 
 
@@ -190,6 +235,11 @@ if __name__ == "__main__":
         help="write the system information to the console",
         action="store_true",
     )
+    parser.add_argument(
+        "--plugin-timings-json",
+        help="write the full plugin callback timings, as last dumped by EDMC, to the console as JSON",
+        action="store_true",
+    )
     args = parser.parse_args()
 
     # Suppress Logger
@@ -199,6 +249,15 @@ if __name__ == "__main__":
         sys.stderr._error = "inhibit log creation"  # type: ignore
 
     cur_config = config.get_config()
+    if args.plugin_timings_json:
+        try:
+            print((cur_config.app_dir_path / "plugin_timings.json").read_text(encoding="utf-8"))
+
+        except OSError:
+            print("{}")
+
+        sys.exit(0)
+
     if args.out_console:
         sys_report = get_sys_report(cur_config)
         print(sys_report)
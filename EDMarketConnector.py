@@ -24,6 +24,11 @@ from os import chdir, environ
 from time import localtime, strftime, time
 from typing import TYPE_CHECKING, Any, Literal, MutableMapping
 from constants import applongname, appname, protocolhandler_redirect
+from startup_profiler import PROFILE_FILENAME, profiler
+
+# Start as early as possible so the import tree covers everything loaded after this.
+if __name__ == '__main__' and '--profile-startup' in sys.argv:
+    profiler.start()
 
 # Have this as early as possible for people running EDMarketConnector.exe
 # from cmd.exe or a bat file or similar.  Else they might not be in the correct
@@ -67,10 +72,11 @@ from config import appversion, appversion_nobuild, config, copyright
 
 from EDMCLogging import edmclogger, logger, logging
 from journal_lock import JournalLock, JournalLockResult
-from update import check_for_datafile_updates, check_for_fdev_updates
 from common_utils import log_locale, SERVER_RETRY
 
 if __name__ == '__main__':  # noqa: C901
+    profiler.mark('config load')
+
     # Command-line arguments
     parser = argparse.ArgumentParser(
         prog=appname,
@@ -208,6 +214,12 @@ if __name__ == '__main__':  # noqa: C901
         help='Allows EDMC to continue even if journal lock could not be acquired',
         action='store_true',
     )
+
+    parser.add_argument(
+        '--profile-startup',
+        help='Time each startup phase and write them, and an import time tree, to startup_profile.txt',
+        action='store_true',
+    )
     ###########################################################################
 
     args: argparse.Namespace = parser.parse_args()
@@ -263,13 +275,15 @@ if __name__ == '__main__':  # noqa: C901
     if args.debug_sender and len(args.debug_sender) > 0:
         import config as conf_module
         import debug_webserver
-        from edmc_data import DEBUG_WEBSERVER_HOST, DEBUG_WEBSERVER_PORT
+        from edmc_data import CAPI_HISTORY_DIRNAME, DEBUG_WEBSERVER_HOST, DEBUG_WEBSERVER_PORT
 
         conf_module.debug_senders = [x.casefold() for x in args.debug_sender]  # duplicate the list just in case
         for d in conf_module.debug_senders:
             logger.info(f'marked {d} for debug')
 
-        debug_webserver.run_listener(DEBUG_WEBSERVER_HOST, DEBUG_WEBSERVER_PORT)
+        debug_webserver.run_listener(
+            DEBUG_WEBSERVER_HOST, DEBUG_WEBSERVER_PORT, config.app_dir_path / CAPI_HISTORY_DIRNAME
+        )
 
     if args.trace_on and len(args.trace_on) > 0:
         import config as conf_module
@@ -416,6 +430,8 @@ if __name__ == '__main__':  # noqa: C901
             if git_branch == "develop" or (git_branch is not None and '-alpha0' in str(appversion())):
                 print("You're running in a DEVELOPMENT branch build. You might encounter bugs!")
 
+    profiler.mark('startup checks')
+
 
 # See EDMCLogging.py docs.
 # isort: off
@@ -434,9 +450,7 @@ import tkinter.messagebox
 from tkinter import ttk
 import commodity
 import plug
-import prefs
 import protocol
-import stats
 import td
 from dashboard import dashboard
 from edmc_data import ship_name_map
@@ -446,6 +460,8 @@ from monitor import monitor
 from theme import theme
 from ttkHyperlinkLabel import HyperlinkLabel, SHIPYARD_HTML_TEMPLATE
 
+profiler.mark('imports')
+
 
 def _config_plugins(frame: tk.Frame, ui_row: int) -> tk.Frame:
     for idx, plugin in enumerate(plug.PLUGINS, start=1):
@@ -501,6 +517,71 @@ def help_releases() -> None:
     webbrowser.open('https://github.com/EDCD/EDMarketConnector/releases')
 
 
+# prefs, and the plugin browser and PIL behind it, aren't needed until a dialog
+# is opened, so they're imported on first use rather than at startup.
+def open_log_folder(logfile_loc: pathlib.Path) -> None:
+    """Open the log folder in the system file browser."""
+    import prefs
+    prefs.open_folder(logfile_loc)
+
+
+def open_system_profiler(parent: AppWindow) -> None:
+    """Run the System Profiler."""
+    import prefs
+    prefs.help_open_system_profiler(parent)
+
+
+class DisplayedState:
+    """
+    Main window widget options as last set, so that unchanged values aren't sent to Tk again.
+
+    Everything setting an option tracked here must go through `configure()`,
+    else the record goes stale and a later change back to the recorded
+    value would be skipped.
+    """
+
+    def __init__(self, root: tk.Tk) -> None:
+        self.root = root
+        self.shown: dict[tuple[str, str | int, str], Any] = {}
+        self.redraw_pending = False
+
+    def _changed(self, target: str, index: str | int, options: dict[str, Any]) -> dict[str, Any]:
+        changed = {}
+        for option, value in options.items():
+            key = (target, index, option)
+            if key not in self.shown or self.shown[key] != value:
+                self.shown[key] = value
+                changed[option] = value
+
+        return changed
+
+    def configure(self, widget: tk.Misc, **options: Any) -> None:
+        """Set options on a widget, if they differ from what it already has."""
+        if changed := self._changed(str(widget), '', options):
+            widget.configure(**changed)  # type: ignore
+            self.schedule_redraw()
+
+    def entryconfigure(self, menu: tk.Menu, index: str | int, **options: Any) -> None:
+        """Set options on a menu entry, if they differ from what it already has."""
+        if changed := self._changed(str(menu), index, options):
+            menu.entryconfigure(index, **changed)
+            self.schedule_redraw()
+
+    def get(self, widget: tk.Misc, option: str, default: Any = None) -> Any:
+        """Get an option as last set, without asking Tk."""
+        return self.shown.get((str(widget), '', option), default)
+
+    def schedule_redraw(self) -> None:
+        """Have Tk redraw once it's idle, however many changes are made before then."""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after_idle(self._redraw)
+
+    def _redraw(self) -> None:
+        self.redraw_pending = False
+        self.root.update_idletasks()
+
+
 class AppWindow:
     """Define the main application window."""
 
@@ -521,6 +602,7 @@ class AppWindow:
         self.capi_fleetcarrier_query_holdoff_time = fleetcarrier_time + companion.capi_fleetcarrier_query_cooldown
 
         self.w = master
+        self.display = DisplayedState(self.w)
         self.w.title(applongname)
         self.minimizing = False
         self.w.rowconfigure(0, weight=1)
@@ -542,14 +624,16 @@ class AppWindow:
                 ("Open", None, open_window),
                 ("Report a Bug", None, help_report_a_bug),
                 ("About EDMC", None, lambda: not self.HelpAbout.showing and self.HelpAbout(self.w)),
-                ("Open Log Folder", None, lambda: prefs.open_folder(logfile_loc)),
-                ("Open System Profiler", None, lambda: prefs.help_open_system_profiler(self)),
+                ("Open Log Folder", None, lambda: open_log_folder(logfile_loc)),
+                ("Open System Profiler", None, lambda: open_system_profiler(self)),
             )
             # Method associated with on_quit is called whenever the systray is closing
             self.systray = SysTrayIcon("EDMarketConnector.ico", applongname, menu_options, on_quit=self.exit_tray)
             self.systray.start()
 
+        profiler.mark('window setup')
         plug.load_plugins(master)
+        profiler.mark('plugin load')
 
         if sys.platform == 'win32':
             self.w.wm_iconbitmap(default='EDMarketConnector.ico')
@@ -651,6 +735,8 @@ class AppWindow:
         if getattr(sys, 'frozen', False):
             # Running in frozen .exe, so use (Win)Sparkle
             self.updater = update.Updater(tkroot=self.w, provider='external')
+            # (Win)Sparkle doesn't know about our data files, so check those ourselves
+            self.w.after(1500, self.updater.refresh_datafiles)
 
         else:
             self.updater = update.Updater(tkroot=self.w)
@@ -658,9 +744,9 @@ class AppWindow:
             self.w.after(1500, self.updater.start_check_thread)
 
         self.file_menu = self.view_menu = tk.Menu(self.menubar, tearoff=tk.FALSE)
-        self.file_menu.add_command(command=lambda: stats.StatsDialog(self.w, self.status))
+        self.file_menu.add_command(command=self.show_stats)
         self.file_menu.add_command(command=self.save_raw)
-        self.file_menu.add_command(command=lambda: prefs.PreferencesDialog(self.w, self.postprefs))
+        self.file_menu.add_command(command=self.show_prefs)
         self.file_menu.add_separator()
         self.file_menu.add_command(command=self.onexit)
         self.menubar.add_cascade(menu=self.file_menu)
@@ -677,8 +763,8 @@ class AppWindow:
         # About E:D Market Connector
         self.help_menu.add_command(command=lambda: not self.HelpAbout.showing and self.HelpAbout(self.w))
         logfile_loc = pathlib.Path(config.app_dir_path / 'logs')
-        self.help_menu.add_command(command=lambda: prefs.open_folder(logfile_loc))  # Open Log Folder
-        self.help_menu.add_command(command=lambda: prefs.help_open_system_profiler(self))  # Open System Profiler
+        self.help_menu.add_command(command=lambda: open_log_folder(logfile_loc))  # Open Log Folder
+        self.help_menu.add_command(command=lambda: open_system_profiler(self))  # Open System Profiler
 
         self.menubar.add_cascade(menu=self.help_menu)
         if sys.platform == 'win32':
@@ -789,6 +875,7 @@ class AppWindow:
         self.w.bind_all('<<PluginError>>', self.plugin_error)  # Statusbar
         self.w.bind_all('<<CompanionAuthEvent>>', self.auth)  # cAPI auth
         self.w.bind_all('<<Quit>>', self.onexit)  # Updater
+        self.w.bind_all('<<DatafilesUpdated>>', self.datafiles_updated)  # Updater
 
         # Check for Valid Providers
         validate_providers()
@@ -870,26 +957,28 @@ class AppWindow:
         """Update the suit text for current type and loadout."""
         if not monitor.state['Odyssey']:
             # Odyssey not detected, no text should be set so it will hide
-            self.suit['text'] = ''
+            self.display.configure(self.suit, text='')
             return
 
         suit = monitor.state.get('SuitCurrent')
         if suit is None:
-            self.suit['text'] = f'<{tr.tl("Unknown")}>'  # LANG: Unknown suit
+            self.display.configure(self.suit, text=f'<{tr.tl("Unknown")}>')  # LANG: Unknown suit
             return
 
         suitname = suit['edmcName']
         suitloadout = monitor.state.get('SuitLoadoutCurrent')
         if suitloadout is None:
-            self.suit['text'] = ''
+            self.display.configure(self.suit, text='')
             return
 
         loadout_name = suitloadout['name']
-        self.suit['text'] = f'{suitname} ({loadout_name})'
+        self.display.configure(self.suit, text=f'{suitname} ({loadout_name})')
 
     def suit_show_if_set(self) -> None:
         """Show UI Suit row if we have data, else hide."""
-        self.toggle_suit_row(self.suit['text'] != '')
+        visible = self.display.get(self.suit, 'text', '') != ''
+        if visible != self.suit_shown:
+            self.toggle_suit_row(visible)
 
     def toggle_suit_row(self, visible: bool | None = None) -> None:
         """
@@ -912,13 +1001,23 @@ class AppWindow:
             self.suit.grid_forget()
             self.suit_shown = False
 
+    def show_prefs(self) -> None:
+        """Open the Preferences dialog."""
+        import prefs
+        prefs.PreferencesDialog(self.w, self.postprefs)
+
+    def show_stats(self) -> None:
+        """Open the Status dialog."""
+        import stats
+        stats.StatsDialog(self.w, self.status)
+
     def postprefs(self, dologin: bool = True, **postargs):
         """Perform necessary actions after the Preferences dialog is applied."""
         self.prefsdialog = None
         self.set_labels()  # in case language has changed
 
         # Reset links in case plugins changed them
-        self.ship.configure(url=self.shipyard_url)
+        self.display.configure(self.ship, url=self.shipyard_url)
         self.system.configure(url=self.system_url)
         self.station.configure(url=self.station_url)
 
@@ -975,7 +1074,9 @@ class AppWindow:
         """Set main window labels, e.g. after language change."""
         self.cmdr_label['text'] = tr.tl('Cmdr') + ':'  # LANG: Label for commander name in main window
         # LANG: 'Ship' or multi-crew role label in main window, as applicable
-        self.ship_label['text'] = (monitor.state['Captain'] and tr.tl('Role') or tr.tl('Ship')) + ':'  # Main window
+        self.display.configure(  # Main window
+            self.ship_label, text=(monitor.state['Captain'] and tr.tl('Role') or tr.tl('Ship')) + ':'
+        )
         self.suit_label['text'] = tr.tl('Suit') + ':'  # LANG: Label for 'Suit' line in main UI
         self.system_label['text'] = tr.tl('System') + ':'  # LANG: Label for 'System' line in main UI
         self.station_label['text'] = tr.tl('Station') + ':'  # LANG: Label for 'Station' line in main UI
@@ -1256,6 +1357,7 @@ class AppWindow:
         logger.trace_if('capi.worker', 'Handling response')
         play_bad: bool = False
         err: str | None = None
+        capi_data_ok = False  # Passed validation, so can be served again from the CAPI cache
 
         capi_response: companion.EDMCCAPIFailedRequest | companion.EDMCCAPIResponse
         try:
@@ -1286,6 +1388,7 @@ class AppWindow:
                     err = self.status['text'] = tr.tl("CAPI: Fleet Carrier data incomplete")  # Shouldn't happen
 
                 else:
+                    capi_data_ok = True
                     if __debug__:  # Recording
                         companion.session.dump_capi_data(capi_response.capi_data)
 
@@ -1380,24 +1483,25 @@ class AppWindow:
                 raise companion.ServerLagging()
 
             else:
+                capi_data_ok = True
                 # TODO: Change to depend on its own CL arg
                 if __debug__:  # Recording
                     companion.session.dump_capi_data(capi_response.capi_data)
 
                 if not monitor.state['ShipType']:  # Started game in SRV or fighter
-                    self.ship['text'] = ship_name_map.get(
+                    self.display.configure(self.ship, text=ship_name_map.get(
                         capi_response.capi_data['ship']['name'].lower(),
                         capi_response.capi_data['ship']['name']
-                    )
+                    ))
                     monitor.state['ShipID'] = capi_response.capi_data['ship']['id']
                     monitor.state['ShipType'] = capi_response.capi_data['ship']['name'].lower()
 
                     if not monitor.state['Modules']:
-                        self.ship.configure(state=tk.DISABLED)
+                        self.display.configure(self.ship, state=tk.DISABLED)
 
                 # We might have disabled this in the conditional above.
                 if monitor.state['Modules']:
-                    self.ship.configure(state=True)
+                    self.display.configure(self.ship, state=tk.NORMAL)
 
                 if monitor.state.get('SuitCurrent') is not None:
                     if (loadout := capi_response.capi_data.get('loadout')) is not None:
@@ -1408,7 +1512,7 @@ class AppWindow:
                                     capi_response.capi_data['loadouts'], loadout['loadoutSlotId']
                                 )['name']
 
-                                self.suit['text'] = f'{suitname} ({loadout_name})'
+                                self.display.configure(self.suit, text=f'{suitname} ({loadout_name})')
 
                 self.suit_show_if_set()
                 # Update Odyssey Suit data
@@ -1470,6 +1574,8 @@ class AppWindow:
 
         # Companion API problem
         except companion.ServerLagging as e:
+            # The retry, or next query, mustn't be answered with the same lagging data from the cache
+            companion.session.capi_cache.forget(monitor.cmdr, monitor.state['MarketID'])
             err = str(e)
             if companion.session.retrying:
                 self.status['text'] = err
@@ -1492,6 +1598,12 @@ class AppWindow:
             err = self.status['text'] = str(e)
             play_bad = True
 
+        if not capi_data_ok:
+            companion.session.capi_cache.forget(monitor.cmdr, monitor.state['MarketID'])
+
+        # Any retry for this query is over, so the next one is subject to the cooldown, and the cache, again
+        companion.session.retrying = False
+
         if not err:  # not self.status['text']:  # no errors
             # LANG: Time when we last obtained Frontier CAPI data
             self.status['text'] = strftime(tr.tl('Last updated at %H:%M:%S'), localtime(capi_response.query_time))
@@ -1551,26 +1663,27 @@ class AppWindow:
                 logger.trace_if('journal.queue', 'No entry from monitor.get_entry()')
                 return
 
-            # Update main window
+            # Update main window.  Only values that have changed are passed on to Tk.
             self.cooldown()
             if monitor.cmdr and monitor.state['Captain']:
-                if not config.get_bool('hide_multicrew_captain', default=False):
-                    self.cmdr['text'] = f'{monitor.cmdr} / {monitor.state["Captain"]}'
+                if not config.hide_multicrew_captain:
+                    cmdr_text = f'{monitor.cmdr} / {monitor.state["Captain"]}'
 
                 else:
-                    self.cmdr['text'] = f'{monitor.cmdr}'
+                    cmdr_text = f'{monitor.cmdr}'
 
-                self.ship_label['text'] = tr.tl('Role') + ':'  # LANG: Multicrew role label in main window
-                self.ship.configure(state=tk.NORMAL, text=crewroletext(monitor.state['Role']), url=None)
+                # LANG: Multicrew role label in main window
+                self.display.configure(self.ship_label, text=tr.tl('Role') + ':')
+                self.display.configure(self.ship, state=tk.NORMAL, text=crewroletext(monitor.state['Role']), url=None)
 
             elif monitor.cmdr:
-                if monitor.group and not config.get_bool("hide_private_group", default=False):
-                    self.cmdr['text'] = f'{monitor.cmdr} / {monitor.group}'
+                if monitor.group and not config.hide_private_group:
+                    cmdr_text = f'{monitor.cmdr} / {monitor.group}'
 
                 else:
-                    self.cmdr['text'] = monitor.cmdr
+                    cmdr_text = monitor.cmdr
 
-                self.ship_label['text'] = tr.tl('Ship') + ':'  # LANG: 'Ship' label in main UI
+                self.display.configure(self.ship_label, text=tr.tl('Ship') + ':')  # LANG: 'Ship' label in main UI
 
                 # TODO: Show something else when on_foot
                 if monitor.state['ShipName']:
@@ -1589,20 +1702,23 @@ class AppWindow:
                 else:
                     ship_state = tk.DISABLED
 
-                self.ship.configure(text=ship_text, url=self.shipyard_url, state=ship_state)
+                self.display.configure(self.ship, text=ship_text, url=self.shipyard_url, state=ship_state)
 
             else:
-                self.cmdr['text'] = ''
-                self.ship_label['text'] = tr.tl('Ship') + ':'  # LANG: 'Ship' label in main UI
-                self.ship['text'] = ''
+                cmdr_text = ''
+                self.display.configure(self.ship_label, text=tr.tl('Ship') + ':')  # LANG: 'Ship' label in main UI
+                self.display.configure(self.ship, text='')
 
             if monitor.cmdr and monitor.is_beta:
-                self.cmdr['text'] += ' (beta)'
+                cmdr_text += ' (beta)'
 
+            self.display.configure(self.cmdr, text=cmdr_text)
             self.update_suit_text()
             self.suit_show_if_set()
 
-            self.edit_menu.entryconfigure(0, state=monitor.state['SystemName'] and tk.NORMAL or tk.DISABLED)  # Copy
+            self.display.entryconfigure(  # Copy
+                self.edit_menu, 0, state=monitor.state['SystemName'] and tk.NORMAL or tk.DISABLED
+            )
 
             if entry['event'] in (
                     'Undocked',
@@ -1621,11 +1737,9 @@ class AppWindow:
                     'JoinACrew'):
                 self.status['text'] = ''  # Periodically clear any old error
 
-            self.w.update_idletasks()
-
             # Companion login
             if entry['event'] in (None, 'StartUp', 'NewCommander', 'LoadGame') and monitor.cmdr:
-                if not config.get_list('cmdrs') or monitor.cmdr not in config.get_list('cmdrs'):
+                if monitor.cmdr not in config.cmdrs:
                     config.set('cmdrs', config.get_list('cmdrs', default=[]) + [monitor.cmdr])
                 self.login()
 
@@ -1684,7 +1798,7 @@ class AppWindow:
 
             # Export loadout
             if entry['event'] == 'Loadout' and not monitor.state['Captain'] \
-                    and config.get_int('output') & config.OUT_SHIP:
+                    and config.output & config.OUT_SHIP:
                 monitor.export_ship()
 
             if monitor.cmdr:
@@ -1703,8 +1817,8 @@ class AppWindow:
             # Only if auth callback is not pending
             if companion.session.state != companion.Session.STATE_AUTH:
                 # Only if configured to do so
-                if (not config.get_int('output') & config.OUT_MKT_MANUAL
-                        and config.get_int('output') & config.OUT_STATION_ANY):
+                if (not config.output & config.OUT_MKT_MANUAL
+                        and config.output & config.OUT_STATION_ANY):
                     if entry['event'] in ('StartUp', 'Location', 'Docked') and monitor.state['StationName']:
                         # TODO: Can you log out in a docked Taxi and then back in to
                         #       the taxi, so 'Location' should be covered here too ?
@@ -1790,6 +1904,28 @@ class AppWindow:
             if not config.get_int('hotkey_mute'):
                 hotkeymgr.play_bad()
 
+    def datafiles_updated(self, event=None) -> None:
+        """Swap in the contents of any data files that the background refresh changed."""
+        import edshipyard
+        import outfitting
+        import plugin_browser
+
+        reloaders = {
+            'modules.json': outfitting.reload_moduledata,
+            'ships.json': edshipyard.reload_ships,
+            'commodity.csv': companion.reload_commodity_map,
+            'rare_commodity.csv': companion.reload_commodity_map,
+            'master_plugin_list.json': plugin_browser.reload_plugin_list,
+        }
+        for reloader in {reloaders[f] for f in self.updater.updated_datafiles if f in reloaders}:
+            try:
+                reloader()
+
+            except Exception:
+                logger.exception(f'Failed reloading updated data with {reloader.__qualname__}')
+
+        logger.info(f'Using updated data files: {self.updater.updated_datafiles}')
+
     def shipyard_url(self, shipname: str) -> str | None:
         """Dispatch a ship URL to the configured handler."""
         if not (loadout := monitor.ship()):
@@ -2134,6 +2270,17 @@ def setup_killswitches(filename: str | None):
     killswitch.setup_main_list(filename)
 
 
+def finish_startup_profile() -> None:
+    """Record the first paint and write out the startup profile."""
+    profiler.mark('first paint')
+    path = profiler.finish(config.app_dir_path / PROFILE_FILENAME)
+    logger.info(f'Startup phases:\n{profiler.summary()}')
+    for node in profiler.over_budget():
+        logger.warning(f'Import of {node.name} took {node.cumulative * 1000:.1f} ms, over the startup budget')
+
+    logger.info(f'Startup profile written to {path}')
+
+
 def show_killswitch_poppup(root=None):
     """Show a warning popup if there are any killswitches that match the current version."""
     if len(kills := killswitch.kills_for_version()) == 0:
@@ -2339,8 +2486,10 @@ sys.path: {sys.path}'''
     print(f'{applongname} {appversion()}')
 
     tr.install(config.get_str('language'))  # Can generate errors so wait til log set up
+    profiler.mark('l10n install')
 
     setup_killswitches(args.killswitches_file)
+    profiler.mark('killswitch')
 
     root = tk.Tk(className=appname.lower())
     if sys.platform != 'win32' and ((f := config.get_str('font')) is not None or f != ''):
@@ -2369,6 +2518,7 @@ sys.path: {sys.path}'''
 
     try:
         app = AppWindow(root)
+        profiler.mark('main window')
     except Exception as err:
         logger.exception(f"EDMC Critical Error: {err}")
         title = tr.tl("Error")  # LANG: Generic error prefix
@@ -2462,10 +2612,11 @@ sys.path: {sys.path}'''
     root.after(1, messagebox_not_py3)
     # Show warning popup for killswitches matching current version
     root.after(2, show_killswitch_poppup, root)
+    if profiler.active:
+        root.after_idle(finish_startup_profile)
+
     # Start the main event loop
     try:
-        check_for_datafile_updates()
-        check_for_fdev_updates()
         root.mainloop()
     except KeyboardInterrupt:
         logger.info("Ctrl+C Detected, Attempting Clean Shutdown")
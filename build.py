@@ -24,6 +24,7 @@ from config import (
     update_interval,
 )
 from update import check_for_fdev_updates, check_for_datafile_updates
+from l10n import CATALOGUE_SUFFIX, compile_catalogues
 
 
 AUDIT_DEPS = False
@@ -101,7 +102,7 @@ def generate_data_files(
             [
                 pathlib.Path(l10n_dir) / x
                 for x in os.listdir(l10n_dir)
-                if x.endswith(".strings")
+                if x.endswith((".strings", CATALOGUE_SUFFIX))
             ],
         ),
         (
@@ -354,6 +355,7 @@ def build(audit_deps: bool = False) -> None:
         "plugins/spansh_core.py",
         "plugins/edastro_core.py",
         "plugins/common_coreutils.py",
+        "plugins/eddn_schemas.py",
     ]
     options: dict = {
         "py2exe": {
@@ -374,6 +376,7 @@ def build(audit_deps: bool = False) -> None:
         }
     }
 
+    compile_catalogues()
     data_files = generate_data_files(appname, gitversion_filename, plugins)
 
     version_info: dict = {
@@ -13,8 +13,11 @@ from __future__ import annotations
 
 import base64
 import collections
+import copy
+import bisect
 import csv
 import datetime
+import gzip
 import hashlib
 import json
 import numbers
@@ -26,12 +29,13 @@ import tkinter as tk
 import urllib.parse
 import webbrowser
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.utils import parsedate
 from enum import StrEnum
 from pathlib import Path
 from queue import Queue
 from typing import TYPE_CHECKING, Any, TypeVar, Union, Iterator
-from collections.abc import Mapping
+from collections.abc import Callable, Collection, Mapping
 from dataclasses import dataclass
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -39,6 +43,7 @@ import config as conf_module
 import killswitch
 import protocol
 from config import config, user_agent, IS_FROZEN
+from edmc_data import CAPI_HISTORY_DIRNAME, DEBUG_WEBSERVER_HOST, DEBUG_WEBSERVER_PORT
 from edmc_data import companion_category_map as category_map
 from EDMCLogging import get_main_logger
 from monitor import monitor
@@ -67,6 +72,9 @@ SERVER_BETA = 'https://pts-companion.orerve.net'
 
 commodity_map: dict = {}
 
+CAPI_HISTORY_MAX_BYTES = 10 * 1024 * 1024  # Compressed size of all stored responses
+CAPI_HISTORY_MAX_AGE = datetime.timedelta(days=7)
+
 
 class CAPIData(UserDict):
     """Encapsulates a Companion API (CAPI) response."""
@@ -146,20 +154,208 @@ class CAPIDataRawEndpoint:
     # TODO: Maybe requests.response status ?
 
 
+class CAPIDataRawStore:
+    """
+    Bounded on-disk history of raw CAPI responses.
+
+    Each response is a gzipped file named for its query time and endpoint, so
+    the index can be rebuilt from a directory listing without reading any of
+    them.  The oldest responses are dropped once the store is over
+    `max_bytes` in total, or they're older than `max_age`.
+
+    The directory isn't looked at until the store is first used.
+    """
+
+    def __init__(
+        self, path: Path, max_bytes: int = CAPI_HISTORY_MAX_BYTES,
+        max_age: datetime.timedelta = CAPI_HISTORY_MAX_AGE
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Both ordered oldest first, by (query time in ms, endpoint)
+        self._index: collections.deque[tuple[int, str, int]] = collections.deque()  # (time, endpoint, size)
+        self._by_endpoint: dict[str, collections.deque[int]] = {}
+        self._total_bytes = 0
+
+    def _load(self) -> None:
+        """Index, and prune, the files already in the store.  Must be called with the lock held."""
+        if self._loaded:
+            return
+
+        self._loaded = True
+        entries = []
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            for file in self.path.glob('*.json.gz'):
+                try:
+                    stamp, name = file.name.removesuffix('.json.gz').split('.', 1)
+                    entries.append((int(stamp), '/' + name, file.stat().st_size))
+
+                except (ValueError, OSError):
+                    logger.warning(f'Ignoring unexpected file in CAPI history: {file}')
+
+        except OSError as e:
+            logger.warning(f'CAPI history unavailable: {e!r}')
+
+        for entry in sorted(entries):
+            self._add(*entry)
+
+        self._prune()
+
+    def _file(self, stamp: int, endpoint: str) -> Path:
+        return self.path / f'{stamp}.{endpoint.lstrip("/")}.json.gz'
+
+    def _add(self, stamp: int, endpoint: str, size: int) -> None:
+        # Responses are nearly always recorded in time order, so can just be appended
+        entry = (stamp, endpoint, size)
+        if self._index and entry < self._index[-1]:
+            bisect.insort(self._index, entry)
+
+        else:
+            self._index.append(entry)
+
+        stamps = self._by_endpoint.setdefault(endpoint, collections.deque())
+        if stamps and stamp < stamps[-1]:
+            bisect.insort(stamps, stamp)
+
+        else:
+            stamps.append(stamp)
+
+        self._total_bytes += size
+
+    def _prune(self) -> None:
+        oldest = int((datetime.datetime.now(datetime.timezone.utc) - self.max_age).timestamp() * 1000)
+        while self._index and (self._total_bytes > self.max_bytes or self._index[0][0] < oldest):
+            stamp, endpoint, size = self._index.popleft()
+            # Being the oldest of all, it's also the oldest for its endpoint
+            self._by_endpoint[endpoint].popleft()
+            self._total_bytes -= size
+            self._file(stamp, endpoint).unlink(missing_ok=True)
+
+    def record(self, endpoint: str, raw_data: str, query_time: datetime.datetime) -> None:
+        """
+        Store a raw response.
+
+        :param endpoint: The CAPI endpoint queried.
+        :param raw_data: The response body.
+        :param query_time: When it was received.
+        """
+        stamp = int(query_time.timestamp() * 1000)
+        file = self._file(stamp, endpoint)
+        with self._lock:
+            self._load()
+
+        try:
+            file.write_bytes(gzip.compress(raw_data.encode(encoding='utf-8')))
+
+        except OSError as e:
+            logger.warning(f'Unable to store CAPI {endpoint} response: {e!r}')
+            return
+
+        with self._lock:
+            self._add(stamp, endpoint, file.stat().st_size)
+            self._prune()
+
+    def endpoints(self) -> list[str]:
+        """Get the endpoints with stored responses."""
+        with self._lock:
+            self._load()
+            return [endpoint for endpoint, stamps in self._by_endpoint.items() if stamps]
+
+    def times(self, endpoint: str) -> list[datetime.datetime]:
+        """
+        Get when each stored response for an endpoint was received.
+
+        :param endpoint: The CAPI endpoint.
+        :return: Query times, oldest first.
+        """
+        with self._lock:
+            self._load()
+            stamps = list(self._by_endpoint.get(endpoint, []))
+
+        return [datetime.datetime.fromtimestamp(stamp / 1000, datetime.timezone.utc) for stamp in stamps]
+
+    def latest(self, endpoint: str, at: datetime.datetime | None = None) -> CAPIDataRawEndpoint | None:
+        """
+        Get the newest response for an endpoint received no later than `at`.
+
+        :param endpoint: The CAPI endpoint.
+        :param at: Point in time, defaults to now.
+        :return: The response, or None if there isn't one.
+        """
+        with self._lock:
+            self._load()
+            stamps = self._by_endpoint.get(endpoint, collections.deque())
+            if at is None:
+                idx = len(stamps)
+
+            else:
+                idx = bisect.bisect_right(stamps, int(at.timestamp() * 1000))
+
+            if idx == 0:
+                return None
+
+            stamp = stamps[idx - 1]
+
+        try:
+            raw_data = gzip.decompress(self._file(stamp, endpoint).read_bytes()).decode(encoding='utf-8')
+
+        except (OSError, EOFError) as e:
+            logger.warning(f'Unable to read stored CAPI {endpoint} response: {e!r}')
+            return None
+
+        return CAPIDataRawEndpoint(raw_data, datetime.datetime.fromtimestamp(stamp / 1000, datetime.timezone.utc))
+
+
 class CAPIDataRaw:
     """Stores the last obtained raw CAPI response for each endpoint."""
 
-    def __init__(self) -> None:
+    def __init__(self, store: CAPIDataRawStore | None = None) -> None:
+        """
+        Initialise the raw data record.
+
+        :param store: If given, every response is also kept in this history.
+        """
         self.raw_data: dict[str, CAPIDataRawEndpoint] = {}
+        self.store = store
+        # Station queries are recorded from more than one thread at once
+        self._lock = threading.Lock()
 
     def record_endpoint(self, endpoint: str, raw_data: str, query_time: datetime.datetime) -> None:
         """Record the latest raw data for the given endpoint."""
-        self.raw_data[endpoint] = CAPIDataRawEndpoint(raw_data, query_time)
+        with self._lock:
+            self.raw_data[endpoint] = CAPIDataRawEndpoint(raw_data, query_time)
+
+        if self.store is not None:
+            self.store.record(endpoint, raw_data, query_time)
+
+    def as_of(self, when: datetime.datetime) -> CAPIDataRaw:
+        """
+        Get the raw data as it was at a point in time, from the history.
+
+        :param when: The point in time.
+        :return: The latest response for each endpoint received no later than `when`.
+        """
+        snapshot = CAPIDataRaw()
+        if self.store is None:
+            return snapshot
+
+        for endpoint in self.store.endpoints():
+            if (entry := self.store.latest(endpoint, when)) is not None:
+                snapshot.raw_data[endpoint] = entry
+
+        return snapshot
 
     def __str__(self) -> str:
         """Return a readable string representation of the stored data."""
+        with self._lock:
+            raw_data = dict(self.raw_data)
+
         entries = []
-        for k, v in self.raw_data.items():
+        for k, v in raw_data.items():
             entries.append(
                 f'"{k}": {{\n\t"query_time": "{v.query_time}",\n\t"raw_data": {v.raw_data}\n}}'
             )
@@ -167,13 +363,113 @@ class CAPIDataRaw:
 
     def __iter__(self) -> Iterator[str]:
         """Iterate over stored endpoint keys."""
-        return iter(self.raw_data)
+        with self._lock:
+            return iter(list(self.raw_data))
 
     def __getitem__(self, item: str) -> CAPIDataRawEndpoint:
         """Access the stored CAPIDataRawEndpoint by endpoint name."""
         return self.raw_data[item]
 
 
+CAPICacheKey = tuple[str | None, str, str, int | None]  # (cmdr, host, endpoint, MarketID)
+
+
+class CAPIResponseCache:
+    """
+    Recent CAPI responses, so that repeat queries inside the rate limits aren't re-sent.
+
+    Callers always get their own copy of the data, as it's modified after
+    being returned.  A query for a key that's already in flight waits for
+    that one rather than being sent again.
+    """
+
+    def __init__(self, ttls: Mapping[str, float]) -> None:
+        """
+        Initialise the cache.
+
+        :param ttls: Seconds a response stays fresh, by endpoint.  Endpoints not listed aren't cached.
+        """
+        self.ttls = ttls
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._entries: dict[CAPICacheKey, tuple[float, CAPIData]] = {}
+        self._in_flight: dict[CAPICacheKey, Future[CAPIData]] = {}
+
+    def get_or_fetch(self, key: CAPICacheKey, fetch: Callable[[], CAPIData], refresh: bool = False) -> CAPIData:
+        """
+        Return fresh cached data for `key`, else fetch it.
+
+        :param key: What the data is for.
+        :param fetch: Performs the actual query.
+        :param refresh: Fetch even if there's fresh cached data, e.g. when retrying after it was found to be lagging.
+        :return: The CAPI data.
+        """
+        with self._lock:
+            entry = None if refresh else self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttls.get(key[2], 0):
+                self.hits += 1
+                logger.debug(f'CAPI cache hit for {key[2]} (hits {self.hits}, misses {self.misses})')
+                return copy.deepcopy(entry[1])
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                self.misses += 1
+                logger.debug(f'CAPI cache miss for {key[2]} (hits {self.hits}, misses {self.misses})')
+                self._in_flight[key] = Future()
+
+            else:
+                self.coalesced += 1
+                logger.debug(f'CAPI query for {key[2]} already in flight, waiting for it')
+
+        if pending is not None:
+            return copy.deepcopy(pending.result())
+
+        pending = self._in_flight[key]
+        try:
+            data = fetch()
+
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+
+        else:
+            cached = copy.deepcopy(data)
+            # Empty data means the query was killswitched, which shouldn't be remembered.
+            if data and key[2] in self.ttls:
+                with self._lock:
+                    self._entries[key] = (time.monotonic(), cached)
+
+            pending.set_result(cached)
+
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return data
+
+    def forget(self, cmdr: str | None, market_id: int | None, endpoints: Collection[str] | None = None) -> None:
+        """
+        Forget the cached responses for a Cmdr at a station.
+
+        :param cmdr: The Cmdr.
+        :param market_id: The MarketID the responses were cached against.
+        :param endpoints: Only forget these endpoints' responses, defaults to all of them.
+        """
+        with self._lock:
+            for key in [
+                key for key in self._entries
+                if key[0] == cmdr and key[3] == market_id and (endpoints is None or key[2] in endpoints)
+            ]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Forget all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+
 def listify(thing: list | dict | None) -> list[Any]:
     """
     Convert a JSON array or int-indexed dict into a Python list.
@@ -559,8 +855,17 @@ class Session:
         self.auth: Auth | None = None
         self.retrying = False  # Avoid infinite loop when successful auth / unsuccessful query
         self.tk_master: tk.Tk | None = None
-
-        self.capi_raw_data = CAPIDataRaw()  # Cache of raw replies from CAPI service
+        # Guards changes to requests_session's headers, as station queries share it between threads
+        self.requests_session_lock = threading.Lock()
+
+        # Cache of raw replies from CAPI service
+        self.capi_raw_data = CAPIDataRaw(CAPIDataRawStore(config.app_dir_path / CAPI_HISTORY_DIRNAME))
+        self.capi_cache = CAPIResponseCache({
+            CAPIEndpoint.PROFILE: capi_query_cooldown,
+            CAPIEndpoint.MARKET: capi_query_cooldown,
+            CAPIEndpoint.SHIPYARD: capi_query_cooldown,
+            CAPIEndpoint.FLEETCARRIER: capi_fleetcarrier_query_cooldown,
+        })
         # Queue that holds requests for CAPI queries, the items should always
         # be EDMCCAPIRequest objects.
         self.capi_request_queue: Queue[EDMCCAPIRequest] = Queue()
@@ -569,6 +874,8 @@ class Session:
         # this queue, but it should be either EDMarketConnector.AppWindow or
         # EDMC.py).  Items may be EDMCCAPIResponse or EDMCCAPIFailedRequest.
         self.capi_response_queue: Queue[EDMCCAPIResponse | EDMCCAPIFailedRequest] = Queue()
+        # /market and /shipyard are fetched on these, alongside the worker's own /profile query.
+        self.capi_station_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='CAPI station')
         logger.debug('Starting CAPI queries thread...')
         self.capi_query_thread = threading.Thread(
             target=self.capi_query_worker,
@@ -694,6 +1001,7 @@ class Session:
     def invalidate(self) -> None:
         """Invalidate Frontier authorization credentials."""
         logger.debug('Forcing a full re-authentication')
+        self.capi_cache.clear()
         # Force a full re-authentication
         self.reinit_session()
         Auth.invalidate(self.credentials['cmdr'])  # type: ignore
@@ -707,6 +1015,28 @@ class Session:
         logger.debug('CAPI worker thread starting')
 
         def capi_single_query(
+            capi_host: str,
+            capi_endpoint: str,
+            market_id: int | None = None,
+            timeout: int = capi_default_requests_timeout
+        ) -> CAPIData:
+            """
+            Perform a *single* CAPI endpoint query, or answer it from the cache.
+
+            :param capi_host: CAPI host to query.
+            :param capi_endpoint: An actual Frontier CAPI endpoint to query.
+            :param market_id: The journal's MarketID when the query was asked for, part of the cache key.
+            :param timeout: requests query timeout to use.
+            :return: The resulting CAPI data, of type CAPIData.
+            """
+            return self.capi_cache.get_or_fetch(
+                (monitor.cmdr, capi_host, capi_endpoint, market_id),
+                lambda: capi_uncached_query(capi_host, capi_endpoint, timeout=timeout),
+                # A retry is because the last data was lagging, so mustn't get that again
+                refresh=self.retrying
+            )
+
+        def capi_uncached_query(
             capi_host: str,
             capi_endpoint: str,
             timeout: int = capi_default_requests_timeout
@@ -719,7 +1049,9 @@ class Session:
             :param timeout: requests query timeout to use.
             :return: The resulting CAPI data, of type CAPIData.
             """
-            if self.requests_session is None:
+            # Only looked at once, as it can be closed from the main thread meanwhile
+            requests_session = self.requests_session
+            if requests_session is None:
                 raise ServerError("CAPI session not initialized")
             capi_data: CAPIData = CAPIData()
             should_return: bool
@@ -735,12 +1067,13 @@ class Session:
                 if conf_module.capi_pretend_down:
                     raise ServerConnectionError(f'Pretending CAPI down: {capi_endpoint}')
 
-                if conf_module.capi_debug_access_token is not None:
-                    self.requests_session.headers['Authorization'] = f'Bearer {conf_module.capi_debug_access_token}'
-                    # This is one-shot
-                    conf_module.capi_debug_access_token = None
+                with self.requests_session_lock:
+                    if conf_module.capi_debug_access_token is not None:
+                        requests_session.headers['Authorization'] = f'Bearer {conf_module.capi_debug_access_token}'
+                        # This is one-shot
+                        conf_module.capi_debug_access_token = None
 
-                r = self.requests_session.get(capi_host + capi_endpoint, timeout=timeout)
+                r = requests_session.get(capi_host + capi_endpoint, timeout=timeout)
 
                 logger.trace_if('capi.worker', '... got result...')
                 r.raise_for_status()  # Typically 403 "Forbidden" on token expiry
@@ -824,6 +1157,62 @@ class Session:
             logger.exception('Frontier CAPI: Misc. Error')
             raise ServerError('Frontier CAPI: Misc. Error')
 
+        def speculative_station_queries(
+            capi_host: str, market_id: int | None, timeout: int = capi_default_requests_timeout
+        ) -> dict[str, Future[CAPIData]]:
+            """
+            Start /market and /shipyard queries before /profile has confirmed we need them.
+
+            Only done if the journal has told us we're at a station with a
+            market, and which services it has.
+
+            :param capi_host: CAPI host to query.
+            :param market_id: The journal's MarketID.
+            :param timeout: requests timeout to use.
+            :return: The started queries, by endpoint.
+            """
+            services = monitor.stationservices or []
+            if not market_id:
+                return {}
+
+            endpoints = []
+            if 'commodities' in services:
+                endpoints.append(CAPIEndpoint.MARKET)
+
+            if 'outfitting' in services or 'shipyard' in services:
+                endpoints.append(CAPIEndpoint.SHIPYARD)
+
+            logger.trace_if('capi.worker', f'Speculatively querying {endpoints}')
+            return {
+                endpoint: self.capi_station_executor.submit(capi_single_query, capi_host, endpoint, market_id, timeout)
+                for endpoint in endpoints
+            }
+
+        def discard_station_queries(queries: set[Future[CAPIData]], cmdr: str | None, market_id: int | None) -> None:
+            """
+            Cancel station queries whose results won't be used, if they haven't started yet.
+
+            Any that have started are left to finish, then their failure is
+            logged, or their result dropped from the cache.
+
+            :param queries: The unused queries.
+            :param cmdr: The Cmdr they were for.
+            :param market_id: The MarketID they were for.
+            """
+            def finished(query: Future[CAPIData]) -> None:
+                if query.cancelled():
+                    return
+
+                if (e := query.exception()) is not None:
+                    logger.warning(f'Unused CAPI station query failed: {e!r}')
+
+                else:
+                    self.capi_cache.forget(cmdr, market_id, (CAPIEndpoint.MARKET, CAPIEndpoint.SHIPYARD))
+
+            for query in queries:
+                if not query.cancel():
+                    query.add_done_callback(finished)
+
         def capi_station_queries(  # noqa: CCR001
             capi_host: str, timeout: int = capi_default_requests_timeout
         ) -> CAPIData:
@@ -836,81 +1225,100 @@ class Session:
             retrieve CAPI market and/or shipyard/outfitting data and merge into
             the /profile data.
 
+            The market and shipyard queries run concurrently, and if the journal
+            says we're docked they're started alongside /profile.  Their results
+            are only used once /profile has confirmed them to be wanted.
+
             :param timeout: requests timeout to use.
             :return: CAPIData instance with what we retrieved.
             """
-            station_data = capi_single_query(capi_host, CAPIEndpoint.PROFILE, timeout=timeout)
-
-            if not station_data.get('commander'):
-                # If even this doesn't exist, probably killswitched.
-                return station_data
-
-            if not station_data['commander'].get('docked') and not monitor.state['OnFoot']:
-                return station_data
-
-            # Sanity checks in case data isn't as we expect, and maybe 'docked' flag
-            # is also lagging.
-            if (last_starport := station_data.get('lastStarport')) is None:
-                logger.error("No lastStarport in data!")
-                return station_data
-
-            if (
-                (last_starport_name := last_starport.get('name')) is None
-                or last_starport_name == ''
-            ):
-                # This could well be valid if you've been out exploring for a long
-                # time.
-                logger.warning("No lastStarport name!")
-                return station_data
+            # Taken once, the journal can move on while these queries are in flight
+            cmdr = monitor.cmdr
+            market_id = monitor.state['MarketID']
+            speculative = speculative_station_queries(capi_host, market_id, timeout=timeout)
+            queries: dict[str, Future[CAPIData]] = {}
+            used: set[Future[CAPIData]] = set()
+            try:
+                station_data = capi_single_query(capi_host, CAPIEndpoint.PROFILE, market_id, timeout=timeout)
 
-            # WORKAROUND: n/a | 06-08-2021: Issue 1198 and https://issues.frontierstore.net/issue-detail/40706
-            # -- strip "+" chars off star port names returned by the CAPI
-            last_starport_name = last_starport["name"] = last_starport_name.rstrip(" +")
-
-            services = last_starport.get('services', {})
-            if not isinstance(services, dict):
-                # Odyssey Alpha Phase 3 4.0.0.20 has been observed having
-                # this be an empty list when you've jumped to another system
-                # and not yet docked.  As opposed to no services key at all
-                # or an empty dict.
-                logger.error(f'services is "{type(services)}", not dict !')
-                # TODO: Change this to be dependent on its own CL arg
-                if __debug__:
-                    self.dump_capi_data(station_data)
-
-                # Set an empty dict so as to not have to retest below.
-                services = {}
-
-            last_starport_id = int(last_starport.get('id'))
-
-            if services.get('commodities'):
-                market_data = capi_single_query(capi_host, CAPIEndpoint.MARKET, timeout=timeout)
-                if not market_data.get('id'):
-                    # Probably killswitched
+                if not station_data.get('commander'):
+                    # If even this doesn't exist, probably killswitched.
                     return station_data
 
-                if last_starport_id != int(market_data['id']):
-                    logger.warning(f"{last_starport_id!r} != {int(market_data['id'])!r}")
-                    raise ServerLagging()
+                if not station_data['commander'].get('docked') and not monitor.state['OnFoot']:
+                    return station_data
 
-                market_data['name'] = last_starport_name
-                station_data['lastStarport'].update(market_data)
+                # Sanity checks in case data isn't as we expect, and maybe 'docked' flag
+                # is also lagging.
+                if (last_starport := station_data.get('lastStarport')) is None:
+                    logger.error("No lastStarport in data!")
+                    return station_data
 
-            if services.get('outfitting') or services.get('shipyard'):
-                shipyard_data = capi_single_query(capi_host, CAPIEndpoint.SHIPYARD, timeout=timeout)
-                if not shipyard_data.get('id'):
-                    # Probably killswitched
+                if (
+                    (last_starport_name := last_starport.get('name')) is None
+                    or last_starport_name == ''
+                ):
+                    # This could well be valid if you've been out exploring for a long
+                    # time.
+                    logger.warning("No lastStarport name!")
                     return station_data
 
-                if last_starport_id != int(shipyard_data['id']):
-                    logger.warning(f"{last_starport_id!r} != {int(shipyard_data['id'])!r}")
-                    raise ServerLagging()
+                # WORKAROUND: n/a | 06-08-2021: Issue 1198 and https://issues.frontierstore.net/issue-detail/40706
+                # -- strip "+" chars off star port names returned by the CAPI
+                last_starport_name = last_starport["name"] = last_starport_name.rstrip(" +")
+
+                services = last_starport.get('services', {})
+                if not isinstance(services, dict):
+                    # Odyssey Alpha Phase 3 4.0.0.20 has been observed having
+                    # this be an empty list when you've jumped to another system
+                    # and not yet docked.  As opposed to no services key at all
+                    # or an empty dict.
+                    logger.error(f'services is "{type(services)}", not dict !')
+                    # TODO: Change this to be dependent on its own CL arg
+                    if __debug__:
+                        self.dump_capi_data(station_data)
+
+                    # Set an empty dict so as to not have to retest below.
+                    services = {}
+
+                last_starport_id = int(last_starport.get('id'))
+
+                wanted = []
+                if services.get('commodities'):
+                    wanted.append(CAPIEndpoint.MARKET)
+
+                if services.get('outfitting') or services.get('shipyard'):
+                    wanted.append(CAPIEndpoint.SHIPYARD)
+
+                # Anything not already speculatively in flight is started now, all at once.
+                queries = {
+                    endpoint: speculative.get(endpoint)
+                    or self.capi_station_executor.submit(capi_single_query, capi_host, endpoint, market_id, timeout)
+                    for endpoint in wanted
+                }
+                for query in queries.values():
+                    used.add(query)
+                    endpoint_data = query.result()
+                    if not endpoint_data.get('id'):
+                        # Probably killswitched
+                        return station_data
+
+                    if last_starport_id != int(endpoint_data['id']):
+                        logger.warning(f"{last_starport_id!r} != {int(endpoint_data['id'])!r}")
+                        # The retry must query again, not get this lagging data back from the cache
+                        self.capi_cache.forget(cmdr, market_id)
+                        raise ServerLagging()
+
+                    endpoint_data['name'] = last_starport_name
+                    station_data['lastStarport'].update(endpoint_data)
+                # WORKAROUND END
 
-                shipyard_data['name'] = last_starport_name
-                station_data['lastStarport'].update(shipyard_data)
-            # WORKAROUND END
+                return station_data
 
-            return station_data
+            finally:
+                # Anything started but not looked at, because /profile said it isn't wanted or
+                # an error cut things short, isn't left to run unobserved.
+                discard_station_queries((set(speculative.values()) | set(queries.values())) - used, cmdr, market_id)
 
         while True:
             query = self.capi_request_queue.get()
@@ -933,7 +1341,7 @@ class Session:
                                                   timeout=capi_fleetcarrier_requests_timeout)
 
                 else:
-                    capi_data = capi_single_query(query.capi_host, CAPIEndpoint.PROFILE)
+                    capi_data = capi_single_query(query.capi_host, CAPIEndpoint.PROFILE, monitor.state['MarketID'])
 
             except Exception as e:
                 self.capi_response_queue.put(
@@ -963,6 +1371,7 @@ class Session:
                 if self.tk_master is not None:
                     self.tk_master.event_generate('<<CAPIResponse>>')
 
+        self.capi_station_executor.shutdown(wait=False, cancel_futures=True)
         logger.info('CAPI worker thread DONE')
 
     def capi_query_close_worker(self) -> None:
@@ -1122,6 +1531,10 @@ class Session:
             logger.warning("Dropping CAPI request because unclear if game beta or not")
             return ''
 
+        if 'capi' in conf_module.debug_senders:
+            logger.debug('Using debug webserver for CAPI because of --debug-sender capi')
+            return f'http://{DEBUG_WEBSERVER_HOST}:{DEBUG_WEBSERVER_PORT}'
+
         if self.credentials['beta']:
             logger.debug(f"Using {SERVER_BETA} because {self.credentials['beta']=}")
             return SERVER_BETA
@@ -1167,6 +1580,30 @@ class Session:
 ######################################################################
 # Non-class utility functions
 ######################################################################
+def reload_commodity_map() -> None:
+    """
+    (Re)load commodity_map from the FDevIDs commodity files.
+
+    The dict is updated in place, never being empty part way, so it can be
+    called when the files have been updated while in use.
+    """
+    new_map = {}
+    fdev_path = config.app_dir_path / 'FDevIDs'
+    for f in ('commodity.csv', 'rare_commodity.csv'):
+        csv_file = fdev_path / f
+        if not csv_file.is_file():
+            logger.warning(f'FDevID file {f} not found! Generating output without these commodity name rewrites.')
+            continue
+        with open(csv_file, newline='') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                new_map[row['symbol']] = (row['category'], row['name'])
+
+    commodity_map.update(new_map)
+    for stale in commodity_map.keys() - new_map.keys():
+        del commodity_map[stale]
+
+
 def fixup(data: CAPIData) -> CAPIData:  # noqa: C901, CCR001 # Can't be usefully simplified
     """
     Fix up commodity names to English & miscellaneous anomaly fixes.
@@ -1176,16 +1613,7 @@ def fixup(data: CAPIData) -> CAPIData:  # noqa: C901, CCR001 # Can't be usefully
     """
     # Lazily populate commodity_map if empty
     if not commodity_map:
-        fdev_path = config.app_dir_path / 'FDevIDs'
-        for f in ('commodity.csv', 'rare_commodity.csv'):
-            csv_file = fdev_path / f
-            if not csv_file.is_file():
-                logger.warning(f'FDevID file {f} not found! Generating output without these commodity name rewrites.')
-                continue
-            with open(csv_file, newline='') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    commodity_map[row['symbol']] = (row['category'], row['name'])
+        reload_commodity_map()
 
     commodities = []
     for commodity in data['lastStarport'].get('commodities') or []:
@@ -46,6 +46,7 @@ import tomli_w
 import time
 import threading
 from typing import Any, TypeVar
+from collections.abc import Callable
 from collections import defaultdict
 import semantic_version
 from constants import GITVERSION_FILE, applongname, appname
@@ -219,6 +220,10 @@ class Config:
         self.generated: str | None = None
         self.source: str | None = None
         self.settings: dict[str, Any] = {}
+        # Typed reads, by (getter, key, default), cleared by anything that changes settings.
+        self._read_cache: dict[tuple[str, str, Any], Any] = {}
+        self._read_cache_lock = threading.Lock()
+        self._settings_generation = 0
         self._load()
         self.default_plugin_dir_path = self.app_dir_path / "plugins"
         plugdir_str = self.get_str("plugin_dir")
@@ -328,6 +333,41 @@ class Config:
 
         # Settings dict created by write_registry_to_toml()
         self.settings = dict(data.get("settings", {}))
+        self._invalidate_reads()
+
+    def _invalidate_reads(self) -> None:
+        """Forget cached typed reads, as settings have changed."""
+        with self._read_cache_lock:
+            self._settings_generation += 1
+            self._read_cache.clear()
+
+    def _cached_read(self, getter: str, key: str, default: Any, read: Callable[[str, Any], Any]) -> Any:
+        """
+        Perform a typed read of a setting, and cache the result.
+
+        The getters check the cache themselves first, as this is the slow path.
+
+        :param getter: Name of the typed getter, as part of the cache key.
+        :param key: Setting name.
+        :param default: Default passed to the getter.
+        :param read: Performs the uncached read.
+        :return: The value.
+        """
+        cache_key = (getter, key, default)
+        try:
+            hash(cache_key)
+
+        except TypeError:  # Unhashable default
+            return read(key, default)
+
+        generation = self._settings_generation
+        value = read(key, default)
+        with self._read_cache_lock:
+            # Don't cache a value read from settings that were changed while we read them
+            if generation == self._settings_generation:
+                self._read_cache[cache_key] = value
+
+        return value
 
     def _write_atomic(self, data: dict):
         with self._write_lock:
@@ -359,11 +399,25 @@ class Config:
 
     def get_str(self, key: str, default="") -> str:
         """Return string value."""
+        try:
+            return self._read_cache['str', key, default]
+
+        except (KeyError, TypeError):
+            return self._cached_read('str', key, default, self._read_str)
+
+    def _read_str(self, key: str, default: str) -> str:
         val = self.get(key.lower(), None)
         return str(val) if val is not None else default
 
     def get_int(self, key: str, default=0) -> int:
         """Adaptive int (handles booleans stored as ints)."""
+        try:
+            return self._read_cache['int', key, default]
+
+        except (KeyError, TypeError):
+            return self._cached_read('int', key, default, self._read_int)
+
+    def _read_int(self, key: str, default: int) -> int:
         val = self.get(key.lower())
         if isinstance(val, int):
             return val
@@ -380,6 +434,13 @@ class Config:
           - Accepts strings "true"/"false"/"1"/"0"
           - Accepts real booleans
         """
+        try:
+            return self._read_cache['bool', key, default]
+
+        except (KeyError, TypeError):
+            return self._cached_read('bool', key, default, self._read_bool)
+
+    def _read_bool(self, key: str, default: bool) -> bool:
         val = self.get(key.lower())
 
         if isinstance(val, bool):
@@ -402,6 +463,39 @@ class Config:
         val = self.get(key.lower())
         return val if isinstance(val, list) else (default if default is not None else [])
 
+    # These are read for every journal event, so skip even get_*()'s call overhead where possible.
+    @property
+    def output(self) -> int:
+        """The OUT_* flags for what's output where."""
+        try:
+            return self._read_cache['int', 'output', 0]
+
+        except KeyError:
+            return self.get_int('output')
+
+    @property
+    def cmdrs(self) -> list[str]:
+        """Commander names known to the app."""
+        return self.get_list('cmdrs')
+
+    @property
+    def hide_multicrew_captain(self) -> bool:
+        """Whether to leave the multi-crew captain's name out of the main window."""
+        try:
+            return self._read_cache['bool', 'hide_multicrew_captain', False]
+
+        except KeyError:
+            return self.get_bool('hide_multicrew_captain')
+
+    @property
+    def hide_private_group(self) -> bool:
+        """Whether to leave the private group name out of the main window."""
+        try:
+            return self._read_cache['bool', 'hide_private_group', False]
+
+        except KeyError:
+            return self.get_bool('hide_private_group')
+
     @property
     def shutting_down(self) -> bool:
         """
@@ -532,6 +626,7 @@ class Config:
             self.generated = None
             self.source = None
             self.settings = {}
+            self._invalidate_reads()
 
             # Load TOML content from the new file and setup system.
             self._load()
@@ -557,6 +652,7 @@ class Config:
         except Exception:
             if not suppress:
                 raise
+        self._invalidate_reads()
         self._dirty = True
         if self._batch_depth == 0:
             self.save()
@@ -573,6 +669,8 @@ class Config:
             self.settings[key] = value
             self._dirty = True
 
+        self._invalidate_reads()
+
         if self._batch_depth == 0:
             self.save()
 
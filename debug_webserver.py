@@ -1,16 +1,28 @@
-"""Simple HTTP listener to be used with debugging various EDMC sends."""
+"""
+Simple HTTP listener to be used with debugging various EDMC sends.
+
+It also stands in for CAPI, serving recorded responses, and can be told to
+be slow or to fail some share of requests so that queueing, retries and
+backoff can be exercised without a network.
+"""
 from __future__ import annotations
 
+import argparse
+import collections
 import gzip
 import json
 import pathlib
+import random
 import threading
+import time
 import zlib
+from dataclasses import dataclass
 from http import server
 from typing import Any, Literal
 from collections.abc import Callable
-from urllib.parse import parse_qs
+from urllib.parse import parse_qs, urlsplit
 from config import config
+from edmc_data import CAPI_HISTORY_DIRNAME
 from EDMCLogging import get_main_logger
 
 logger = get_main_logger()
@@ -18,6 +30,135 @@ logger = get_main_logger()
 output_lock = threading.Lock()
 output_data_path = pathlib.Path(config.app_dir_path / 'logs' / 'http_debug')  # type: ignore
 SAFE_TRANSLATE = str.maketrans(dict.fromkeys("!@#$%^&*()./\\\r\n[]-+='\";:?<>,~`", '_'))
+CAPI_ENDPOINTS = ('/profile', '/market', '/shipyard', '/fleetcarrier')
+STATS_PATH = '/_stats'
+RATE_WINDOW = 60  # Seconds over which the recent request rate is reported
+
+
+@dataclass
+class Faults:
+    """How badly the listener should behave."""
+
+    latency: float = 0.0  # Seconds added to every response
+    jitter: float = 0.0  # Up to this many further seconds, at random
+    rate_limit_rate: float = 0.0  # Share of requests answered 429
+    maintenance_rate: float = 0.0  # Share of requests answered 418, as CAPI does for maintenance
+    error_rate: float = 0.0  # Share of requests answered with a 5xx
+
+    def pick_status(self) -> int | None:
+        """
+        Decide whether this request fails.
+
+        :return: The error status to send, or None to answer normally.
+        """
+        roll = random.random()
+        for rate, status in (
+            (self.rate_limit_rate, 429),
+            (self.maintenance_rate, 418),
+            (self.error_rate, random.choice((500, 502, 503, 504))),
+        ):
+            if roll < rate:
+                return status
+
+            roll -= rate
+
+        return None
+
+    def delay(self) -> None:
+        """Wait out the configured latency."""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+
+class RequestStats:
+    """Count the requests served, by method, path and status."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counts: collections.Counter[tuple[str, str, int]] = collections.Counter()
+        self._recent: collections.deque[float] = collections.deque()
+
+    def record(self, method: str, path: str, status: int) -> None:
+        """Count one request."""
+        now = time.monotonic()
+        with self._lock:
+            self.counts[(method, path, status)] += 1
+            self._recent.append(now)
+            while self._recent and self._recent[0] < now - RATE_WINDOW:
+                self._recent.popleft()
+
+    def report(self) -> dict[str, Any]:
+        """
+        Summarise the requests seen so far.
+
+        :return: Totals, overall and recent rates, and per-request counts.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] < now - RATE_WINDOW:
+                self._recent.popleft()
+
+            total = sum(self.counts.values())
+            uptime = now - self.started
+            return {
+                'uptime': round(uptime, 1),
+                'total': total,
+                'per_second': round(total / uptime, 2) if uptime else 0.0,
+                'recent_per_second': round(len(self._recent) / min(uptime, RATE_WINDOW), 2) if uptime else 0.0,
+                'requests': [
+                    {'method': method, 'path': path, 'status': status, 'count': count}
+                    for (method, path, status), count in sorted(self.counts.items())
+                ],
+            }
+
+
+class CAPIHistory:
+    """
+    Read-only view of EDMC's history of raw CAPI responses, to serve the latest of them.
+
+    The directory is only listed once, and nothing in it is ever changed.
+    See companion.CAPIDataRawStore for the format.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        # Endpoint -> recorded responses, newest first
+        self.files: dict[str, list[pathlib.Path]] = {}
+        stamped = []
+        for file in path.glob('*.json.gz'):
+            try:
+                stamp, name = file.name.removesuffix('.json.gz').split('.', 1)
+                stamped.append((int(stamp), '/' + name, file))
+
+            except ValueError:
+                pass
+
+        for _, endpoint, file in sorted(stamped, reverse=True):
+            self.files.setdefault(endpoint, []).append(file)
+
+    def latest(self, endpoint: str) -> str | None:
+        """
+        Get the newest recorded response for an endpoint.
+
+        :param endpoint: The CAPI endpoint, e.g. '/profile'.
+        :return: The response body, or None if there isn't one.
+        """
+        for file in self.files.get(endpoint, []):
+            try:
+                return gzip.decompress(file.read_bytes()).decode(encoding='utf-8')
+
+            except (OSError, EOFError):
+                # Most likely pruned by EDMC since, so try the next newest
+                continue
+
+        return None
+
+
+faults = Faults()
+stats = RequestStats()
+capi_fixtures_path: pathlib.Path | None = None  # Directory of <endpoint>.json files to serve for CAPI
+capi_history: CAPIHistory | None = None  # Otherwise CAPI is answered from here
 
 
 class LoggingHandler(server.BaseHTTPRequestHandler):
@@ -27,10 +168,57 @@ class LoggingHandler(server.BaseHTTPRequestHandler):
         """Override default handler logger with EDMC logger."""
         logger.info(format % args)
 
+    def send_fault(self, method: str) -> bool:
+        """
+        Delay, and possibly fail, the current request as configured in `faults`.
+
+        :param method: The HTTP method, for the stats.
+        :return: True if a failure response was sent and the request is done with.
+        """
+        faults.delay()
+        if (status := faults.pick_status()) is None:
+            return False
+
+        self.send_body(method, status, json.dumps({'error': f'debug_webserver fault {status}'}))
+        return True
+
+    def send_body(self, method: str, status: int, body: str | None) -> None:
+        """Send a complete response, and count it."""
+        self.send_response_only(status)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body.encode())))
+
+        self.send_header('Date', self.date_time_string())
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body.encode())
+            self.wfile.flush()
+
+        stats.record(method, urlsplit(self.path).path, status)
+
+    def do_GET(self) -> None:  # noqa: N802 # I cant change it
+        """Handle GET, as CAPI would, or report request stats."""
+        path = urlsplit(self.path).path
+        if path == STATS_PATH:
+            self.send_body('GET', 200, json.dumps(stats.report()))
+            return
+
+        if self.send_fault('GET'):
+            return
+
+        if path not in CAPI_ENDPOINTS or (body := capi_fixture(path)) is None:
+            self.send_body('GET', 404, None)
+            return
+
+        self.send_body('GET', 200, body)
+
     def do_POST(self) -> None:  # noqa: N802 # I cant change it
         """Handle POST."""
         logger.info(f"Received a POST for {self.path!r}!")
         data_raw: bytes = self.rfile.read(int(self.headers['Content-Length']))
+        if self.send_fault('POST'):
+            return
 
         encoding = self.headers.get('Content-Encoding')
 
@@ -56,6 +244,8 @@ class LoggingHandler(server.BaseHTTPRequestHandler):
             self.wfile.write(response.encode())
             self.wfile.flush()
 
+        stats.record('POST', self.path, 200)
+
         if target_path == 'edsm':
             # attempt to extract data from urlencoded stream
             try:
@@ -99,6 +289,27 @@ class LoggingHandler(server.BaseHTTPRequestHandler):
         return ret.decode('utf-8', errors='replace')
 
 
+def capi_fixture(endpoint: str) -> str | None:
+    """
+    Find a recorded response to serve for a CAPI endpoint.
+
+    `capi_fixtures_path`, if set, is checked first for `<endpoint>.json`,
+    otherwise the latest response in `capi_history`, if set, is used.
+
+    :param endpoint: The CAPI endpoint, e.g. '/profile'.
+    :return: The response body, or None if there's nothing recorded.
+    """
+    if capi_fixtures_path is not None:
+        fixture = capi_fixtures_path / f'{endpoint.lstrip("/")}.json'
+        if fixture.is_file():
+            return fixture.read_text(encoding='utf-8')
+
+    if capi_history is None:
+        return None
+
+    return capi_history.latest(endpoint)
+
+
 def safe_file_name(name: str):
     """
     Escape special characters out of a file name.
@@ -162,15 +373,60 @@ DEFAULT_RESPONSES = {
 }
 
 
-def run_listener(host: str = "127.0.0.1", port: int = 9090) -> None:
-    """Run a listener thread."""
+def run_listener(
+    host: str = "127.0.0.1", port: int = 9090, capi_history_path: pathlib.Path | None = None
+) -> server.ThreadingHTTPServer | None:
+    """
+    Run a listener thread.
+
+    :param host: Address to listen on.
+    :param port: Port to listen on.
+    :param capi_history_path: Directory of recorded CAPI responses to answer CAPI queries from.
+    :return: The listener, or None if it couldn't be started.
+    """
+    global capi_history
+    if capi_history_path is not None:
+        capi_history = CAPIHistory(capi_history_path)
+
     output_data_path.mkdir(exist_ok=True)
     logger.info(f'Starting HTTP listener on {host=} {port=}!')
-    listener = server.HTTPServer((host, port), LoggingHandler)
+    try:
+        # Threaded, so that configured latency doesn't also serialise requests
+        listener = server.ThreadingHTTPServer((host, port), LoggingHandler)
+
+    except OSError as e:
+        # Most likely a stand-alone instance, with faults configured, is already running.
+        logger.warning(f'Unable to listen on {host}:{port}, assuming a debug webserver is already running: {e!r}')
+        return None
+
+    listener.daemon_threads = True
     logger.info(listener)
     threading.Thread(target=listener.serve_forever, daemon=True).start()
+    return listener
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local stand-in for CAPI, EDDN, EDSM and Inara')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to delay every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds of delay')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of requests to answer 429')
+    parser.add_argument('--maintenance-rate', type=float, default=0.0, help='share of requests to answer 418')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests to answer 5xx')
+    parser.add_argument('--capi-fixtures', type=pathlib.Path, help='directory of <endpoint>.json CAPI responses')
+    parser.add_argument(
+        '--capi-history', type=pathlib.Path, default=config.app_dir_path / CAPI_HISTORY_DIRNAME,
+        help='directory of recorded CAPI responses, used when there is no fixture (read only)'
+    )
+    args = parser.parse_args()
+
+    faults = Faults(args.latency, args.jitter, args.rate_limit_rate, args.maintenance_rate, args.error_rate)
+    capi_fixtures_path = args.capi_fixtures
+    capi_history = CAPIHistory(args.capi_history)
     output_data_path.mkdir(exist_ok=True)
-    server.HTTPServer(("127.0.0.1", 9090), LoggingHandler).serve_forever()
+    try:
+        server.ThreadingHTTPServer((args.host, args.port), LoggingHandler).serve_forever()
+
+    except KeyboardInterrupt:
+        print(json.dumps(stats.report(), indent=2))
@@ -619,3 +619,5 @@ for lang in __keys:
 # Local webserver for debugging. See implementation in debug_webserver.py
 DEBUG_WEBSERVER_HOST = '127.0.0.1'
 DEBUG_WEBSERVER_PORT = 9090
+# Directory, in the app directory, of recorded raw CAPI responses.  See companion.CAPIDataRawStore
+CAPI_HISTORY_DIRNAME = 'capi_history'
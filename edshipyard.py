@@ -32,6 +32,20 @@ with open(ships_file, encoding="utf-8") as ships_file_handle:
     ships = json.load(ships_file_handle)
 
 
+def reload_ships() -> None:
+    """
+    Reload ships from ships.json, e.g. after it has been updated.
+
+    The dict is updated in place, as it's imported by name elsewhere.
+    """
+    with open(config.app_dir_path / "ships.json", encoding="utf-8") as handle:
+        new_ships = json.load(handle)
+
+    ships.update(new_ships)
+    for stale in ships.keys() - new_ships.keys():
+        del ships[stale]
+
+
 def export(data, filename=None) -> None:  # noqa: C901, CCR001
     """
     Export ship loadout in E:D Shipyard plain text format.
@@ -8,6 +8,7 @@ See LICENSE file.
 from __future__ import annotations
 
 import json
+import pathlib
 import threading
 from copy import deepcopy
 from typing import (
@@ -26,6 +27,11 @@ logger = EDMCLogging.get_main_logger()
 OLD_KILLSWITCH_URL = 'https://raw.githubusercontent.com/EDCD/EDMarketConnector/releases/killswitches.json'
 DEFAULT_KILLSWITCH_URL = 'https://raw.githubusercontent.com/EDCD/EDMarketConnector/releases/killswitches_v2.json'
 CURRENT_KILLSWITCH_VERSION = 2
+# The last successfully fetched kill switches are kept here, in the app dir,
+# so that startup doesn't need to wait on the network for them.
+CACHE_FILENAME = 'killswitches_cache.json'
+# How often, in seconds, to re-fetch the kill switches during a session.
+REFRESH_INTERVAL = 60 * 60
 UPDATABLE_DATA = Union[Mapping, Sequence]  # Have to keep old-style
 _current_version: semantic_version.Version = config.appversion_nobuild()
 
@@ -437,11 +443,15 @@ def parse_kill_switches(data: KillSwitchJSONFile) -> list[KillSwitches]:
     return out
 
 
-def get_kill_switches(target=DEFAULT_KILLSWITCH_URL, fallback: str | None = None) -> KillSwitchSet | None:
+def get_kill_switches(
+    target=DEFAULT_KILLSWITCH_URL, fallback: str | None = None, cache_path: pathlib.Path | None = None
+) -> KillSwitchSet | None:
     """
     Get a kill switch set object.
 
     :param target: the URL to fetch the killswitch JSON from, defaults to DEFAULT_KILLSWITCH_URL
+    :param fallback: URL to try if `target` can't be fetched, defaults to None
+    :param cache_path: If given, successfully fetched JSON is stored here for `load_cached_kill_switches()`
     :return: the KillSwitchSet for the URL, or None if there was an error
     """
     if (data := fetch_kill_switches(target)) is None:
@@ -453,11 +463,16 @@ def get_kill_switches(target=DEFAULT_KILLSWITCH_URL, fallback: str | None = None
             logger.warning('Could not get killswitches.')
             return None
 
-    return KillSwitchSet(parse_kill_switches(data))
+    kill_switches = KillSwitchSet(parse_kill_switches(data))
+    if cache_path is not None:
+        _write_cache(cache_path, data)
+
+    return kill_switches
 
 
 def get_kill_switches_thread(
     target, callback: Callable[[KillSwitchSet | None], None], fallback: str | None = None,
+    cache_path: pathlib.Path | None = None,
 ) -> None:
     """
     Threaded version of get_kill_switches. Request is performed off thread, and callback is called when it is available.
@@ -465,36 +480,116 @@ def get_kill_switches_thread(
     :param target: Target killswitch file
     :param callback: The callback to pass the newly created KillSwitchSet
     :param fallback: Fallback killswitch file, if any, defaults to None
+    :param cache_path: Where to cache the fetched JSON, if anywhere, defaults to None
     """
     def make_request():
-        callback(get_kill_switches(target, fallback=fallback))
+        callback(get_kill_switches(target, fallback=fallback, cache_path=cache_path))
 
-    threading.Thread(target=make_request, daemon=True).start()
+    threading.Thread(target=make_request, name='killswitch fetch', daemon=True).start()
 
 
-active: KillSwitchSet = KillSwitchSet([])
+def _write_cache(cache_path: pathlib.Path, data: KillSwitchJSONFile) -> None:
+    """Atomically replace the kill switch cache file with the given JSON."""
+    tmp_path = cache_path.with_suffix('.tmp')
+    try:
+        tmp_path.write_text(json.dumps(data), encoding='utf-8')
+        tmp_path.replace(cache_path)
 
+    except OSError as e:
+        logger.warning(f'Unable to write killswitch cache {cache_path}: {e}')
 
-def setup_main_list(filename: str | None):
+
+def load_cached_kill_switches(cache_path: pathlib.Path) -> KillSwitchSet | None:
     """
-    Set up the global set of kill switches for querying.
+    Load the kill switches cached by the last successful fetch.
 
-    Plugins should NOT call this EVER.
+    :param cache_path: The cache file
+    :return: the cached KillSwitchSet, or None if there is no usable cache
     """
-    if filename is None:
-        filename = DEFAULT_KILLSWITCH_URL
+    try:
+        data = json.loads(cache_path.read_text(encoding='utf-8'))
+        return KillSwitchSet(parse_kill_switches(data))
 
-    if (data := get_kill_switches(filename, OLD_KILLSWITCH_URL)) is None:
-        logger.warning("Unable to fetch kill switches. Setting global set to an empty set")
-        return
+    except FileNotFoundError:
+        return None
 
+    except Exception as e:
+        logger.warning(f'Ignoring unusable killswitch cache {cache_path}: {e}')
+        return None
+
+
+active: KillSwitchSet = KillSwitchSet([])
+_refresh_timer: threading.Timer | None = None
+
+
+def _set_active(new: KillSwitchSet) -> None:
+    """Replace the global set of kill switches.  A single assignment, so safe from any thread."""
     global active
-    active = data
+    active = new
     logger.trace(f'{len(active.kill_switches)} Active Killswitches:')
     for v in active.kill_switches:
         logger.trace(v)
 
 
+def setup_main_list(filename: str | None, refresh_interval: float | None = REFRESH_INTERVAL):
+    """
+    Set up the global set of kill switches for querying.
+
+    For the default URL the last successfully fetched set is loaded from the
+    cache immediately, and a fresh copy is then fetched in the background,
+    and re-fetched every `refresh_interval` seconds.  Each successful fetch
+    replaces the global set.
+
+    Plugins should NOT call this EVER.
+    :param filename: Location to fetch the kill switches from, or None for the default.
+    :param refresh_interval: Seconds between background re-fetches, or None for only the initial one.
+    """
+    if filename is not None:
+        # An explicit, typically local, file is being tested, so don't mix in any cached or remote state
+        if (data := get_kill_switches(filename, OLD_KILLSWITCH_URL)) is None:
+            logger.warning("Unable to fetch kill switches. Setting global set to an empty set")
+            return
+
+        _set_active(data)
+        return
+
+    cache_path = config.config.app_dir_path / CACHE_FILENAME
+
+    def fetched(data: KillSwitchSet | None) -> None:
+        if data is None:
+            logger.warning('Unable to fetch kill switches, keeping the current set')
+
+        else:
+            _set_active(data)
+
+        schedule_refresh()
+
+    def refresh() -> None:
+        get_kill_switches_thread(DEFAULT_KILLSWITCH_URL, fetched, fallback=OLD_KILLSWITCH_URL, cache_path=cache_path)
+
+    def schedule_refresh() -> None:
+        global _refresh_timer
+        if refresh_interval is not None and not config.config.shutting_down:
+            _refresh_timer = threading.Timer(refresh_interval, refresh)
+            _refresh_timer.daemon = True
+            _refresh_timer.start()
+
+    if (cached := load_cached_kill_switches(cache_path)) is not None:
+        logger.info('Using cached kill switches until a fresh copy is fetched')
+        _set_active(cached)
+        refresh()
+        return
+
+    # With nothing cached, e.g. first run, don't start up without them if we can help it
+    if (data := get_kill_switches(DEFAULT_KILLSWITCH_URL, OLD_KILLSWITCH_URL, cache_path=cache_path)) is None:
+        logger.warning("Unable to fetch kill switches. Setting global set to an empty set")
+
+    else:
+        _set_active(data)
+
+    schedule_refresh()
+
+
 def get_disabled(id: str, *, version: semantic_version.Version = _current_version) -> DisabledResult:
     """
     Query the global KillSwitchSet for whether or not a given ID is disabled.
@@ -10,13 +10,15 @@ Localization with gettext is a pain on non-Unix systems.
 """
 from __future__ import annotations
 
+import hashlib
 import locale
+import marshal
 import numbers
 import re
 import sys
 from contextlib import suppress
 from os import listdir, sep
-from typing import TextIO, cast
+from typing import Any, TextIO, cast
 from collections.abc import Iterable
 import pathlib
 from config import config, IS_FROZEN
@@ -34,6 +36,8 @@ logger = get_main_logger()
 # Language name
 LANGUAGE_ID = '!Language'
 LOCALISATION_DIR: pathlib.Path = pathlib.Path('L10n')
+CATALOGUE_SUFFIX = '.catalogue'
+CATALOGUE_VERSION = 1
 
 if sys.platform == 'win32':
     import ctypes
@@ -49,6 +53,118 @@ if sys.platform == 'win32':
     GetUserPreferredUILanguages.restype = BOOL
 
 
+class Catalogue:
+    """
+    Pre-parsed translation tables for one language, loaded in a single read.
+
+    Tables are keyed by plugin name, or `''` for EDMC's own, and stored with
+    the mtime, size and hash of the .strings file they were parsed from.  A
+    table is only used while its source still matches, otherwise the source is
+    parsed again and the catalogue marked for saving.  If only the mtime
+    differs, e.g. after the files were copied by an installer, the hash decides.
+    """
+
+    def __init__(self, path: pathlib.Path, fallback: pathlib.Path | None = None) -> None:
+        """
+        Load a catalogue.
+
+        :param path: Where the catalogue is saved.
+        :param fallback: A catalogue to start from if there isn't one at `path` yet, e.g. one made at build time.
+        """
+        self.path = path
+        self.dirty = False
+        self.tables: dict[str, tuple[int, int, bytes, dict[str, str]]] = {}
+        for candidate in (path, fallback):
+            if candidate is not None and (tables := self.read(candidate)) is not None:
+                self.tables = tables
+                break
+
+    @staticmethod
+    def read(path: pathlib.Path) -> dict[str, Any] | None:
+        """
+        Read a catalogue file.
+
+        :param path: The file.
+        :return: The tables, or `None` if the file is missing, unreadable or from another version.
+        """
+        try:
+            version, tables = marshal.loads(path.read_bytes())
+
+        except FileNotFoundError:
+            return None
+
+        except Exception as e:
+            logger.debug(f'Ignoring unreadable translation catalogue {path}: {e!r}')
+            return None
+
+        return tables if version == CATALOGUE_VERSION else None
+
+    @staticmethod
+    def digest(data: bytes) -> bytes:
+        """Hash the contents of a .strings file."""
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, key: str, source: pathlib.Path) -> dict[str, str] | None:
+        """
+        Get a table, if it's still what parsing its source would give.
+
+        :param key: The plugin name, or `''`.
+        :param source: The .strings file.
+        :return: The table, or `None` if the source needs parsing.
+        """
+        if (entry := self.tables.get(key)) is None:
+            return None
+
+        mtime, size, digest, table = entry
+        try:
+            stat = source.stat()
+            if stat.st_size != size:
+                return None
+
+            if stat.st_mtime_ns != mtime:
+                if self.digest(source.read_bytes()) != digest:
+                    return None
+
+                self.tables[key] = (stat.st_mtime_ns, size, digest, table)
+                self.dirty = True
+
+        except OSError:
+            return None
+
+        return table
+
+    def put(self, key: str, source: pathlib.Path, table: dict[str, str]) -> None:
+        """
+        Store a freshly parsed table.
+
+        :param key: The plugin name, or `''`.
+        :param source: The .strings file it was parsed from.
+        :param table: The table.
+        """
+        try:
+            stat = source.stat()
+            self.tables[key] = (stat.st_mtime_ns, stat.st_size, self.digest(source.read_bytes()), table)
+            self.dirty = True
+
+        except OSError:
+            self.tables.pop(key, None)
+
+    def save(self) -> None:
+        """Write the catalogue out, if anything's changed."""
+        if not self.dirty:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_bytes(marshal.dumps((CATALOGUE_VERSION, self.tables)))
+            tmp.replace(self.path)
+            self.dirty = False
+
+        except OSError as e:
+            logger.warning(f'Could not save translation catalogue {self.path}: {e!r}')
+
+
 class Translations:
     """
     The Translation System.
@@ -66,8 +182,27 @@ class Translations:
     TRANS_RE = re.compile(r'\s*"((?:[^"]|\")+)"\s*=\s*"((?:[^"]|\")+)"\s*;\s*$')
     COMMENT_RE = re.compile(r'\s*/\*.*\*/\s*$')
 
+    catalogue_dir: pathlib.Path | None = None  # Where to keep catalogues, if not in the app dir
+
     def __init__(self) -> None:
         self.translations: dict[str | None, dict[str, str]] = {None: {}}
+        self._catalogues: dict[str, Catalogue] = {}
+        # Parsed .strings files by (lang, plugin L10n path), for overridden languages and available_names()
+        self._contents: dict[tuple[str, pathlib.Path | None], dict[str, str]] = {}
+        self._available: set[str] | None = None
+        self._installed: str | None = None  # Only this language's catalogue is saved, besides at build time
+        # Plugin name and L10n path by the `context` passed to translate()
+        self._plugins: dict[str, tuple[str, pathlib.Path]] = {}
+
+    def clear_cache(self) -> None:
+        """Forget everything read from the L10n directories, so it's read afresh when next needed."""
+        if self._installed:
+            self.save_catalogues((self._installed,))
+
+        self._catalogues.clear()
+        self._contents.clear()
+        self._available = None
+        self._plugins.clear()
 
     def install_dummy(self) -> None:
         """
@@ -76,6 +211,7 @@ class Translations:
         Use when translation is not desired or not available
         """
         self.translations = {None: {}}
+        self._installed = None
 
     def install(self, lang: str | None = None) -> None:  # noqa: CCR001
         """
@@ -83,6 +219,7 @@ class Translations:
 
         :param lang: The language to translate to, defaults to the preferred language
         """
+        self.clear_cache()
         available: set[str] = self.available()
         available.add(Translations.FALLBACK)
         if not lang:
@@ -118,10 +255,65 @@ class Translations:
                 except Exception:
                     logger.exception(f'Exception occurred while parsing {lang}.strings in plugin {plugin}')
 
+        self._installed = lang
+        self.save_catalogues((lang,))
+
     def contents(self, lang: str, plugin_path: pathlib.Path | None = None) -> dict[str, str]:
-        """Load all the translations from a translation file."""
+        """
+        Load all the translations from a translation file.
+
+        Each file is only parsed once, until the next `install()` or `clear_cache()`.
+
+        :param lang: The language.
+        :param plugin_path: A plugin's L10n directory, or `None` for EDMC's own.
+        :return: The translations, which must not be modified.
+        """
+        if (translations := self._contents.get((lang, plugin_path))) is not None:
+            return translations
+
         if lang not in self.available() and lang != self.FALLBACK:  # Because "en" doesn't appear in self.available()
             raise KeyError(f'Language {lang} not available')
+
+        translations = self._parse(lang, plugin_path)
+        self._contents[(lang, plugin_path)] = translations
+        return translations
+
+    def catalogue(self, lang: str) -> Catalogue:
+        """
+        Get the catalogue of pre-parsed tables for a language.
+
+        :param lang: The language.
+        :return: The catalogue, loaded from the app dir, or as shipped, if there is one.
+        """
+        if (catalogue := self._catalogues.get(lang)) is None:
+            directory = self.catalogue_dir or config.app_dir_path / 'l10n'
+            catalogue = self._catalogues[lang] = Catalogue(
+                directory / f'{lang}{CATALOGUE_SUFFIX}', self.respath() / f'{lang}{CATALOGUE_SUFFIX}'
+            )
+
+        return catalogue
+
+    def save_catalogues(self, langs: Iterable[str] | None = None) -> None:
+        """
+        Save any catalogues that had to be updated.
+
+        :param langs: Only save the catalogues for these languages, defaults to all of them.
+        """
+        for lang, catalogue in self._catalogues.items():
+            if langs is None or lang in langs:
+                catalogue.save()
+
+    def _parse(self, lang: str, plugin_path: pathlib.Path | None) -> dict[str, str]:
+        key = plugin_path.parent.name if plugin_path else ''
+        source = (plugin_path or self.respath()) / f'{lang}.strings'
+        catalogue = self.catalogue(lang)
+        if (translations := catalogue.get(key, source)) is None:
+            translations = self._read(lang, plugin_path)
+            catalogue.put(key, source, translations)
+
+        return translations
+
+    def _read(self, lang: str, plugin_path: pathlib.Path | None) -> dict[str, str]:
         translations = {}
 
         h = self.file(lang, plugin_path)
@@ -162,9 +354,12 @@ class Translations:
         plugin_path: pathlib.Path | None = None
 
         if context:
-            # TODO: There is probably a better way to go about this now.
-            plugin_name = context[len(config.plugin_dir)+1:].split(sep)[0]
-            plugin_path = config.plugin_dir_path / plugin_name / LOCALISATION_DIR
+            if (plugin := self._plugins.get(context)) is None:
+                # TODO: There is probably a better way to go about this now.
+                plugin_name = context[len(config.plugin_dir)+1:].split(sep)[0]
+                plugin = self._plugins[context] = (plugin_name, config.plugin_dir_path / plugin_name / LOCALISATION_DIR)
+
+            plugin_name, plugin_path = plugin
 
         if lang:
             contents: dict[str, str] = self.contents(lang=lang, plugin_path=plugin_path)
@@ -190,11 +385,11 @@ class Translations:
 
     def available(self) -> set[str]:
         """Return a list of available language codes."""
-        path = self.respath()
+        if self._available is None:
+            path = self.respath()
+            self._available = {x[:-len('.strings')] for x in listdir(path) if x.endswith('.strings')}
 
-        available = {x[:-len('.strings')] for x in listdir(path) if x.endswith('.strings')}
-
-        return available
+        return set(self._available)
 
     def available_names(self) -> dict[str | None, str]:
         """Available language names by code."""
@@ -331,3 +526,20 @@ class _Locale:
 # singletons
 Locale = _Locale()
 translations = Translations()
+
+
+def compile_catalogues() -> list[pathlib.Path]:
+    """
+    Pre-parse all of EDMC's .strings files into catalogues alongside them.
+
+    Used at build time, so that a fresh install doesn't need to parse them.
+
+    :return: The catalogue files.
+    """
+    compiler = Translations()
+    compiler.catalogue_dir = compiler.respath()
+    for lang in compiler.available():
+        compiler.contents(lang)
+
+    compiler.save_catalogues()
+    return sorted(compiler.respath().glob(f'*{CATALOGUE_SUFFIX}'))
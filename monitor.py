@@ -14,12 +14,11 @@ import re
 import sys
 import threading
 from calendar import timegm
-from collections import defaultdict
 from os import SEEK_END, SEEK_SET, listdir
 from os.path import basename, expanduser, getctime, isdir, join
 from time import gmtime, localtime, mktime, sleep, strftime, strptime, time
-from typing import TYPE_CHECKING, Any, BinaryIO
-from collections.abc import MutableMapping
+from typing import TYPE_CHECKING, Any, BinaryIO, TypeVar
+from collections.abc import Mapping, MutableMapping
 import psutil
 import semantic_version
 import util_ships
@@ -36,6 +35,90 @@ logger = get_main_logger()
 STARTUP = 'journal.startup'
 MAX_NAVROUTE_DISCREPANCY = 5  # Timestamp difference in seconds
 MAX_FCMATERIALS_DISCREPANCY = 5  # Timestamp difference in seconds
+STATE_SIZE_WARN = 8 * 1024 * 1024  # Warn if monitor.state grows beyond this many bytes
+# Keys in monitor.state holding the contents of the game's separate .json files, as read.  These are shared
+# between plugins rather than being copied for each of them.
+RAW_JSON_KEYS = ('CargoJSON', 'ShipLockerJSON', 'BackpackJSON', 'ModuleInfo', 'NavRoute')
+_RawJSON = TypeVar('_RawJSON', bound=Mapping[str, Any])
+
+
+class ItemCounts(dict):
+    """
+    Counts of commodities, materials or microresources, keyed by canonical name.
+
+    A drop-in for `defaultdict(int)`, except that looking up something we don't have gives 0 without
+    storing it, and a count that falls to zero or below is removed.  So these only ever hold what is actually
+    on hand, however many plugins go looking for other things in them.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args: Any, **kwargs: int) -> None:
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def __missing__(self, key: str) -> int:
+        return 0
+
+    def __setitem__(self, key: str, count: int) -> None:
+        # Every other way of storing a count comes through here
+        if count > 0:
+            super().__setitem__(key, count)
+
+        else:
+            self.pop(key, None)
+
+    def update(self, *args: Any, **kwargs: int) -> None:  # type: ignore[override]
+        """Set counts as `dict.update()` does, removing any that are zero or below."""
+        for key, count in dict(*args, **kwargs).items():
+            self[key] = count
+
+    def setdefault(self, key: str, default: int = 0) -> int:  # type: ignore[override]
+        """Get a count, first setting it to `default` if it isn't there.  A default of zero or below isn't stored."""
+        if key not in self:
+            self[key] = default
+            return default
+
+        return self[key]
+
+    def __or__(self, other: dict[str, int]) -> ItemCounts:  # type: ignore[override]
+        counts = ItemCounts(self)
+        counts.update(other)
+        return counts
+
+    def __ior__(self, other: dict[str, int]) -> ItemCounts:  # type: ignore[override]
+        self.update(other)
+        return self
+
+
+def state_size(state: MutableMapping[str, Any]) -> dict[str, int]:
+    """
+    Approximate the memory used by each key of monitor.state.
+
+    Objects shared between keys are only counted against the first of them.
+
+    :param state: The state dict.
+    :return: Bytes per key, largest first.
+    """
+    seen: set[int] = set()
+
+    def size(obj: Any) -> int:
+        if id(obj) in seen:
+            return 0
+
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sum(size(v) for v in obj)
+
+        return total
+
+    sizes = {key: size(value) for key, value in state.items()}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
 
 if sys.platform == 'win32':
     from watchdog.events import FileSystemEventHandler, FileSystemEvent
@@ -64,6 +147,7 @@ class EDLogs(FileSystemEventHandler):
     _RE_LOGFILE = re.compile(r'^Journal(Alpha|Beta)?\.[0-9]{2,4}(-)?[0-9]{2}(-)?[0-9]{2}(T)?[0-9]{2}[0-9]{2}[0-9]{2}'
                              r'\.[0-9]{2}\.log$')
     _RE_SHIP_ONFOOT = re.compile(r'^(FlightSuit|UtilitySuit_Class.|TacticalSuit_Class.|ExplorationSuit_Class.)$')
+    STATE_SIZE_INTERVAL = 60  # Minimum seconds between checks of how big monitor.state is
 
     def __init__(self) -> None:
         # TODO(A_D): A bunch of these should be switched to default values (eg '' for strings) and no longer be Optional
@@ -97,6 +181,7 @@ class EDLogs(FileSystemEventHandler):
         self.mode: str | None = None
         self.group: str | None = None
         self.cmdr: str | None = None
+        self.stationservices: list[str] | None = None  # From the latest Docked or Location event
         self.started: int | None = None  # Timestamp of the LoadGame event
         self.slef: str | None = None
 
@@ -105,6 +190,7 @@ class EDLogs(FileSystemEventHandler):
 
         self._fcmaterials_retries_remaining = 0
         self._last_fcmaterials_journal_timestamp: float | None = None
+        self._state_size_checked = 0.0
 
         # For determining Live versus Legacy galaxy.
         # The assumption is gameversion will parse via `coerce()` and always
@@ -121,15 +207,15 @@ class EDLogs(FileSystemEventHandler):
             'GameVersion':        None,  # From `Fileheader
             'GameBuild':          None,  # From `Fileheader
             'Captain':            None,  # On a crew
-            'Cargo':              defaultdict(int),
+            'Cargo':              ItemCounts(),
             'Credits':            None,
             'FID':                None,  # Frontier Cmdr ID
             'Horizons':           None,  # Does this user have Horizons?
             'Odyssey':            False,  # Have we detected we're running under Odyssey?
             'Loan':               None,
-            'Raw':                defaultdict(int),
-            'Manufactured':       defaultdict(int),
-            'Encoded':            defaultdict(int),
+            'Raw':                ItemCounts(),
+            'Manufactured':       ItemCounts(),
+            'Encoded':            ItemCounts(),
             'Engineers':          {},
             'Rank':               {},
             'Reputation':         {},
@@ -152,15 +238,15 @@ class EDLogs(FileSystemEventHandler):
             'Route':              None,  # Last plotted route from Route.json file
             'IsDocked':           False,  # Whether we think cmdr is docked
             'OnFoot':             False,  # Whether we think you're on-foot
-            'Component':          defaultdict(int),      # Odyssey Components in Ship Locker
-            'Item':               defaultdict(int),      # Odyssey Items in Ship Locker
-            'Consumable':         defaultdict(int),      # Odyssey Consumables in Ship Locker
-            'Data':               defaultdict(int),      # Odyssey Data in Ship Locker
+            'Component':          ItemCounts(),      # Odyssey Components in Ship Locker
+            'Item':               ItemCounts(),      # Odyssey Items in Ship Locker
+            'Consumable':         ItemCounts(),      # Odyssey Consumables in Ship Locker
+            'Data':               ItemCounts(),      # Odyssey Data in Ship Locker
             'BackPack':     {                      # Odyssey BackPack contents
-                'Component':      defaultdict(int),    # BackPack Components
-                'Consumable':     defaultdict(int),    # BackPack Consumables
-                'Item':           defaultdict(int),    # BackPack Items
-                'Data':           defaultdict(int),  # Backpack Data
+                'Component':      ItemCounts(),    # BackPack Components
+                'Consumable':     ItemCounts(),    # BackPack Consumables
+                'Item':           ItemCounts(),    # BackPack Items
+                'Data':           ItemCounts(),  # Backpack Data
             },
             'BackpackJSON':       None,  # Raw JSON from `Backpack.json` file, if available
             'ShipLockerJSON':     None,  # Raw JSON from the `ShipLocker.json` file, if available
@@ -389,7 +475,7 @@ class EDLogs(FileSystemEventHandler):
             navroute_data = self._parse_navroute_file()
             if navroute_data is not None:
                 # If it's NavRouteClear contents, just keep those anyway.
-                self.state['NavRoute'] = navroute_data
+                self.store_raw_json('NavRoute', navroute_data)
 
             self.catching_up = False
             log_pos = loghandle.tell()
@@ -1109,12 +1195,11 @@ class EDLogs(FileSystemEventHandler):
                             engineers[engineer] = entry['Progress']
 
             elif event_type == 'cargo' and entry.get('Vessel') == 'Ship':
-                self.state['Cargo'] = defaultdict(int)
+                self.state['Cargo'] = ItemCounts()
                 # From 3.3 full Cargo event (after the first one) is written to a separate file
                 if 'Inventory' not in entry:
                     with open(join(self.currentdir, 'Cargo.json'), 'rb') as h:  # type: ignore
-                        entry = json.load(h)
-                        self.state['CargoJSON'] = entry
+                        entry = self.store_raw_json('CargoJSON', json.load(h))
 
                 clean = self.coalesce_cargo(entry['Inventory'])
 
@@ -1148,8 +1233,7 @@ class EDLogs(FileSystemEventHandler):
                     attempts += 1
                     try:
                         with open(shiplocker_filename, 'rb') as h:
-                            entry = json.load(h)
-                            self.state['ShipLockerJSON'] = entry
+                            entry = self.store_raw_json('ShipLockerJSON', json.load(h))
                             break
 
                     except FileNotFoundError:
@@ -1170,10 +1254,10 @@ class EDLogs(FileSystemEventHandler):
                     logger.warning('ShipLocker event is missing at least one category')
 
                 # This event has the current totals, so drop any current data
-                self.state['Component'] = defaultdict(int)
-                self.state['Consumable'] = defaultdict(int)
-                self.state['Item'] = defaultdict(int)
-                self.state['Data'] = defaultdict(int)
+                self.state['Component'] = ItemCounts()
+                self.state['Consumable'] = ItemCounts()
+                self.state['Item'] = ItemCounts()
+                self.state['Data'] = ItemCounts()
 
                 clean_components = self.coalesce_cargo(entry['Components'])
                 self.state['Component'].update(
@@ -1233,9 +1317,8 @@ class EDLogs(FileSystemEventHandler):
                         logger.exception('Unable to parse Backpack.json')
 
                 if parsed is not None:
-                    entry = parsed  # set entry so that it ends up in plugins with the right data
-                    # Store in monitor.state
-                    self.state['BackpackJSON'] = entry
+                    # set entry so that it ends up in plugins with the right data, and store in monitor.state
+                    entry = self.store_raw_json('BackpackJSON', parsed)
 
                     # Assume this reflects the current state when written
                     self.backpack_set_empty()
@@ -1285,13 +1368,8 @@ class EDLogs(FileSystemEventHandler):
                         elif changes == 'Added':
                             self.state['BackPack'][category][name] += c['Count']
 
-                # Paranoia check to see if anything has gone negative.
-                # As of Odyssey Alpha Phase 1 Hotfix 2 keeping track of BackPack
-                # materials is impossible when used/picked up anyway.
-                for c in self.state['BackPack']:
-                    for m in self.state['BackPack'][c]:
-                        if self.state['BackPack'][c][m] < 0:
-                            self.state['BackPack'][c][m] = 0
+                # As of Odyssey Alpha Phase 1 Hotfix 2 keeping track of BackPack materials is impossible when
+                # used/picked up anyway, but ItemCounts never lets anything go negative.
 
             elif event_type == 'buymicroresources':
                 # From 4.0.0.400 we get an empty (see file) `ShipLocker` event,
@@ -1592,7 +1670,7 @@ class EDLogs(FileSystemEventHandler):
                         logger.exception('Failed decoding ModulesInfo.json')
 
                     else:
-                        self.state['ModuleInfo'] = entry
+                        self.store_raw_json('ModuleInfo', entry)
 
             elif event_type in ('collectcargo', 'marketbuy', 'buydrones', 'miningrefined'):
                 commodity = self.canonicalise(entry['Type'])
@@ -1608,8 +1686,6 @@ class EDLogs(FileSystemEventHandler):
                 commodity = self.canonicalise(entry['Type'])
                 cargo = self.state['Cargo']
                 cargo[commodity] -= entry.get('Count', 1)
-                if cargo[commodity] <= 0:
-                    cargo.pop(commodity)
 
                 if event_type == 'marketsell':
                     self.state['Credits'] += entry.get('TotalSale', 0)
@@ -1622,12 +1698,10 @@ class EDLogs(FileSystemEventHandler):
                     commodity = self.canonicalise(item['Name'])
                     cargo = self.state['Cargo']
                     cargo[commodity] -= item.get('Count', 1)
-                    if cargo[commodity] <= 0:
-                        cargo.pop(commodity)
 
             elif event_type == 'materials':
                 for category in ('Raw', 'Manufactured', 'Encoded'):
-                    self.state[category] = defaultdict(int)
+                    self.state[category] = ItemCounts()
                     self.state[category].update({
                         self.canonicalise(x['Name']): x['Count'] for x in entry.get(category, [])
                     })
@@ -1640,8 +1714,6 @@ class EDLogs(FileSystemEventHandler):
                 material = self.canonicalise(entry['Name'])
                 state_category = self.state[entry['Category']]
                 state_category[material] -= entry['Count']
-                if state_category[material] <= 0:
-                    state_category.pop(material)
 
             elif event_type == 'synthesis':
                 for category in ('Raw', 'Manufactured', 'Encoded'):
@@ -1649,8 +1721,6 @@ class EDLogs(FileSystemEventHandler):
                         material = self.canonicalise(x['Name'])
                         if material in self.state[category]:
                             self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
 
             elif event_type == 'materialtrade':
                 category = self.category(entry['Paid']['Category'])
@@ -1659,8 +1729,6 @@ class EDLogs(FileSystemEventHandler):
                 received = entry['Received']
 
                 state_category[paid['Material']] -= paid['Quantity']
-                if state_category[paid['Material']] <= 0:
-                    state_category.pop(paid['Material'])
 
                 category = self.category(received['Category'])
                 state_category[received['Material']] += received['Quantity']
@@ -1674,8 +1742,6 @@ class EDLogs(FileSystemEventHandler):
                         material = self.canonicalise(x['Name'])
                         if material in self.state[category]:
                             self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
 
                 module = self.state['Modules'][entry['Slot']]
                 if module['Item'] != self.canonicalise(entry['Module']):
@@ -1717,16 +1783,12 @@ class EDLogs(FileSystemEventHandler):
                 commodity = self.canonicalise(entry.get('Commodity'))
                 if commodity:
                     self.state['Cargo'][commodity] -= entry['Quantity']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
 
                 material = self.canonicalise(entry.get('Material'))
                 if material:
                     for category in ('Raw', 'Manufactured', 'Encoded'):
                         if material in self.state[category]:
                             self.state[category][material] -= entry['Quantity']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
 
             elif event_type == 'technologybroker':
                 for thing in entry.get('Ingredients', []):  # 3.01
@@ -1734,21 +1796,15 @@ class EDLogs(FileSystemEventHandler):
                         item = self.canonicalise(thing['Name'])
                         if item in self.state[category]:
                             self.state[category][item] -= thing['Count']
-                            if self.state[category][item] <= 0:
-                                self.state[category].pop(item)
 
                 for thing in entry.get('Commodities', []):  # 3.02
                     commodity = self.canonicalise(thing['Name'])
                     self.state['Cargo'][commodity] -= thing['Count']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
 
                 for thing in entry.get('Materials', []):  # 3.02
                     material = self.canonicalise(thing['Name'])
                     category = thing['Category']
                     self.state[category][material] -= thing['Count']
-                    if self.state[category][material] <= 0:
-                        self.state[category].pop(material)
 
             elif event_type == 'joinacrew':
                 self.state['Captain'] = entry['Captain']
@@ -1918,12 +1974,47 @@ class EDLogs(FileSystemEventHandler):
             if not suppress:
                 raise
 
+    def store_raw_json(self, key: str, data: _RawJSON) -> _RawJSON:
+        """
+        Store the contents of one of the game's .json files in monitor.state.
+
+        These are what monitor.state grows with, so its size is checked, at most every STATE_SIZE_INTERVAL
+        seconds, whenever one is stored.
+
+        :param key: One of RAW_JSON_KEYS.
+        :param data: The decoded file contents.
+        :return: `data`, so it can be passed on to plugins as the event as well.
+        """
+        self.state[key] = data
+        if time() - self._state_size_checked >= self.STATE_SIZE_INTERVAL:
+            self.log_state_size()
+
+        return data
+
+    def log_state_size(self) -> int:
+        """
+        Log the approximate memory used by monitor.state, warning if it's over STATE_SIZE_WARN.
+
+        :return: Total size in bytes.
+        """
+        self._state_size_checked = time()
+        sizes = state_size(self.state)
+        total = sum(sizes.values())
+        largest = ', '.join(f'{key}={size // 1024}KiB' for key, size in list(sizes.items())[:3])
+        if total > STATE_SIZE_WARN:
+            logger.warning(f'monitor.state is using {total // 1024}KiB, largest: {largest}')
+
+        else:
+            logger.debug(f'monitor.state is using {total // 1024}KiB, largest: {largest}')
+
+        return total
+
     def backpack_set_empty(self):
         """Set the BackPack contents to be empty."""
-        self.state['BackPack']['Component'] = defaultdict(int)
-        self.state['BackPack']['Consumable'] = defaultdict(int)
-        self.state['BackPack']['Item'] = defaultdict(int)
-        self.state['BackPack']['Data'] = defaultdict(int)
+        self.state['BackPack']['Component'] = ItemCounts()
+        self.state['BackPack']['Consumable'] = ItemCounts()
+        self.state['BackPack']['Item'] = ItemCounts()
+        self.state['BackPack']['Data'] = ItemCounts()
 
     def suit_sane_name(self, name: str) -> str:
         """
@@ -2509,7 +2600,7 @@ class EDLogs(FileSystemEventHandler):
         else:
             # everything is good, lets set what we need to and make sure we dont try again
             logger.info('Successfully read NavRoute file for last NavRoute event.')
-            self.state['NavRoute'] = file
+            self.store_raw_json('NavRoute', file)
 
         self._navroute_retries_remaining = 0
         self._last_navroute_journal_timestamp = None
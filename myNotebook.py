@@ -12,7 +12,6 @@ from __future__ import annotations
 import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import ImageGrab
 from l10n import translations as tr
 from collections.abc import Callable
 
@@ -107,6 +106,8 @@ class EntryMenu(ttk.Entry):
 
     def paste(self) -> None:
         """Paste the selected Entry text."""
+        from PIL import ImageGrab  # Only needed here, so not imported at startup
+
         try:
             # Attempt to grab an image from the clipboard (apprently also works for files)
             img = ImageGrab.grabclipboard()
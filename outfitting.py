@@ -37,6 +37,20 @@ logger = get_main_logger()
 moduledata: dict = {}
 
 
+def reload_moduledata() -> None:
+    """
+    (Re)load moduledata from modules.json.
+
+    The dict is updated in place, never being empty part way, so it can be
+    called when the file has been updated while in use.
+    """
+    modules_path = config.app_dir_path / "modules.json"
+    new_data = json.loads(modules_path.read_text())
+    moduledata.update(new_data)
+    for stale in moduledata.keys() - new_data.keys():
+        del moduledata[stale]
+
+
 def lookup(module, ship_map, entitled=False) -> dict | None:  # noqa: C901, CCR001
     """
     Produce a standard dict description of the given module.
@@ -55,8 +69,7 @@ def lookup(module, ship_map, entitled=False) -> dict | None:  # noqa: C901, CCR0
     """
     # Lazily populate
     if not moduledata:
-        modules_path = config.app_dir_path / "modules.json"
-        moduledata.update(json.loads(modules_path.read_text()))
+        reload_moduledata()
 
     if not module.get('name'):
         raise ValueError(f"Module with ID {module['id']} is missing a 'name' field")
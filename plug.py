@@ -8,22 +8,29 @@ See LICENSE file.
 from __future__ import annotations
 
 import copy
+import concurrent.futures
 import importlib.util
+import json
 import logging
 import operator
 import os
+import queue
 import sys
+import threading
+import time
 from dataclasses import dataclass, field
 import tkinter as tk
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from tkinter import ttk
+from types import MappingProxyType
 from typing import Any
-from collections.abc import Mapping, MutableMapping
+from collections.abc import Callable, Mapping, MutableMapping
 
 import companion
 import myNotebook as nb  # noqa: N813
 from config import config
+from monitor import RAW_JSON_KEYS
 from EDMCLogging import get_main_logger
 
 logger = get_main_logger()
@@ -33,6 +40,178 @@ PLUGINS = []
 PLUGINS_not_py3 = []
 PLUGINS_broken = []
 
+# Hook name -> (plugin, callable) for every loaded plugin that implements it,
+# in PLUGINS order.  Filled in by load_plugins() for the standard hooks, and
+# lazily for any other name asked of provides() or invoke().
+_hook_table: dict[str, list[tuple[Plugin, Callable]]] = {}
+# Plugin name -> Plugin, for invoke()
+_plugins_by_name: dict[str, Plugin] = {}
+# The hooks that are looked up on every event, so worth resolving up front
+HOOK_NAMES = (
+    'journal_entry', 'journal_entry_cqc', 'dashboard_entry', 'cmdr_data', 'cmdr_data_legacy',
+    'capi_fleetcarrier', 'prefs_changed', 'prefs_cmdr_changed', 'plugin_stop',
+)
+
+
+# A plugin callback taking longer than this will be logged as slow.  As they
+# run on the main thread the UI is frozen for that long.
+SLOW_CALLBACK_MS = 100
+# Hooks that are expected to take a while, so aren't counted or logged as slow.
+SLOW_EXEMPT_HOOKS = ('plugin_stop',)
+# Upper bounds, in milliseconds, of the callback duration histogram buckets.
+# Anything longer goes into a final, unbounded, bucket.
+TIMING_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+# Where the timings are dumped for the System Profiler to pick up
+TIMINGS_FILENAME = 'plugin_timings.json'
+# How many events can be waiting for a `plugin_threadsafe` plugin's worker
+# thread before further ones are dropped.
+WORKER_QUEUE_SIZE = 1000
+# How long, in seconds, to wait at shutdown for a worker to drain its queue.
+WORKER_STOP_TIMEOUT = 5
+# Maximum number of `plugin_start_threadsafe` plugins' plugin_start3() run at once.
+PLUGIN_START_WORKERS = 4
+
+
+@dataclass
+class HookTiming:
+    """Timing statistics for one plugin's implementation of one hook."""
+
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    slow: int = 0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(TIMING_BUCKETS_MS) + 1))
+
+    def record(self, elapsed_ms: float, check_slow: bool = True) -> bool:
+        """
+        Record a single call's duration.
+
+        :param elapsed_ms: How long the call took, in milliseconds.
+        :param check_slow: Whether the call counts as slow if it's over SLOW_CALLBACK_MS.
+        :returns: True if this was the first slow call.
+        """
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        first_slow = False
+        if check_slow and elapsed_ms > SLOW_CALLBACK_MS:
+            self.slow += 1
+            first_slow = self.slow == 1
+
+        for i, bound in enumerate(TIMING_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+        else:
+            self.buckets[-1] += 1
+
+        return first_slow
+
+    def as_dict(self) -> dict[str, Any]:
+        """Convert to a JSON-friendly dict, with the histogram keyed by bucket bound."""
+        labels = [f'<={bound}ms' for bound in TIMING_BUCKETS_MS] + [f'>{TIMING_BUCKETS_MS[-1]}ms']
+        return {
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'slow': self.slow,
+            'histogram': dict(zip(labels, self.buckets)),
+        }
+
+
+# Plugin name -> hook name -> timings.  Updated from PluginWorker threads too, so only under _timings_lock.
+plugin_timings: dict[str, dict[str, HookTiming]] = {}
+# Plugin name -> how long, in milliseconds, its import and plugin_start3() took
+plugin_load_timings: dict[str, dict[str, float]] = {}
+_timings_lock = threading.Lock()
+
+
+class PluginWorker:
+    """
+    Deliver events to a single `plugin_threadsafe` plugin on its own thread.
+
+    Events are queued, and so delivered, in the order they happen.  If the
+    plugin can't keep up, and the queue fills, new events are dropped rather
+    than blocking the main thread.
+    """
+
+    def __init__(self, plugin: Plugin, maxsize: int = WORKER_QUEUE_SIZE):
+        self.plugin = plugin
+        self.queue: queue.Queue[tuple[float, str, Callable, tuple] | None] = queue.Queue(maxsize)
+        self.delivered = 0
+        self.overflows = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.thread = threading.Thread(target=self._run, name=f'Plugin worker: {plugin.name}', daemon=True)
+        self.thread.start()
+
+    def submit(self, hook: str, func: Callable, *args: Any) -> None:
+        """
+        Queue a hook call for the worker thread.
+
+        :param hook: Name of the hook being called.
+        :param func: The plugin's implementation of the hook.
+        :param args: Arguments to pass to `func`.  These must not be modified after this call.
+        """
+        try:
+            self.queue.put_nowait((time.perf_counter(), hook, func, args))
+
+        except queue.Full:
+            self.overflows += 1
+            # Don't flood the log if a plugin is persistently behind
+            if self.overflows == 1 or self.overflows % 100 == 0:
+                logger.warning(
+                    f'Plugin "{self.plugin.name}" worker queue full, {hook}() event dropped'
+                    f' ({self.overflows} dropped in total)'
+                )
+
+    def stop(self, timeout: float = WORKER_STOP_TIMEOUT) -> None:
+        """
+        Ask the worker thread to exit once it has processed everything already queued, and wait for it.
+
+        :param timeout: Maximum time, in seconds, to wait.
+        """
+        try:
+            self.queue.put(None, timeout=timeout)
+
+        except queue.Full:
+            logger.warning(f'Plugin "{self.plugin.name}" worker queue still full, abandoning it')
+            return
+
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.warning(f'Plugin "{self.plugin.name}" worker did not stop within {timeout}s')
+
+    def stats(self) -> dict[str, Any]:
+        """Get the delivery statistics for this worker, in a JSON-friendly form."""
+        return {
+            'delivered': self.delivered,
+            'queued': self.queue.qsize(),
+            'overflows': self.overflows,
+            'mean_latency_ms': round(self.total_latency_ms / self.delivered, 3) if self.delivered else 0.0,
+            'max_latency_ms': round(self.max_latency_ms, 3),
+        }
+
+    def _run(self) -> None:
+        while (item := self.queue.get()) is not None:
+            queued_at, hook, func, args = item
+            latency_ms = (time.perf_counter() - queued_at) * 1000
+            self.delivered += 1
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            try:
+                error = _call_timed(self.plugin, hook, func, *args)
+                # There's no caller waiting on the result, so display any error directly
+                if error:
+                    show_error(error)
+
+            except Exception:
+                logger.exception(f'Plugin "{self.plugin.name}" failed in worker thread')
+
+        logger.debug(f'Plugin "{self.plugin.name}" worker thread exiting')
+
 
 # For asynchronous error display
 @dataclass
@@ -54,7 +233,8 @@ class Plugin:
         name: str,
         loadfile: Path | None,
         plugin_logger: logging.Logger | None,
-        internal: bool = False
+        internal: bool = False,
+        start_executor: concurrent.futures.Executor | None = None,
     ):
         """
         Load a single plugin.
@@ -63,18 +243,29 @@ class Plugin:
         :param loadfile: Full path/filename of the plugin.
         :param plugin_logger: The logging instance for this plugin to use.
         :param internal: True to use internal plugin loader logic. Defaults to False.
+        :param start_executor: If given, and the plugin is `plugin_start_threadsafe`, its
+          plugin_start3() is run on this instead, and `wait_started()` must be called.
         :raises Exception: Typically, ImportError or OSError
         """
         self.name: str = name  # Display name.
         self.folder: str | None = name  # basename of plugin folder. None for internal plugins.
         self.module = None  # None for disabled plugins.
         self.logger: logging.Logger | None = plugin_logger
+        # True if the plugin has declared it will not modify the event data it
+        # is passed, so it can share a single read-only snapshot per event.
+        self.readonly_data: bool = False
+        # True if the plugin has declared that its event hooks can be called from
+        # a thread other than the main one.  See PluginWorker.
+        self.threadsafe: bool = False
+        self.worker: PluginWorker | None = None
+        self._start_future: concurrent.futures.Future | None = None
 
         if not loadfile:
             logger.info(f'plugin {name} disabled')
             return
         logger.info(f'loading plugin "{name.replace(".", "_")}" from "{loadfile}"')
         try:
+            import_start = time.perf_counter()
             module = None
             if internal:
                 filename = ('plugin_' + name.encode('ascii', errors='replace').decode().
@@ -102,12 +293,14 @@ class Plugin:
                     else:
                         logger.error(f'Plugin "{name}" could not be loaded, even via fallback path.')
                         raise ImportError(f"Cannot load plugin {name} from {loadfile}")
+            import_ms = (time.perf_counter() - import_start) * 1000
             # Plugin startup logic
             if module:
                 if getattr(module, 'plugin_start3', None):
-                    newname = module.plugin_start3(Path(loadfile).resolve().parent)
-                    self.name = str(newname) if newname else self.name
-                    self.module = module
+                    if start_executor is not None and getattr(module, 'plugin_start_threadsafe', False):
+                        self._start_future = start_executor.submit(self._start, module, loadfile, import_ms)
+                    else:
+                        self._start(module, loadfile, import_ms)
                 elif getattr(module, 'plugin_start', None):
                     logger.warning(f'plugin {name} needs migrating\n')
                     PLUGINS_not_py3.append(self)
@@ -119,6 +312,36 @@ class Plugin:
             logger.exception(f': Failed for Plugin "{name}"')
             raise
 
+    def _start(self, module, loadfile: Path, import_ms: float) -> None:
+        """
+        Call the plugin's plugin_start3() and record it as successfully loaded.
+
+        :param module: The plugin's imported module.
+        :param loadfile: Full path/filename of the plugin.
+        :param import_ms: How long importing the module took, for the load timings.
+        """
+        start = time.perf_counter()
+        newname = module.plugin_start3(Path(loadfile).resolve().parent)
+        start_ms = (time.perf_counter() - start) * 1000
+        self.name = str(newname) if newname else self.name
+        self.module = module
+        self.readonly_data = bool(getattr(module, 'plugin_readonly_data', False))
+        self.threadsafe = bool(getattr(module, 'plugin_threadsafe', False))
+        with _timings_lock:
+            plugin_load_timings[self.name] = {'import_ms': round(import_ms, 3), 'start_ms': round(start_ms, 3)}
+
+        logger.debug(f'Plugin "{self.name}" import took {import_ms:.0f}ms, plugin_start3() {start_ms:.0f}ms')
+
+    def wait_started(self) -> None:
+        """
+        Wait for a plugin_start3() that was passed to an executor to complete.
+
+        :raises Exception: Whatever plugin_start3() raised.
+        """
+        if self._start_future is not None:
+            future, self._start_future = self._start_future, None
+            future.result()
+
     def _get_func(self, funcname: str):
         """
         Get a function from a plugin.
@@ -190,6 +413,7 @@ class Plugin:
 def load_plugins(master: tk.Tk) -> None:
     """Find and load all plugins."""
     last_error.root = master
+    load_start = time.perf_counter()
 
     internal = _load_internal_plugins()
     PLUGINS.extend(sorted(internal, key=lambda p: operator.attrgetter('name')(p).lower()))
@@ -200,6 +424,47 @@ def load_plugins(master: tk.Tk) -> None:
     found = _load_found_plugins()
     PLUGINS.extend(sorted(found, key=lambda p: operator.attrgetter('name')(p).lower()))
 
+    for plugin in PLUGINS:
+        if plugin.threadsafe and plugin.module is not None:
+            logger.info(f'Plugin "{plugin.name}" is thread-safe, delivering its events via a worker thread')
+            plugin.worker = PluginWorker(plugin)
+
+    _build_hook_table()
+    logger.info(f'Loaded {len(PLUGINS)} plugins in {(time.perf_counter() - load_start) * 1000:.0f}ms')
+    slowest = sorted(plugin_load_timings.items(), key=lambda item: -sum(item[1].values()))[:5]
+    logger.debug(f'Slowest plugins to load: {slowest}')
+
+
+def _build_hook_table() -> None:
+    """(Re)build the hook and plugin name lookup tables from PLUGINS."""
+    _hook_table.clear()
+    _plugins_by_name.clear()
+    for plugin in PLUGINS:
+        _plugins_by_name.setdefault(plugin.name, plugin)
+
+    for hook in HOOK_NAMES:
+        _subscribers(hook)
+
+
+def _subscribers(hook: str) -> list[tuple[Plugin, Callable]]:
+    """
+    Get the plugins which implement a hook, along with their implementation of it.
+
+    :param hook: Name of the hook function.
+    :returns: List of (plugin, function) tuples, in plugin load order.
+    """
+    subscribers = _hook_table.get(hook)
+    if subscribers is None:
+        subscribers = []
+        for plugin in PLUGINS:
+            func = plugin._get_func(hook)
+            if func:
+                subscribers.append((plugin, func))
+
+        _hook_table[hook] = subscribers
+
+    return subscribers
+
 
 def _load_internal_plugins():
     internal = []
@@ -226,27 +491,177 @@ def _load_found_plugins():
     plugin_files = sorted(config.plugin_dir_path.iterdir(), key=lambda p: (
         not (p / '__init__.py').is_file(), p.name.lower()))
 
-    for plugin_file in plugin_files:
-        name = plugin_file.name
-        if not (config.plugin_dir_path / name).is_dir() or name.startswith(('.', '_')):
-            pass
-        elif name.endswith('.disabled'):
-            name, discard = name.rsplit('.', 1)
-            found.append(Plugin(name, None, logger))
-        else:
-            try:
-                # Add plugin's folder to load path in case plugin has internal package dependencies
-                sys.path.append(str(config.plugin_dir_path / name))
-
-                import EDMCLogging
-                # Create a logger for this 'found' plugin.  Must be before the load.py is loaded.
-                plugin_logger = EDMCLogging.get_plugin_logger(name)
-                found.append(Plugin(name, config.plugin_dir_path / name / 'load.py', plugin_logger))
-            except Exception:
-                PLUGINS_broken.append(Plugin(name, None, logger))
-                logger.exception(f'Failure loading found Plugin "{name}"')
+    # Imports have to be done one at a time, in order, but the plugin_start3()
+    # of any `plugin_start_threadsafe` plugin can then run alongside the rest loading.
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=PLUGIN_START_WORKERS, thread_name_prefix='plugin_start3'
+    ) as start_executor:
+        for plugin_file in plugin_files:
+            name = plugin_file.name
+            if not (config.plugin_dir_path / name).is_dir() or name.startswith(('.', '_')):
                 pass
-    return found
+            elif name.endswith('.disabled'):
+                name, discard = name.rsplit('.', 1)
+                found.append(Plugin(name, None, logger))
+            else:
+                try:
+                    # Add plugin's folder to load path in case plugin has internal package dependencies
+                    sys.path.append(str(config.plugin_dir_path / name))
+
+                    import EDMCLogging
+                    # Create a logger for this 'found' plugin.  Must be before the load.py is loaded.
+                    plugin_logger = EDMCLogging.get_plugin_logger(name)
+                    found.append(
+                        Plugin(name, config.plugin_dir_path / name / 'load.py', plugin_logger,
+                               start_executor=start_executor)
+                    )
+                except Exception:
+                    PLUGINS_broken.append(Plugin(name, None, logger))
+                    logger.exception(f'Failure loading found Plugin "{name}"')
+                    pass
+
+    started = []
+    for plugin in found:
+        try:
+            plugin.wait_started()
+            started.append(plugin)
+
+        except Exception:
+            PLUGINS_broken.append(Plugin(plugin.folder or plugin.name, None, logger))
+            logger.exception(f'Failure loading found Plugin "{plugin.folder}"')
+
+    return started
+
+
+def _frozen(data: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Take a read-only, shallow snapshot of the given data.
+
+    The snapshot is built once per event and then shared between all plugins
+    that declared `plugin_readonly_data`, instead of each getting its own copy.
+    :param data: The mapping to snapshot.
+    :returns: A read-only view on a shallow copy of `data`.
+    """
+    return MappingProxyType(dict(data))
+
+
+def _copy_state(state: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Take a deep copy of monitor.state for a plugin.
+
+    The raw contents of the game's .json files are shared, as they are by the
+    shallow copies other hooks get, rather than copied again for every plugin.
+    :param state: monitor.state, or a test stand-in for it.
+    :returns: The copy.
+    """
+    memo = {id(state[key]): state[key] for key in RAW_JSON_KEYS if state.get(key) is not None}
+    return copy.deepcopy(dict(state), memo)
+
+
+def _call_timed(plugin: Plugin, hook: str, func: Callable, *args: Any) -> Any:
+    """
+    Call a plugin's hook function, recording how long it took.
+
+    Any exception is left for the caller to handle, the timing is still recorded.
+    :param plugin: The plugin being called.
+    :param hook: Name of the hook being called.
+    :param func: The plugin's implementation of the hook.
+    :param args: Arguments to pass to `func`.
+    :returns: Whatever `func` returns.
+    """
+    start = time.perf_counter()
+    try:
+        return func(*args)
+
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with _timings_lock:
+            timing = plugin_timings.setdefault(plugin.name, {}).setdefault(hook, HookTiming())
+            first_slow = timing.record(elapsed_ms, hook not in SLOW_EXEMPT_HOOKS)
+
+        # Only the first slow call is logged, a plugin that's always slow would otherwise flood the log.
+        # The rest are counted in the timings report.
+        if first_slow:
+            if plugin.worker is not None:
+                logger.warning(
+                    f'Plugin "{plugin.name}" took {elapsed_ms:.0f}ms in {hook}() on its worker thread,'
+                    f' over the {SLOW_CALLBACK_MS}ms threshold.  Further slow calls will not be logged.'
+                )
+
+            else:
+                logger.warning(
+                    f'Plugin "{plugin.name}" took {elapsed_ms:.0f}ms in {hook}(), over the {SLOW_CALLBACK_MS}ms'
+                    ' threshold.  The UI is unresponsive during this time.  Further slow calls will not be logged.'
+                )
+
+
+def _dispatch(plugin: Plugin, hook: str, func: Callable, *args: Any) -> Any:
+    """
+    Call a plugin's event hook, either directly or via its worker thread.
+
+    :param plugin: The plugin being called.
+    :param hook: Name of the hook being called.
+    :param func: The plugin's implementation of the hook.
+    :param args: Arguments to pass to `func`.  Must be private to this call, not shared with the caller.
+    :returns: Whatever `func` returns, or None if it was queued for the plugin's worker.
+    """
+    if plugin.worker is not None:
+        plugin.worker.submit(hook, func, *args)
+        return None
+
+    return _call_timed(plugin, hook, func, *args)
+
+
+def timings_report() -> dict[str, dict[str, dict[str, Any]]]:
+    """
+    Get the plugin callback timings gathered so far.
+
+    :returns: Plugin name -> hook name -> timing statistics, slowest plugins (by total time) first.
+    """
+    with _timings_lock:
+        report = {
+            name: {hook: timing.as_dict() for hook, timing in hooks.items()}
+            for name, hooks in plugin_timings.items()
+        }
+
+    return dict(
+        sorted(report.items(), key=lambda item: -sum(hook['total_ms'] for hook in item[1].values()))
+    )
+
+
+def dump_timings(path: Path | None = None) -> Path | None:
+    """
+    Write the plugin callback timings out as JSON.
+
+    :param path: File to write to.  Defaults to TIMINGS_FILENAME in the app directory.
+    :returns: The path written to, or None if it couldn't be written.
+    """
+    if path is None:
+        path = config.app_dir_path / TIMINGS_FILENAME
+
+    report = timings_report()
+    with _timings_lock:
+        load_timings = dict(plugin_load_timings)
+
+    try:
+        with open(path, 'w', encoding='utf-8') as timings_file:
+            json.dump(
+                {
+                    'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'slow_threshold_ms': SLOW_CALLBACK_MS,
+                    'plugins': report,
+                    'workers': {plugin.name: plugin.worker.stats() for plugin in PLUGINS if plugin.worker is not None},
+                    'load': load_timings,
+                },
+                timings_file,
+                indent=2,
+            )
+
+    except OSError:
+        logger.exception(f'Failed writing plugin timings to "{path}"')
+        return None
+
+    return path
 
 
 def provides(fn_name: str) -> list[str]:
@@ -257,7 +672,7 @@ def provides(fn_name: str) -> list[str]:
     :returns: list of names of plugins that provide this function
     .. versionadded:: 3.0.2
     """
-    return [p.name for p in PLUGINS if p._get_func(fn_name)]
+    return [plugin.name for plugin, _ in _subscribers(fn_name)]
 
 
 def invoke(
@@ -273,19 +688,22 @@ def invoke(
     :returns: return value from the function, or None if the function was not found
     .. versionadded:: 3.0.2
     """
-    for plugin in PLUGINS:
-        if plugin.name == plugin_name:
-            plugin_func = plugin._get_func(fn_name)
-            if plugin_func is not None:
-                return plugin_func(*args)
+    if not _plugins_by_name:
+        _build_hook_table()
 
-    for plugin in PLUGINS:
-        if plugin.name == fallback:
-            plugin_func = plugin._get_func(fn_name)
-            if not plugin_func:
-                raise ValueError(f"Fallback plugin '{plugin.name}' does not provide the function '{fn_name}'")
+    plugin = _plugins_by_name.get(plugin_name)
+    if plugin is not None:
+        plugin_func = plugin._get_func(fn_name)
+        if plugin_func is not None:
             return plugin_func(*args)
 
+    plugin = _plugins_by_name.get(fallback) if fallback is not None else None
+    if plugin is not None:
+        plugin_func = plugin._get_func(fn_name)
+        if not plugin_func:
+            raise ValueError(f"Fallback plugin '{plugin.name}' does not provide the function '{fn_name}'")
+        return plugin_func(*args)
+
     return None
 
 
@@ -297,29 +715,32 @@ def notify_stop() -> str | None:
     .. versionadded:: 2.3.7
     """
     error = None
+    # Let thread-safe plugins finish processing already queued events first
     for plugin in PLUGINS:
-        plugin_stop = plugin._get_func('plugin_stop')
-        if plugin_stop:
-            try:
-                logger.info(f'Asking plugin "{plugin.name}" to stop...')
-                newerror = plugin_stop()
-                error = error or newerror
-            except Exception:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+        if plugin.worker is not None:
+            logger.info(f'Stopping plugin "{plugin.name}" worker...')
+            plugin.worker.stop()
+
+    for plugin, plugin_stop in _subscribers('plugin_stop'):
+        try:
+            logger.info(f'Asking plugin "{plugin.name}" to stop...')
+            newerror = _call_timed(plugin, 'plugin_stop', plugin_stop)
+            error = error or newerror
+        except Exception:
+            logger.exception(f'Plugin "{plugin.name}" failed')
 
     logger.info('Done')
+    dump_timings()
 
     return error
 
 
 def _notify_prefs_plugins(fn_name: str, cmdr: str | None, is_beta: bool) -> None:
-    for plugin in PLUGINS:
-        prefs_callback = plugin._get_func(fn_name)
-        if prefs_callback:
-            try:
-                prefs_callback(cmdr, is_beta)
-            except Exception:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, prefs_callback in _subscribers(fn_name):
+        try:
+            _call_timed(plugin, fn_name, prefs_callback, cmdr, is_beta)
+        except Exception:
+            logger.exception(f'Plugin "{plugin.name}" failed')
 
 
 def notify_prefs_cmdr_changed(cmdr: str | None, is_beta: bool) -> None:
@@ -368,21 +789,34 @@ def notify_journal_entry(
     error = None
 
     if "timestamp" in entry and not config.skip_timecheck:
-        # Check that timestamp is recent enough
-        dt = datetime.strptime(entry["timestamp"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        # Check that timestamp is recent enough.  Journal timestamps are always
+        # UTC with a 'Z' suffix, which fromisoformat() handles far faster than strptime().
+        dt = datetime.fromisoformat(entry["timestamp"])
         if dt < datetime.now(timezone.utc) - timedelta(minutes=60):
             error = f"Event at {entry['timestamp']} beyond Time Delta of 60 minutes. Skipping."
             return error
 
-    for plugin in PLUGINS:
-        journal_entry = plugin._get_func('journal_entry')
-        if journal_entry:
-            try:
+    shared_entry: Mapping[str, Any] | None = None
+    shared_state: Mapping[str, Any] | None = None
+    for plugin, journal_entry in _subscribers('journal_entry'):
+        try:
+            if plugin.readonly_data:
+                if shared_entry is None or shared_state is None:
+                    shared_entry, shared_state = _frozen(entry), _frozen(state)
+
+                newerror = _dispatch(
+                    plugin, 'journal_entry', journal_entry, cmdr, is_beta, system, station, shared_entry, shared_state
+                )
+
+            else:
                 # Pass a copy of the journal entry in case the callee modifies it
-                newerror = journal_entry(cmdr, is_beta, system, station, dict(entry), dict(state))
-                error = error or newerror
-            except Exception:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+                newerror = _dispatch(
+                    plugin, 'journal_entry', journal_entry, cmdr, is_beta, system, station, dict(entry), dict(state)
+                )
+
+            error = error or newerror
+        except Exception:
+            logger.exception(f'Plugin "{plugin.name}" failed')
     return error
 
 
@@ -401,12 +835,26 @@ def notify_journal_entry_cqc(
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        cqc_callback = plugin._get_func('journal_entry_cqc')
-        if cqc_callback is not None and callable(cqc_callback):
+    shared_entry: Mapping[str, Any] | None = None
+    shared_state: Mapping[str, Any] | None = None
+    for plugin, cqc_callback in _subscribers('journal_entry_cqc'):
+        if callable(cqc_callback):
             try:
-                # Pass a copy of the journal entry in case the callee modifies it
-                newerror = cqc_callback(cmdr, is_beta, copy.deepcopy(entry), copy.deepcopy(state))
+                if plugin.readonly_data:
+                    if shared_entry is None or shared_state is None:
+                        shared_entry, shared_state = _frozen(entry), _frozen(state)
+
+                    newerror = _dispatch(
+                        plugin, 'journal_entry_cqc', cqc_callback, cmdr, is_beta, shared_entry, shared_state
+                    )
+
+                else:
+                    # Pass a copy of the journal entry in case the callee modifies it
+                    newerror = _dispatch(
+                        plugin, 'journal_entry_cqc', cqc_callback,
+                        cmdr, is_beta, copy.deepcopy(entry), _copy_state(state)
+                    )
+
                 error = error or newerror
 
             except Exception:
@@ -425,15 +873,22 @@ def notify_dashboard_entry(cmdr: str, is_beta: bool, entry: MutableMapping[str,
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        status = plugin._get_func('dashboard_entry')
-        if status:
-            try:
+    shared_entry: Mapping[str, Any] | None = None
+    for plugin, status in _subscribers('dashboard_entry'):
+        try:
+            if plugin.readonly_data:
+                if shared_entry is None:
+                    shared_entry = _frozen(entry)
+
+                newerror = _dispatch(plugin, 'dashboard_entry', status, cmdr, is_beta, shared_entry)
+
+            else:
                 # Pass a copy of the status entry in case the callee modifies it
-                newerror = status(cmdr, is_beta, dict(entry))
-                error = error or newerror
-            except Exception:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+                newerror = _dispatch(plugin, 'dashboard_entry', status, cmdr, is_beta, dict(entry))
+
+            error = error or newerror
+        except Exception:
+            logger.exception(f'Plugin "{plugin.name}" failed')
     return error
 
 
@@ -446,17 +901,15 @@ def notify_capidata(data: companion.CAPIData, is_beta: bool) -> str | None:
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        # TODO: Handle it being Legacy data
-        cmdr_data = plugin._get_func('cmdr_data_legacy' if data.source_host == companion.SERVER_LEGACY else 'cmdr_data')
-
-        if cmdr_data:
-            try:
-                newerror = cmdr_data(data, is_beta)
-                error = error or newerror
+    # TODO: Handle it being Legacy data
+    hook = 'cmdr_data_legacy' if data.source_host == companion.SERVER_LEGACY else 'cmdr_data'
+    for plugin, cmdr_data in _subscribers(hook):
+        try:
+            newerror = _dispatch(plugin, hook, cmdr_data, data, is_beta)
+            error = error or newerror
 
-            except Exception:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+        except Exception:
+            logger.exception(f'Plugin "{plugin.name}" failed')
 
     return error
 
@@ -469,12 +922,15 @@ def notify_capi_fleetcarrierdata(data: companion.CAPIData) -> str | None:
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        fc_callback = plugin._get_func('capi_fleetcarrier')
-        if fc_callback is not None and callable(fc_callback):
+    for plugin, fc_callback in _subscribers('capi_fleetcarrier'):
+        if callable(fc_callback):
             try:
-                # Pass a copy of the CAPIData in case the callee modifies it
-                newerror = fc_callback(copy.deepcopy(data))
+                # Pass a copy of the CAPIData in case the callee modifies it, unless
+                # the plugin has promised not to.  That gets the original, not a read-only
+                # view, as a MappingProxyType would lose CAPIData's attributes.
+                newerror = _dispatch(
+                    plugin, 'capi_fleetcarrier', fc_callback, data if plugin.readonly_data else copy.deepcopy(data)
+                )
                 error = error if error else newerror
 
             except Exception:
@@ -7,21 +7,28 @@ See LICENSE file.
 """
 
 from __future__ import annotations
+import base64
+import hashlib
 import os
 import json
+import pathlib
+import re
 import sys
+import time
 import webbrowser
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
 from tkinter import ttk
 import tkinter.font as tkfont
-from PIL import Image, ImageTk
-from typing import Callable, cast
+from typing import Any, Callable, cast
 import requests
 from io import BytesIO
-from datetime import datetime
+from bisect import bisect_left
+from datetime import datetime, timezone
 import myNotebook as nb  # noqa: N813
 import plug
-from config import appversion_nobuild, config
+from config import appversion_nobuild, config, user_agent
 from EDMCLogging import get_main_logger
 from l10n import translations as tr
 from ttkHyperlinkLabel import HyperlinkLabel
@@ -29,6 +36,12 @@ import semantic_version
 
 logger = get_main_logger()
 
+ICON_SIZE = 64
+ICON_CACHE_DIRNAME = "plugin_icons"
+ICON_TIMEOUT = 5
+ICON_CACHE_MAX_BYTES = 5 * 1024 * 1024  # Of all the stored icons
+ICON_CACHE_MAX_AGE = 90 * 24 * 60 * 60  # Seconds since an icon was last used
+
 # TODO in 6.2 or later: Install/Uninstall Plugin, notify user a plugin update is available.
 
 
@@ -50,6 +63,140 @@ def read_plugin_list():
     return plugin_list, plugins_by_id
 
 
+def _last_update(plugin: dict) -> datetime:
+    """Sort key for when a plugin was last updated, as a naive UTC datetime."""
+    try:
+        when = datetime.fromisoformat(plugin.get("pluginLastUpdate") or "1900-01-01")
+
+    except ValueError:
+        return datetime(1900, 1, 1)
+
+    return when.astimezone(timezone.utc).replace(tzinfo=None) if when.tzinfo else when
+
+
+def _stars(plugin: dict) -> int:
+    """Sort key for a plugin's stars, counting anything that isn't a number as none."""
+    try:
+        return int(plugin.get("pluginStars") or 0)
+
+    except (TypeError, ValueError):
+        return 0
+
+
+class PluginRegistry:
+    """
+    The Plugin Registry, indexed once when it's read.
+
+    Sorting, filtering by category and searching then only look things up, and
+    give the plugins to show as indexes into `plugins`.
+    """
+
+    SORT_KEYS: dict[str, Callable[[dict], Any]] = {
+        "pluginName": lambda p: (p.get("pluginName") or "").casefold(),
+        "pluginLastUpdate": _last_update,
+        "pluginStars": _stars,
+    }
+    WORD_RE = re.compile(r"\w+")
+
+    def __init__(self, plugins: list[dict]) -> None:
+        """
+        Index the registry.
+
+        :param plugins: The registry's plugins, as read from master_plugin_list.json.
+        """
+        self.plugins = plugins
+        # By sort key and whether it's descending.  Both are stable, so ties stay in the registry's order.
+        self.orders: dict[tuple[str, bool], list[int]] = {
+            (key, reverse): sorted(
+                range(len(plugins)), key=lambda i, k=sort_key: k(plugins[i]), reverse=reverse  # type: ignore
+            )
+            for key, sort_key in self.SORT_KEYS.items()
+            for reverse in (False, True)
+        }
+        self.categories: dict[str, set[int]] = {}
+        # Words of the name and description, sorted for prefix searches, and the plugins they're in
+        self.postings: dict[str, set[int]] = {}
+        for i, plugin in enumerate(plugins):
+            for category in plugin.get("pluginCategory", []):
+                self.categories.setdefault(category, set()).add(i)
+
+            text = f'{plugin.get("pluginName") or ""} {plugin.get("pluginDesc") or ""}'.casefold()
+            for word in self.WORD_RE.findall(text):
+                self.postings.setdefault(word, set()).add(i)
+
+        self.words = sorted(self.postings)
+
+    def search(self, text: str) -> set[int] | None:
+        """
+        Find the plugins matching a search.
+
+        :param text: The search.  Each word must start a word of a plugin's name or description.
+        :return: The matching plugins, or `None` if there's nothing to search for.
+        """
+        matches: set[int] | None = None
+        for term in self.WORD_RE.findall(text.casefold()):
+            found: set[int] = set()
+            i = bisect_left(self.words, term)
+            while i < len(self.words) and self.words[i].startswith(term):
+                found |= self.postings[self.words[i]]
+                i += 1
+
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+
+        return matches
+
+    def select(
+        self, category: str = "All", text: str = "", sort: str | None = None, reverse: bool = False
+    ) -> list[int]:
+        """
+        Get the plugins to show.
+
+        :param category: Only plugins in this category, unless it's "All".
+        :param text: Only plugins matching this search.
+        :param sort: A key of `SORT_KEYS` to order by, or `None` for the registry's own order.
+        :param reverse: Whether to sort descending, or reverse the registry's order.
+        :return: The plugins, as indexes into `plugins`.
+        """
+        order: Any
+        if sort:
+            order = self.orders[(sort, reverse)]
+
+        else:
+            order = reversed(range(len(self.plugins))) if reverse else range(len(self.plugins))
+
+        in_category = None if category == "All" else self.categories.get(category, set())
+        matches = self.search(text)
+        return [
+            i for i in order
+            if (in_category is None or i in in_category) and (matches is None or i in matches)
+        ]
+
+
+_registry: PluginRegistry | None = None
+
+
+def plugin_registry() -> PluginRegistry:
+    """
+    Get the Plugin Registry.
+
+    The file is only read and indexed once, and then kept between openings of
+    the Plugin Browser, until `reload_plugin_list()`.
+    """
+    global _registry
+    if _registry is None:
+        _registry = PluginRegistry(read_plugin_list()[0])
+
+    return _registry
+
+
+def reload_plugin_list() -> None:
+    """Forget the Plugin Registry, so that it's read again, e.g. after the data file's been updated."""
+    global _registry
+    _registry = None
+
+
 def open_plugin_main(plugin) -> None:
     """Open the Plugin's Main Repository."""
     webbrowser.open(plugin.get("pluginMainLink"))
@@ -64,6 +211,176 @@ def report_plugin(plugin) -> None:
     )
 
 
+def make_icon(data: bytes) -> bytes:
+    """
+    Turn an image into a plugin icon.
+
+    :param data: The image, in any format PIL understands.
+    :return: A PNG, resized to fit, and centred, on a transparent ICON_SIZE square.
+    """
+    # PIL is only needed once an icon is actually shown, so keep it off the startup path
+    from PIL import Image
+
+    pil_image = Image.open(BytesIO(data)).convert("RGBA")
+    pil_image.thumbnail((ICON_SIZE, ICON_SIZE), Image.Resampling.LANCZOS)
+
+    canvas = Image.new("RGBA", (ICON_SIZE, ICON_SIZE), (0, 0, 0, 0))
+    offset = ((ICON_SIZE - pil_image.width) // 2, (ICON_SIZE - pil_image.height) // 2)
+    canvas.paste(pil_image, offset)
+
+    out = BytesIO()
+    canvas.save(out, format="PNG")
+    return out.getvalue()
+
+
+class PluginIconCache:
+    """
+    Plugin icons, fetched in the background and kept on disk, ready sized, between runs.
+
+    Icons are stored by a hash of their URL, along with the ETag they were
+    served with.  A stored icon is delivered straight away, and then
+    revalidated, once per run, in case it's changed.  Icons that haven't been
+    used for `max_age` are dropped, as are the least recently used while
+    they're over `max_bytes` in total.
+
+    Results are handed back to the Tk thread with a `<<PluginIconLoaded>>`
+    event, so nothing here ever blocks the UI.
+    """
+
+    def __init__(
+        self, cache_dir: pathlib.Path, widget: tk.Misc, on_loaded: Callable[[str, bytes], None],
+        max_bytes: int = ICON_CACHE_MAX_BYTES, max_age: float = ICON_CACHE_MAX_AGE
+    ) -> None:
+        """
+        Set up the cache.
+
+        :param cache_dir: Where to keep icons.
+        :param widget: Widget to deliver results through.
+        :param on_loaded: Called, on the Tk thread, with each URL and its icon as a PNG.
+        :param max_bytes: Size of all the stored icons to prune down to.
+        :param max_age: Seconds after which an unused icon is pruned.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.widget = widget
+        self.on_loaded = on_loaded
+        self.results: Queue[tuple[str, bytes]] = Queue()
+        self.requested: set[str] = set()
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="plugin-icon")
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        widget.bind("<<PluginIconLoaded>>", self._deliver, add="+")
+        self.executor.submit(self.prune)
+
+    def path(self, url: str) -> pathlib.Path:
+        """
+        Get where an icon is cached.
+
+        :param url: The icon's URL.
+        :return: Path of the PNG; the ETag is kept alongside with an `.etag` suffix.
+        """
+        return self.cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.png"
+
+    def request(self, url: str) -> None:
+        """
+        Ask for an icon, which will be passed to `on_loaded` when it's ready.
+
+        Only the first request for each URL does anything, later ones are
+        served from the caller's own copy.
+
+        :param url: URL, or local path, of the image.
+        """
+        if url not in self.requested:
+            self.requested.add(url)
+            self.executor.submit(self._fetch, url)
+
+    def prune(self) -> None:
+        """Drop the icons that haven't been used for too long, or are least recently used if there are too many."""
+        icons = []
+        try:
+            for path in self.cache_dir.glob("*.png"):
+                stat = path.stat()
+                icons.append((stat.st_mtime, stat.st_size, path))
+
+        except OSError as e:
+            logger.debug(f"Couldn't list plugin icon cache {self.cache_dir}", exc_info=e)
+            return
+
+        icons.sort()
+        total = sum(size for _, size, _ in icons)
+        oldest = time.time() - self.max_age
+        for mtime, size, path in icons:
+            if total <= self.max_bytes and mtime >= oldest:
+                break
+
+            path.unlink(missing_ok=True)
+            path.with_suffix(".etag").unlink(missing_ok=True)
+            total -= size
+
+    def close(self) -> None:
+        """Stop fetching icons."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _fetch(self, url: str) -> None:
+        try:
+            if os.path.isfile(url):
+                with open(url, "rb") as f:
+                    self._loaded(url, make_icon(f.read()))
+
+                return
+
+            path = self.path(url)
+            etag_path = path.with_suffix(".etag")
+            headers = {}
+            cached = path.read_bytes() if path.exists() else None
+            if cached is not None:
+                path.touch()  # Used, as far as prune() is concerned
+                self._loaded(url, cached)
+                if etag_path.exists():
+                    headers["If-None-Match"] = etag_path.read_text(encoding="utf-8")
+
+            response = self.session.get(url, timeout=ICON_TIMEOUT, headers=headers)
+            if response.status_code == 304:
+                return
+
+            response.raise_for_status()
+            icon = make_icon(response.content)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(icon)
+            if etag := response.headers.get("ETag"):
+                etag_path.write_text(etag, encoding="utf-8")
+
+            else:
+                etag_path.unlink(missing_ok=True)
+
+            if icon != cached:
+                self._loaded(url, icon)
+
+        except Exception as e:
+            logger.debug(f"Couldn't load plugin icon {url}", exc_info=e)
+            self.requested.discard(url)  # So it's tried again the next time it's wanted
+
+    def _loaded(self, url: str, icon: bytes) -> None:
+        """Pass a result to the Tk thread."""
+        self.results.put((url, icon))
+        try:
+            self.widget.event_generate("<<PluginIconLoaded>>", when="tail")
+
+        except tk.TclError:
+            pass  # Preferences closed meanwhile
+
+    def _deliver(self, event=None) -> None:
+        try:
+            url, icon = self.results.get_nowait()
+
+        except Empty:
+            return
+
+        self.on_loaded(url, icon)
+
+
 class PluginBrowserMixIn:
     """Separated Class for the Plugin Browser."""
 
@@ -77,12 +394,15 @@ class PluginBrowserMixIn:
         self.SEPY = 10  # separator line spacing
 
         # Setup Plugin Browser Options
-        self.browser_plugins, self.browser_plugins_by_id = read_plugin_list()
+        self.browser_registry = plugin_registry()
+        self.browser_plugins = self.browser_registry.plugins
+        self.browser_plugins_by_id: dict[str, dict] = {}  # By Treeview row ID
         self._plugin_sort_reverse = {
             "pluginName": False,
             "pluginLastUpdate": False,
             "pluginStars": False,
         }
+        self._plugin_sort: tuple[str | None, bool] = (None, False)
         self.selected_plugin: dict | None = None
         self._plugin_last_tested_label: nb.Label | None = None
 
@@ -101,18 +421,7 @@ class PluginBrowserMixIn:
     def setup_browser_tab(self, notebook: nb.Notebook, row) -> None:
         """Set up the Plugin Browser tab in Preferences."""
         if not hasattr(self, "browser_plugins"):
-            self.browser_plugins, self.browser_plugins_by_id = read_plugin_list()
-            self._plugin_sort_reverse = {"pluginName": False, "pluginLastUpdate": False}
-            self.selected_plugin = None
-
-        categories = sorted(
-            {
-                cat
-                for plugin in self.browser_plugins
-                for cat in plugin.get("pluginCategory", [])
-            }
-        )
-        categories.insert(0, "All")
+            PluginBrowserMixIn.__init__(self)
 
         plugins_frame = nb.Frame(notebook)
         HyperlinkLabel(
@@ -124,13 +433,7 @@ class PluginBrowserMixIn:
         ).grid(row=next(row), padx=self.PADX, pady=(self.PADY, 1), sticky=tk.W)
 
         # Add after the "Available Plugins" label
-        categories = sorted(
-            {
-                cat
-                for plugin in self.browser_plugins
-                for cat in plugin.get("pluginCategory", [])
-            }
-        )
+        categories = sorted(self.browser_registry.categories)
         categories.insert(0, "All")  # default to show all
 
         self.selected_category = tk.StringVar(value="All")
@@ -154,6 +457,18 @@ class PluginBrowserMixIn:
             row=next(row), column=0, sticky=tk.W, padx=self.PADX, pady=(0, self.PADY)
         )
 
+        # LANG: Search the Plugin Browser by name and description
+        search_label = nb.Label(plugins_frame, text=tr.tl("Search:"))
+        search_label.grid(
+            row=next(row), column=0, sticky=tk.W, padx=self.PADX, pady=(0, self.PADY)
+        )
+        self.plugin_search = tk.StringVar()
+        search_entry = nb.EntryMenu(plugins_frame, textvariable=self.plugin_search, width=30)
+        search_entry.grid(
+            row=next(row), column=0, sticky=tk.W, padx=self.PADX, pady=(0, self.PADY)
+        )
+        self.plugin_search.trace_add("write", lambda *_: self.__populate_plugins_tree())
+
         ttk.Separator(plugins_frame, orient=tk.HORIZONTAL).grid(
             columnspan=4, padx=self.PADX, pady=self.SEPY, sticky=tk.EW, row=next(row)
         )
@@ -235,7 +550,13 @@ class PluginBrowserMixIn:
         self.plugin_details_frame.columnconfigure(1, weight=1)
         self.plugin_details_frame.grid_propagate(True)
 
-        self._plugin_icon_cache: dict[str, ImageTk.PhotoImage] = {}
+        # Icons by URL, and the one the selected plugin is waiting for
+        self._plugin_icon_cache: dict[str, tk.PhotoImage] = {}
+        self._plugin_icon_wanted: str | None = None
+        self._plugin_icons = PluginIconCache(
+            config.app_dir_path / ICON_CACHE_DIRNAME, self.plugins_tree, self.__on_plugin_icon_loaded
+        )
+        self.plugins_tree.bind("<Destroy>", lambda e: self._plugin_icons.close(), add="+")
         self._plugin_icon_label = nb.Label(self.plugin_details_frame)
         self._plugin_icon_label.grid(
             row=0, column=0, rowspan=3, sticky=tk.NW, padx=(0, 12)
@@ -263,6 +584,7 @@ class PluginBrowserMixIn:
         self._plugin_description.grid(row=2, column=1, sticky=tk.W)
         self._create_plugin_action_buttons()
         self.plugins_tree.bind("<<TreeviewSelect>>", self.__on_plugin_selected)
+        self.__fill_plugins_tree()
         self.__populate_plugins_tree()
 
         notebook.add(
@@ -271,14 +593,6 @@ class PluginBrowserMixIn:
             text=tr.tl("Plugin Browser"),
         )
 
-    def __get_filtered_plugins(self) -> list[dict]:
-        category = self.selected_category.get()
-        if category == "All":
-            return self.browser_plugins
-        return [
-            p for p in self.browser_plugins if category in p.get("pluginCategory", [])
-        ]
-
     def _run_plugin_action(self, handler) -> None:
         if self.selected_plugin is None:
             return
@@ -329,16 +643,10 @@ class PluginBrowserMixIn:
         self.plugin_actions_frame.columnconfigure(0, weight=1)
         self.plugin_actions_frame.grid_remove()
 
-    def __populate_plugins_tree(self, plugins: list[dict] | None = None) -> None:
-        self.plugins_tree.delete(*self.plugins_tree.get_children())
-
-        if plugins is None:
-            plugins = self.__get_filtered_plugins()
-
-        # Rebuild Treeview ID to plugin mapping
+    def __fill_plugins_tree(self) -> None:
+        # Every plugin gets a row, once.  Filtering and sorting then only rearrange them.
         self.browser_plugins_by_id = {}
-
-        for index, plugin in enumerate(plugins):
+        for index, plugin in enumerate(self.browser_plugins):
             plugin_id = f"plugin_{index}"
             self.browser_plugins_by_id[plugin_id] = plugin
             self.plugins_tree.insert(
@@ -354,8 +662,25 @@ class PluginBrowserMixIn:
                     plugin.get("pluginStars", ""),
                 ),
             )
-        self._set_plugin_action_visibility(bool(plugins))
-        self.plugins_tree.selection_remove(self.plugins_tree.selection())
+
+    def __populate_plugins_tree(self) -> None:
+        sort, reverse = self._plugin_sort
+        shown = [
+            f"plugin_{index}"
+            for index in self.browser_registry.select(
+                self.selected_category.get(), self.plugin_search.get(), sort, reverse
+            )
+        ]
+        # Sets the order of the shown rows, and detaches the rest, in one go
+        self.plugins_tree.set_children("", *shown)
+
+        selection = self.plugins_tree.selection()
+        if selection and selection[0] in shown:
+            self._set_plugin_action_visibility(True)
+            return
+
+        self._set_plugin_action_visibility(bool(shown))
+        self.plugins_tree.selection_remove(selection)
         self.selected_plugin = None
         self.__clear_plugin_details()
 
@@ -370,27 +695,7 @@ class PluginBrowserMixIn:
 
         reverse = self._plugin_sort_reverse[key]
         self._plugin_sort_reverse[key] = not reverse
-        self._current_sort_key = key
-
-        if key == "pluginLastUpdate":
-            self.browser_plugins.sort(
-                key=lambda p: datetime.fromisoformat(
-                    p.get("pluginLastUpdate") or "1900-01-01"
-                ),
-                reverse=reverse,
-            )
-
-        elif key == "pluginStars":
-            self.browser_plugins.sort(
-                key=lambda p: int(p.get("pluginStars") or 0),
-                reverse=reverse,
-            )
-
-        else:
-            self.browser_plugins.sort(
-                key=lambda p: (p.get(key) or "").casefold(),
-                reverse=reverse,
-            )
+        self._plugin_sort = (key, reverse)
 
         # Repopulate with current category filter
         self.__populate_plugins_tree()
@@ -542,13 +847,11 @@ class PluginBrowserMixIn:
             row += 1
 
     def _update_plugin_icon(self, plugin_id: str, plugin: dict) -> None:
-        icon_url = plugin.get("pluginIcon")
-        icon_key = plugin_id if icon_url else "__fallback__"
-        url = icon_url or os.path.join(
+        url = plugin.get("pluginIcon") or os.path.join(
             os.path.dirname(sys.argv[0]),
             "io.edcd.EDMarketConnector.png",
         )
-        self.__load_plugin_icon(icon_key, url)
+        self.__load_plugin_icon(url)
 
     def __clear_plugin_details(self) -> None:
         self._plugin_title.configure(text="")
@@ -561,6 +864,7 @@ class PluginBrowserMixIn:
             self._plugin_last_tested_label = None
 
         # Plugin Icon
+        self._plugin_icon_wanted = None
         self._plugin_icon_label.configure(image="")
         self._plugin_icon_label.image = None  # type: ignore
 
@@ -573,42 +877,28 @@ class PluginBrowserMixIn:
         self._set_plugin_action_state(False)
         self._set_plugin_action_visibility(False)
 
-    def __load_plugin_icon(self, plugin_id: str, url: str) -> None:
-        if plugin_id in self._plugin_icon_cache:
-            tk_image = self._plugin_icon_cache[plugin_id]
-            self._plugin_icon_label.configure(image=tk_image)
-            self._plugin_icon_label.image = tk_image  # type: ignore
-            return
+    def __load_plugin_icon(self, url: str) -> None:
+        tk_image = self._plugin_icon_cache.get(url)
+        self._plugin_icon_wanted = None if tk_image else url
+        self._plugin_icon_label.configure(image=tk_image or "")
+        self._plugin_icon_label.image = tk_image  # type: ignore
+        if tk_image is None:
+            # Shown by __on_plugin_icon_loaded(), if this plugin's still selected by then
+            self._plugin_icons.request(url)
 
+    def __on_plugin_icon_loaded(self, url: str, icon: bytes) -> None:
         try:
-            # Open PIL image
-            pil_image = (
-                Image.open(url).convert("RGBA")
-                if os.path.isfile(url)
-                else Image.open(BytesIO(requests.get(url, timeout=5).content)).convert(
-                    "RGBA"
-                )
-            )
-
-            # Resize while maintaining aspect ratio
-            pil_image.thumbnail((64, 64), Image.Resampling.LANCZOS)
-
-            # Paste onto fixed 64x64 transparent canvas
-            canvas = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
-            offset = ((64 - pil_image.width) // 2, (64 - pil_image.height) // 2)
-            canvas.paste(pil_image, offset)
+            tk_image = tk.PhotoImage(data=base64.b64encode(icon), format="png", master=self.plugins_tree)
 
-            # Convert to Tkinter PhotoImage
-            tk_image = ImageTk.PhotoImage(canvas, master=self.plugins_tree)
-            self._plugin_icon_cache[plugin_id] = tk_image
+        except tk.TclError:
+            logger.debug(f"Unusable plugin icon {url}", exc_info=True)
+            return
 
+        self._plugin_icon_cache[url] = tk_image
+        if url == self._plugin_icon_wanted:
             self._plugin_icon_label.configure(image=tk_image)
             self._plugin_icon_label.image = tk_image  # type: ignore
 
-        except Exception:
-            self._plugin_icon_label.configure(image="")
-            self._plugin_icon_label.image = None  # type: ignore
-
     def _set_plugin_action_visibility(self, visible: bool) -> None:
         if not hasattr(self, "plugin_actions_frame"):
             return
@@ -29,11 +29,15 @@ from config import config
 from ttkHyperlinkLabel import HyperlinkLabel
 import myNotebook as nb  # noqa: N813
 from EDMCLogging import get_main_logger
+from util.projection import Projection
 
 from plugins.common_coreutils import PADX, PADY, BUTTONX
 
 logger = get_main_logger()
 
+# We never modify the entry or state we're passed, so can share plug.py's read-only snapshot.
+plugin_readonly_data = True
+
 
 class This:
     """Holds module globals."""
@@ -61,8 +65,8 @@ class This:
             "SystemAddress",
             "CarrierID",
             "Body",
-            "BodyID"
-            "DepartureTime"
+            "BodyID",
+            "DepartureTime",
         ],
         "ScanOrganic": [
             "timestamp",
@@ -80,6 +84,7 @@ class This:
     }
 
     def __init__(self):
+        self.event_projections = {event: Projection(allow=keys) for event, keys in self.event_filters.items()}
         self.log: tk.IntVar | None = None
         self.log_button: ttk.Checkbutton | None = None
 
@@ -158,12 +163,8 @@ def prefs_changed(cmdr: str, is_beta: bool) -> None:
 
 def filter_event_data(entry) -> dict[str, Any]:
     """Format Journal Data for EDAstro."""
-    if entry["event"] in this.event_filters:
-        return {
-            key: entry[key]
-            for key in this.event_filters[entry["event"]]
-            if key in entry
-        }
+    if projection := this.event_projections.get(entry["event"]):
+        return projection(entry)
     return entry
 
 
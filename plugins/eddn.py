@@ -29,8 +29,10 @@ import pathlib
 import re
 import sqlite3
 import gzip
+import time
 import tkinter as tk
 from tkinter import ttk
+from collections import Counter
 from platform import system
 from textwrap import dedent
 from threading import Lock
@@ -47,10 +49,11 @@ from config import applongname, appname, appversion_nobuild, config, debug_sende
 from EDMCLogging import get_main_logger
 from monitor import monitor
 from myNotebook import Frame
-from prefs import prefsVersion
 from ttkHyperlinkLabel import HyperlinkLabel
 from l10n import translations as tr
 from plugins.common_coreutils import PADX, PADY, BUTTONX, this_format_common
+from plugins import eddn_schemas
+from util.projection import Projection
 
 logger = get_main_logger()
 
@@ -76,7 +79,7 @@ class This:
         self.odyssey = False
 
         # Track location to add to Journal events
-        self.system_address: str | None = None
+        self.system_address: int | None = None
         self.system_name: str | None = None
         self.coordinates: tuple | None = None
         self.body_name: str | None = None
@@ -445,7 +448,7 @@ class EDDNSender:
         # Used to indicate if we've rescheduled at the faster rate already.
         have_rescheduled = False
         # We send either if docked or 'Delay sending until docked' not set
-        if this.docked or not config.get_int('output') & config.OUT_EDDN_DELAY:
+        if this.docked or not config.output & config.OUT_EDDN_DELAY:
             logger.trace_if("plugin.eddn.send", "Should send")
             # We need our own cursor here, in case the semantics of
             # tk `after()` could allow this to run in the middle of other
@@ -561,6 +564,12 @@ class EDDN:
     MODULE_RE = re.compile(r'^Hpt_|^Int_|Armour_', re.IGNORECASE)
     CANONICALISE_RE = re.compile(r'\$(.+)_name;')
     CAPI_LOCALISATION_RE = re.compile(r'^loc[A-Z].+')
+    # FSSSignalDiscovered messages are kept within these. A batch is sent once any is reached, if we know
+    # we're in its system, else it's split into several messages when it can be sent.
+    FSS_SIGNALS_MAX_COUNT = 100
+    FSS_SIGNALS_MAX_BYTES = 64 * 1024  # Uncompressed JSON of the signals
+    FSS_SIGNALS_MAX_AGE = 30  # Seconds since the first signal in the batch
+    FSS_SIGNAL_ELISIONS = frozenset(('event', 'horizons', 'odyssey', 'TimeRemaining', 'SystemAddress'))
 
     def __init__(self, parent: tk.Tk):
         self.parent: tk.Tk = parent
@@ -573,7 +582,12 @@ class EDDN:
 
         self.sender = EDDNSender(self, self.eddn_url)
 
-        self.fss_signals: list[Mapping[str, Any]] = []
+        self.fss_signals: list[dict[str, Any]] = []
+        self.fss_signals_systemaddress: int | None = None
+        self.fss_signals_started = 0.0
+        self.fss_signals_bytes = 0
+        self.fss_signals_beta = False
+        self.schema_rejects: Counter[str] = Counter()  # Messages that failed validation, by `$schemaRef`
 
     def close(self):
         """Close down the EDDN class instance."""
@@ -992,28 +1006,57 @@ class EDDN:
         #   2. Else check against config.EDDN_SEND_NON_STATION *and* config.OUT_EDDN_DELAY
         if any(f'{s}' in msg['$schemaRef'] for s in EDDNSender.STATION_SCHEMAS):
             # 'Station data'
-            if config.get_int('output') & config.OUT_EDDN_SEND_STATION_DATA:
+            if config.output & config.OUT_EDDN_SEND_STATION_DATA:
                 # And user has 'station data' configured to be sent
                 logger.trace_if("plugin.eddn.send", "Recording/sending 'station' message")
                 if 'header' not in msg:
                     msg['header'] = self.standard_header()
 
+                if not self.valid_message(msg):
+                    return
+
                 msg_id = self.sender.add_message(cmdr, msg)
                 # 'Station data' is never delayed on construction of message
                 self.sender.send_message_by_id(msg_id)
 
-        elif config.get_int('output') & config.OUT_EDDN_SEND_NON_STATION:
+        elif config.output & config.OUT_EDDN_SEND_NON_STATION:
             # Any data that isn't 'station' is configured to be sent
             logger.trace_if("plugin.eddn.send", "Recording 'non-station' message")
             if 'header' not in msg:
                 msg['header'] = self.standard_header()
 
+            if not self.valid_message(msg):
+                return
+
             msg_id = self.sender.add_message(cmdr, msg)
-            if this.docked or not config.get_int('output') & config.OUT_EDDN_DELAY:
+            if this.docked or not config.output & config.OUT_EDDN_DELAY:
                 # No delay in sending configured, so attempt immediately
                 logger.trace_if("plugin.eddn.send", "Sending 'non-station' message")
                 self.sender.send_message_by_id(msg_id)
 
+    def valid_message(self, msg: Mapping[str, Any]) -> bool:
+        """
+        Check a message against its bundled EDDN schema before it's queued.
+
+        The Gateway would only reject an invalid message, after it had been
+        queued and sent, so it's dropped here instead and counted against its
+        schema in `self.schema_rejects`.
+
+        :param msg: The fully formed message, including `header`.
+        :return: `True` if the message should be queued.
+        """
+        error = eddn_schemas.validate(msg)
+        if error is None:
+            return True
+
+        schema_ref = msg.get('$schemaRef', 'Unset $schemaRef!')
+        self.schema_rejects[schema_ref] += 1
+        logger.warning(
+            f'Dropping message failing {schema_ref} (rejected {self.schema_rejects[schema_ref]} so far): {error}'
+        )
+        logger.trace_if('plugin.eddn.send', f'Invalid message:\n{msg!r}')
+        return False
+
     def standard_header(
         self, game_version: str | None = None, game_build: str | None = None
     ) -> MutableMapping[str, Any]:
@@ -1119,8 +1162,7 @@ class EDDN:
         """
         #######################################################################
         # Elisions
-        entry = filter_localised(entry)
-        entry.pop('Progress')
+        entry = ELISIONS['fssdiscoveryscan'](entry)
         #######################################################################
 
         #######################################################################
@@ -1219,12 +1261,8 @@ class EDDN:
         #   "VoucherAmount":50000
         # }
         #######################################################################
-        # Elisions
-        entry = filter_localised(entry)
-        # Keys specific to this event
-        for k in ('IsNewEntry', 'NewTraitsDiscovered'):
-            if k in entry:
-                del entry[k]
+        # Elisions, including keys specific to this event
+        entry = ELISIONS['codexentry'](entry)
         #######################################################################
 
         #######################################################################
@@ -1453,7 +1491,7 @@ class EDDN:
         #     ]
         # }
         # Abort if we're not configured to send 'station' data.
-        if not config.get_int('output') & config.OUT_EDDN_SEND_STATION_DATA:
+        if not config.output & config.OUT_EDDN_SEND_STATION_DATA:
             return None
 
         # Sanity check
@@ -1737,10 +1775,16 @@ class EDDN:
         this.eddn.send_message(cmdr, msg)
         return None
 
-    def enqueue_journal_fsssignaldiscovered(self, entry: MutableMapping[str, Any]) -> None:
+    def enqueue_journal_fsssignaldiscovered(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
         """
-        Queue up an FSSSignalDiscovered journal event for later sending.
+        Add an FSSSignalDiscovered journal event to the batch for sending.
 
+        Elisions are applied as each signal arrives, so that a batch can be
+        sent as soon as it's big enough, or has been waiting long enough, as
+        long as we know we're in the system the signals are for.
+
+        :param cmdr: the commander under which this upload is made
+        :param is_beta: whether or not we are in beta mode
         :param entry: the journal entry to batch
         """
         if entry is None or entry == "":
@@ -1749,7 +1793,53 @@ class EDDN:
 
         logger.trace_if("plugin.eddn.fsssignaldiscovered", f"Appending FSSSignalDiscovered entry:\n"
                         f" {json.dumps(entry)}")
-        self.fss_signals.append(entry)
+        if self.fss_signals and entry['SystemAddress'] != self.fss_signals_systemaddress:
+            # Can't mix systems in one message, so send what we have first
+            self.send_fss_signals(cmdr, this.system_name, this.coordinates, is_beta)
+
+        # Drop Mission USS signals.
+        if entry.get("USSType") == "$USS_Type_MissionTarget;":
+            logger.trace_if("plugin.eddn.fsssignaldiscovered", "USSType is $USS_Type_MissionTarget;, dropping")
+            return
+
+        # Remove any _Localised keys (would only be in a USS signal), and any
+        # key/values that shouldn't be there per signal
+        signal = {
+            k: v for k, v in entry.items()
+            if not k.endswith('_Localised') and k not in self.FSS_SIGNAL_ELISIONS
+        }
+
+        if not self.fss_signals:
+            self.fss_signals_systemaddress = entry['SystemAddress']
+            self.fss_signals_started = time.monotonic()
+            self.fss_signals_bytes = 0
+            self.parent.after(self.FSS_SIGNALS_MAX_AGE * 1000, self.fss_signals_timeout, self.fss_signals_started)
+
+        self.fss_signals.append(signal)
+        self.fss_signals_bytes += len(json.dumps(signal, separators=(',', ':')))
+        self.fss_signals_beta = is_beta
+        if (
+            len(self.fss_signals) >= self.FSS_SIGNALS_MAX_COUNT
+            or self.fss_signals_bytes >= self.FSS_SIGNALS_MAX_BYTES
+            or time.monotonic() - self.fss_signals_started >= self.FSS_SIGNALS_MAX_AGE
+        ) and self.fss_signals_systemaddress == this.system_address:
+            self.send_fss_signals(cmdr, this.system_name, this.coordinates, is_beta)
+
+    def fss_signals_timeout(self, started: float) -> None:
+        """
+        Send a batch of FSSSignalDiscovered that's been waiting FSS_SIGNALS_MAX_AGE.
+
+        It's left for the next journal event if we don't yet know we're in
+        the signals' system, as happens when they're logged before the jump.
+
+        :param started: When the batch this was scheduled for was started.
+        """
+        if (
+            self.fss_signals
+            and self.fss_signals_started == started
+            and self.fss_signals_systemaddress == this.system_address
+        ):
+            self.send_fss_signals(this.cmdr_name, this.system_name, this.coordinates, self.fss_signals_beta)
 
     def export_journal_fsssignaldiscovered(
         self, cmdr: str, system_name: str, system_starpos: list, is_beta: bool, entry: MutableMapping[str, Any]
@@ -1764,87 +1854,101 @@ class EDDN:
         :param entry: the non-FSSSignalDiscovered journal entry that triggered this batch send
         """
         logger.trace_if("plugin.eddn.fsssignaldiscovered", f"This other event is: {json.dumps(entry)}")
-        #######################################################################
-        # Location cross-check and augmentation setup
-        #######################################################################
         # Determine if this is Horizons order or Odyssey order
         if entry['event'] in ('Location', 'FSDJump', 'CarrierJump'):
             # Odyssey order, use this new event's data for cross-check
-            aug_systemaddress = entry['SystemAddress']
-            aug_starsystem = entry['StarSystem']
-            aug_starpos = entry['StarPos']
+            return self.send_fss_signals(cmdr, entry['StarSystem'], entry['StarPos'], is_beta, entry['SystemAddress'])
 
-        else:
-            # Horizons order, so use tracked data for cross-check
-            if this.system_address is None or system_name is None or system_starpos is None:
-                logger.error(f'Location tracking failure: {this.system_address=}, {system_name=}, {system_starpos=}')
-                return 'Current location not tracked properly, started after game?'
-
-            aug_systemaddress = this.system_address
-            aug_starsystem = system_name
-            aug_starpos = system_starpos
-
-        if aug_systemaddress != self.fss_signals[0]['SystemAddress']:
-            logger.warning("First signal's SystemAddress doesn't match current location: "
-                           f"{self.fss_signals[0]['SystemAddress']} != {aug_systemaddress}")
-            self.fss_signals = []
+        # Horizons order, so use tracked data for cross-check
+        return self.send_fss_signals(cmdr, system_name, system_starpos, is_beta)
+
+    def send_fss_signals(
+        self, cmdr: str, system_name: str | None, system_starpos: list | tuple | None, is_beta: bool,
+        system_address: int | None = None
+    ) -> str | None:
+        """
+        Send the batched FSSSignalDiscovered signals, if they're for the given system.
+
+        The batch is emptied either way. It's split into as many messages as
+        the count and size limits need.
+
+        :param cmdr: the commander under which this upload is made
+        :param system_name: Name of the system we're in
+        :param system_starpos: Coordinates of the system we're in
+        :param is_beta: whether or not we are in beta mode
+        :param system_address: SystemAddress of the system we're in, if not the tracked one
+        :return: A description of why the signals weren't sent, if they should have been.
+        """
+        signals, self.fss_signals = self.fss_signals, []
+        if not signals:
+            # All of them were elided
+            logger.debug('No signals after checks, so sending no message')
+            return None
+
+        if system_address is None:
+            system_address = this.system_address
+
+        #######################################################################
+        # Location cross-check and augmentation
+        #######################################################################
+        if system_address is None or system_name is None or system_starpos is None:
+            logger.error(f'Location tracking failure: {system_address=}, {system_name=}, {system_starpos=}')
+            return 'Current location not tracked properly, started after game?'
+
+        if system_address != self.fss_signals_systemaddress:
+            logger.warning("Signals' SystemAddress doesn't match current location: "
+                           f"{self.fss_signals_systemaddress} != {system_address}")
             return 'Wrong System! Missed jump ?'
         #######################################################################
 
-        # Build basis of message
+        # Signals logged before the jump (Odyssey order) can't be sent until
+        # we arrive, so may have outgrown one message by now
+        batch: list[dict[str, Any]] = []
+        batch_bytes = 0
+        for signal in signals:
+            batch.append(signal)
+            batch_bytes += len(json.dumps(signal, separators=(',', ':')))
+            if len(batch) >= self.FSS_SIGNALS_MAX_COUNT or batch_bytes >= self.FSS_SIGNALS_MAX_BYTES:
+                self.send_fss_signals_message(cmdr, system_name, system_starpos, is_beta, system_address, batch)
+                batch = []
+                batch_bytes = 0
+
+        if batch:
+            self.send_fss_signals_message(cmdr, system_name, system_starpos, is_beta, system_address, batch)
+
+        return None
+
+    def send_fss_signals_message(
+        self, cmdr: str, system_name: str, system_starpos: list | tuple, is_beta: bool, system_address: int,
+        signals: list[dict[str, Any]]
+    ) -> None:
+        """
+        Send one FSSSignalDiscovered message for signals already checked to be in the given system.
+
+        :param cmdr: the commander under which this upload is made
+        :param system_name: Name of the system the signals are in
+        :param system_starpos: Coordinates of the system the signals are in
+        :param is_beta: whether or not we are in beta mode
+        :param system_address: SystemAddress of the system the signals are in
+        :param signals: The signals, with elisions already applied
+        """
         msg: dict = {
             '$schemaRef': f'https://eddn.edcd.io/schemas/fsssignaldiscovered/1{"/test" if is_beta else ""}',
             'message': {
                 "event": "FSSSignalDiscovered",
-                "timestamp": self.fss_signals[0]['timestamp'],
-                "SystemAddress": aug_systemaddress,
-                "StarSystem": aug_starsystem,
-                "StarPos": aug_starpos,
-                "signals": [],
+                "timestamp": signals[0]['timestamp'],
+                "SystemAddress": system_address,
+                "StarSystem": system_name,
+                "StarPos": list(system_starpos),
+                "signals": signals,
+                "horizons": this.horizons,
+                "odyssey": this.odyssey,
             }
         }
 
-        # Now add the signals, checking each is for the correct system, dropping
-        # any that aren't, and applying necessary elisions.
-        for s in self.fss_signals:
-            if s['SystemAddress'] != aug_systemaddress:
-                logger.warning("Signal's SystemAddress not current system, dropping: "
-                               f"{s['SystemAddress']} != {aug_systemaddress}")
-                continue
-
-            # Drop Mission USS signals.
-            if "USSType" in s and s["USSType"] == "$USS_Type_MissionTarget;":
-                logger.trace_if("plugin.eddn.fsssignaldiscovered", "USSType is $USS_Type_MissionTarget;, dropping")
-                continue
-
-            # Remove any _Localised keys (would only be in a USS signal)
-            s = filter_localised(s)
-
-            # Remove any key/values that shouldn't be there per signal
-            s.pop('event', None)
-            s.pop('horizons', None)
-            s.pop('odyssey', None)
-            s.pop('TimeRemaining', None)
-            s.pop('SystemAddress', None)
-
-            msg['message']['signals'].append(s)
-
-        if not msg['message']['signals']:
-            # No signals passed checks, so drop them all and return
-            logger.debug('No signals after checks, so sending no message')
-            self.fss_signals = []
-            return None
-
-        # `horizons` and `odyssey` augmentations
-        msg['message']['horizons'] = entry['horizons']
-        msg['message']['odyssey'] = entry['odyssey']
-
         logger.trace_if("plugin.eddn.fsssignaldiscovered", f"FSSSignalDiscovered batch is {json.dumps(msg)}")
 
         this.eddn.send_message(cmdr, msg)
-        self.fss_signals = []
-
-        return None
 
     def export_journal_dockingdenied(
             self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]
@@ -2120,6 +2224,8 @@ def plugin_prefs(parent, cmdr: str, is_beta: bool) -> Frame:
     :param is_beta: `bool` - True if this is a beta version of the Game.
     :return: The tkinter frame we created.
     """
+    from prefs import prefsVersion  # prefs is only loaded once the settings dialog is opened
+
     if prefsVersion.shouldSetDefaults('0.0.0.0', not bool(config.get_int('output'))):
         output: int = config.OUT_EDDN_SEND_STATION_DATA | config.OUT_EDDN_SEND_NON_STATION  # default settings
 
@@ -2212,6 +2318,20 @@ def plugin_stop() -> None:
     logger.debug('Done.')
 
 
+# Elisions, compiled once.  All of these also drop `_Localised` keys, at any depth.
+LOCALISED_RE = r'_Localised$'
+ELISIONS: dict[str, Projection] = {
+    'journal': Projection(deny=(
+        'ActiveFine', 'CockpitBreach', 'BoostUsed', 'FuelLevel', 'FuelUsed', 'JumpDist', 'Latitude', 'Longitude',
+        'Wanted', 'Factions.HappiestSystem', 'Factions.HomeSystem', 'Factions.MyReputation', 'Factions.SquadronFaction',
+    ), drop_key=LOCALISED_RE),
+    'codexentry': Projection(deny=('IsNewEntry', 'NewTraitsDiscovered'), drop_key=LOCALISED_RE),
+    'fssdiscoveryscan': Projection(deny=('Progress',), drop_key=LOCALISED_RE),
+}
+_localised = Projection(drop_key=LOCALISED_RE)
+_capi_localised = Projection(drop_key=EDDN.CAPI_LOCALISATION_RE)
+
+
 def filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
     """
     Recursively remove any dict keys with names ending `_Localised` from a dict.
@@ -2219,21 +2339,7 @@ def filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
     :param d: dict to filter keys of.
     :return: The filtered dict.
     """
-    filtered: dict[str, Any] = {}
-    for k, v in d.items():
-        if k.endswith('_Localised'):
-            pass
-
-        elif hasattr(v, 'items'):  # dict -> recurse
-            filtered[k] = filter_localised(v)
-
-        elif isinstance(v, list):  # list of dicts -> recurse
-            filtered[k] = [filter_localised(x) if hasattr(x, 'items') else x for x in v]
-
-        else:
-            filtered[k] = v
-
-    return filtered
+    return _localised(d)
 
 
 def capi_filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
@@ -2243,21 +2349,7 @@ def capi_filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
     :param d: dict to filter keys of.
     :return: The filtered dict.
     """
-    filtered: dict[str, Any] = {}
-    for k, v in d.items():
-        if EDDN.CAPI_LOCALISATION_RE.search(k):
-            pass
-
-        elif hasattr(v, 'items'):  # dict -> recurse
-            filtered[k] = capi_filter_localised(v)
-
-        elif isinstance(v, list):  # list of dicts -> recurse
-            filtered[k] = [capi_filter_localised(x) if hasattr(x, 'items') else x for x in v]
-
-        else:
-            filtered[k] = v
-
-    return filtered
+    return _capi_localised(d)
 
 
 def journal_entry(  # noqa: C901, CCR001
@@ -2333,7 +2425,7 @@ def journal_entry(  # noqa: C901, CCR001
     tracking_ui_update()
 
     # Events with their own EDDN schema
-    if config.get_int('output') & config.OUT_EDDN_SEND_NON_STATION and not state['Captain']:
+    if config.output & config.OUT_EDDN_SEND_NON_STATION and not state['Captain']:
 
         if event_name == 'fssdiscoveryscan':
             return this.eddn.export_journal_fssdiscoveryscan(cmdr, system, state['StarPos'], is_beta, entry)
@@ -2375,7 +2467,7 @@ def journal_entry(  # noqa: C901, CCR001
             )
 
         if event_name == 'fsssignaldiscovered':
-            this.eddn.enqueue_journal_fsssignaldiscovered(entry)
+            this.eddn.enqueue_journal_fsssignaldiscovered(cmdr, is_beta, entry)
 
         if event_name == 'fssallbodiesfound':
             return this.eddn.export_journal_fssallbodiesfound(
@@ -2396,35 +2488,12 @@ def journal_entry(  # noqa: C901, CCR001
             )
 
     # Send journal schema events to EDDN, but not when on a crew
-    if (config.get_int('output') & config.OUT_EDDN_SEND_NON_STATION and not state['Captain'] and
+    if (config.output & config.OUT_EDDN_SEND_NON_STATION and not state['Captain'] and
         (event_name in ('location', 'fsdjump', 'docked', 'scan', 'saasignalsfound', 'carrierjump')) and
             ('StarPos' in entry or this.coordinates)):
 
-        # strip out properties disallowed by the schema
-        for thing in (
-            'ActiveFine',
-            'CockpitBreach',
-            'BoostUsed',
-            'FuelLevel',
-            'FuelUsed',
-            'JumpDist',
-            'Latitude',
-            'Longitude',
-            'Wanted'
-        ):
-            entry.pop(thing, None)
-
-        if 'Factions' in entry:
-            # Filter faction state to comply with schema restrictions regarding personal data. `entry` is a shallow copy
-            # so replace 'Factions' value rather than modify in-place.
-            entry['Factions'] = [
-                {
-                    k: v for k, v in f.items() if k not in (
-                        'HappiestSystem', 'HomeSystem', 'MyReputation', 'SquadronFaction'
-                    )
-                }
-                for f in entry['Factions']
-            ]
+        # strip out properties disallowed by the schema, including faction state regarding personal data
+        entry = ELISIONS['journal'](entry)
 
         # add planet to Docked event for planetary stations if known
         if event_name == 'docked' and state['Body'] is not None:
@@ -2475,7 +2544,7 @@ def journal_entry(  # noqa: C901, CCR001
             entry['StarPos'] = list(this.coordinates)
 
         try:
-            this.eddn.export_journal_generic(cmdr, is_beta, filter_localised(entry))
+            this.eddn.export_journal_generic(cmdr, is_beta, entry)
 
         except requests.exceptions.RequestException as e:
             logger.debug('Failed in send_message', exc_info=e)
@@ -2485,7 +2554,7 @@ def journal_entry(  # noqa: C901, CCR001
             logger.debug('Failed in export_journal_generic', exc_info=e)
             return str(e)
 
-    elif (config.get_int('output') & config.OUT_EDDN_SEND_STATION_DATA and not state['Captain'] and
+    elif (config.output & config.OUT_EDDN_SEND_STATION_DATA and not state['Captain'] and
           event_name in ('market', 'outfitting', 'shipyard')):
         # Market.json, Outfitting.json or Shipyard.json to process
 
@@ -2562,7 +2631,7 @@ def cmdr_data(data: CAPIData, is_beta: bool) -> str | None:  # noqa: CCR001
         this.cmdr_name = cmdr_name
 
     if (data['commander'].get('docked') or (this.on_foot and monitor.state['StationName'])
-            and config.get_int('output') & config.OUT_EDDN_SEND_STATION_DATA):
+            and config.output & config.OUT_EDDN_SEND_STATION_DATA):
         try:
             if this.marketId != data['lastStarport']['id']:
                 this.commodities = this.outfitting = this.shipyard = None
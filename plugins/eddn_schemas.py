@@ -0,0 +1,333 @@
+"""
+eddn_schemas.py - Checking EDDN messages before they're queued.
+
+Copyright (c) EDCD, All Rights Reserved
+Licensed under the GNU General Public License v2 or later.
+See LICENSE file.
+
+This is an EDMC 'core' plugin.
+
+All EDMC plugins are *dynamically* loaded at run-time.
+
+We build for Windows using `py2exe`.
+`py2exe` can't possibly know about anything in the dynamically loaded core plugins.
+
+Thus, you **MUST** check if any imports you add in this file are only
+referenced in this file (or only in any other core plugin), and if so...
+
+    YOU MUST ENSURE THAT PERTINENT ADJUSTMENTS ARE MADE IN
+    `build.py` TO ENSURE THE FILES ARE ACTUALLY PRESENT
+    IN AN END-USER INSTALLATION ON WINDOWS.
+
+The schemas here are cut down versions of those at
+<https://github.com/EDCD/EDDN/tree/live/schemas>, covering what the Gateway
+would reject a message we send for.  Every constraint in them is one the live
+schema has too, so they can never be stricter than the Gateway.  Anything they
+don't mention is left for the Gateway to judge.  They're compiled, once, into plain Python functions
+using only the small part of JSON Schema they need, so no extra dependency is
+required.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Callable
+from collections.abc import Mapping
+
+Validator = Callable[[Any, str], 'str | None']
+
+SCHEMA_REF_RE = re.compile(r'^https://eddn\.edcd\.io/schemas/(?P<name>[^/]+/\d+)(?:/test)?$')
+
+_DISALLOWED: dict[str, Any] = {'not': {}}
+_STRING: dict[str, Any] = {'type': 'string'}
+# Names the live schemas insist aren't empty
+_NAME: dict[str, Any] = {'type': 'string', 'minLength': 1}
+_STAR_POS: dict[str, Any] = {'type': 'array', 'items': {'type': 'number'}, 'minItems': 3, 'maxItems': 3}
+_HEADER: dict[str, Any] = {
+    'type': 'object',
+    'required': ['uploaderID', 'softwareName', 'softwareVersion'],
+    'properties': {
+        'uploaderID': _STRING,
+        'softwareName': _STRING,
+        'softwareVersion': _STRING,
+        'gameversion': _STRING,
+        'gamebuild': _STRING,
+    },
+}
+
+
+def _station(**properties: dict[str, Any]) -> dict[str, Any]:
+    """Build a message schema for the CAPI-style station data schemas."""
+    return {
+        'type': 'object',
+        'required': ['systemName', 'stationName', 'marketId', 'timestamp', *properties],
+        'properties': {
+            'systemName': _NAME,
+            'stationName': _NAME,
+            'marketId': {'type': 'integer'},
+            'timestamp': _STRING,
+            'horizons': {'type': 'boolean'},
+            'odyssey': {'type': 'boolean'},
+            **properties,
+        },
+    }
+
+
+def _journal(*required: str, system: str | None = 'StarSystem', **properties: dict[str, Any]) -> dict[str, Any]:
+    """Build a message schema for a Journal-event-based schema."""
+    location = {system: _NAME, 'StarPos': _STAR_POS, 'SystemAddress': {'type': 'integer'}} if system else {}
+    return {
+        'type': 'object',
+        'required': ['timestamp', 'event', *location, *required],
+        'properties': {'timestamp': _STRING, 'event': _STRING, **location, **properties},
+        'patternProperties': {'_Localised$': _DISALLOWED},
+    }
+
+
+_COMMODITY = {
+    'type': 'object',
+    'required': [
+        'name', 'meanPrice', 'buyPrice', 'stock', 'stockBracket', 'sellPrice', 'demand', 'demandBracket'
+    ],
+    'properties': {
+        'name': _NAME,
+        'meanPrice': {'type': 'integer'},
+        'buyPrice': {'type': 'integer'},
+        'stock': {'type': 'integer'},
+        'sellPrice': {'type': 'integer'},
+        'demand': {'type': 'integer'},
+    },
+}
+
+# By '<name>/<version>', as found in `$schemaRef`, of the `message` part
+MESSAGE_SCHEMAS: dict[str, dict[str, Any]] = {
+    'commodity/3': _station(commodities={'type': 'array', 'items': _COMMODITY}),
+    'outfitting/2': _station(modules={'type': 'array', 'items': _NAME, 'minItems': 1}),
+    'shipyard/2': _station(ships={'type': 'array', 'items': _NAME, 'minItems': 1}),
+    'journal/1': _journal(event={'enum': [
+        'Docked', 'FSDJump', 'Scan', 'Location', 'SAASignalsFound', 'CarrierJump', 'CodexEntry'
+    ]}),
+    'approachsettlement/1': _journal('Name', 'BodyID', 'BodyName'),
+    'codexentry/1': _journal('EntryID', system='System'),
+    'dockingdenied/1': _journal('MarketID', 'StationName', 'Reason', system=None),
+    'dockinggranted/1': _journal('MarketID', 'StationName', 'LandingPad', system=None),
+    'fcmaterials_capi/1': _journal('MarketID', 'CarrierID', 'Items', system=None),
+    'fcmaterials_journal/1': _journal('MarketID', 'CarrierName', 'CarrierID', 'Items', system=None),
+    'fssallbodiesfound/1': _journal('Count', system='SystemName'),
+    'fssbodysignals/1': _journal('BodyID', 'Signals'),
+    'fssdiscoveryscan/1': _journal('BodyCount', 'NonBodyCount', system='SystemName'),
+    'fsssignaldiscovered/1': _journal('signals', signals={
+        'type': 'array',
+        'minItems': 1,
+        'items': {
+            'type': 'object',
+            'required': ['timestamp', 'SignalName'],
+            'properties': {
+                'event': _DISALLOWED,
+                'SystemAddress': _DISALLOWED,
+                'TimeRemaining': _DISALLOWED,
+            },
+            'patternProperties': {'_Localised$': _DISALLOWED},
+        },
+    }),
+    'navbeaconscan/1': _journal('NumBodies'),
+    'navroute/1': _journal('Route', system=None, Route={
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'required': ['StarSystem', 'SystemAddress', 'StarPos', 'StarClass'],
+            'properties': {'StarSystem': _NAME, 'SystemAddress': {'type': 'integer'}, 'StarPos': _STAR_POS},
+        },
+    }),
+    'scanbarycentre/1': _journal('BodyID'),
+}
+
+_TYPES: dict[str, Callable[[Any], bool]] = {
+    'object': lambda v: isinstance(v, Mapping),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def _build_not(schema: dict[str, Any]) -> Validator:
+    """Build the check for `not: {}`, which only disallows the key."""
+    return lambda value, path: f'{path} is not allowed'
+
+
+def _build_type(schema: dict[str, Any]) -> Validator:
+    """Build the check for `type`."""
+    type_check = _TYPES[schema['type']]
+    type_name = schema['type']
+    return lambda value, path: None if type_check(value) else f'{path} is not of type {type_name}'
+
+
+def _build_enum(schema: dict[str, Any]) -> Validator:
+    """Build the check for `enum`."""
+    allowed = tuple(schema['enum'])
+    return lambda value, path: None if value in allowed else f'{path} {value!r} is not one of {allowed}'
+
+
+def _build_min_length(schema: dict[str, Any]) -> Validator:
+    """Build the check for `minLength`."""
+    min_length = schema['minLength']
+    return lambda value, path: (
+        None if not isinstance(value, str) or len(value) >= min_length else f'{path} is shorter than {min_length}'
+    )
+
+
+def _build_required(schema: dict[str, Any]) -> Validator:
+    """Build the check for `required`."""
+    required = tuple(schema['required'])
+
+    def check_required(value: Any, path: str) -> str | None:
+        if isinstance(value, Mapping):
+            for key in required:
+                if key not in value:
+                    return f'{path}.{key} is required'
+
+        return None
+
+    return check_required
+
+
+def _build_properties(schema: dict[str, Any]) -> Validator:
+    """Build the check for `properties`."""
+    properties = {key: compile_schema(sub) for key, sub in schema['properties'].items()}
+
+    def check_properties(value: Any, path: str) -> str | None:
+        if isinstance(value, Mapping):
+            for key, check in properties.items():
+                if key in value and (error := check(value[key], f'{path}.{key}')):
+                    return error
+
+        return None
+
+    return check_properties
+
+
+def _build_pattern_properties(schema: dict[str, Any]) -> Validator:
+    """Build the check for `patternProperties`."""
+    patterns = [(re.compile(p), compile_schema(sub)) for p, sub in schema['patternProperties'].items()]
+
+    def check_patterns(value: Any, path: str) -> str | None:
+        if isinstance(value, Mapping):
+            for key, item in value.items():
+                for pattern, check in patterns:
+                    if pattern.search(key) and (error := check(item, f'{path}.{key}')):
+                        return error
+
+        return None
+
+    return check_patterns
+
+
+def _build_length(schema: dict[str, Any]) -> Validator:
+    """Build the check for `minItems` and `maxItems`."""
+    min_items, max_items = schema.get('minItems', 0), schema.get('maxItems')
+
+    def check_length(value: Any, path: str) -> str | None:
+        if isinstance(value, list):
+            if len(value) < min_items:
+                return f'{path} has fewer than {min_items} items'
+
+            if max_items is not None and len(value) > max_items:
+                return f'{path} has more than {max_items} items'
+
+        return None
+
+    return check_length
+
+
+def _build_items(schema: dict[str, Any]) -> Validator:
+    """Build the check for `items`."""
+    item_check = compile_schema(schema['items'])
+
+    def check_items(value: Any, path: str) -> str | None:
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                if error := item_check(item, f'{path}[{i}]'):
+                    return error
+
+        return None
+
+    return check_items
+
+
+# The keywords supported, and the builder of the check for each, in the order the checks are made
+_BUILDERS: tuple[tuple[tuple[str, ...], Callable[[dict[str, Any]], Validator]], ...] = (
+    (('not',), _build_not),
+    (('type',), _build_type),
+    (('enum',), _build_enum),
+    (('minLength',), _build_min_length),
+    (('required',), _build_required),
+    (('properties',), _build_properties),
+    (('patternProperties',), _build_pattern_properties),
+    (('minItems', 'maxItems'), _build_length),
+    (('items',), _build_items),
+)
+
+
+def compile_schema(schema: dict[str, Any]) -> Validator:
+    """
+    Turn a schema into a function checking a value against it.
+
+    Only `type`, `enum`, `minLength`, `required`, `properties`,
+    `patternProperties`, `items`, `minItems`, `maxItems` and `not: {}` (to
+    disallow a key) are supported.
+
+    :param schema: The schema.
+    :return: A function taking the value and its path, for error messages,
+      and returning a description of the first problem found, or `None`.
+    """
+    checks = [build(schema) for keywords, build in _BUILDERS if any(keyword in schema for keyword in keywords)]
+
+    def validate(value: Any, path: str) -> str | None:
+        for check in checks:
+            if error := check(value, path):
+                return error
+
+        return None
+
+    return validate
+
+
+_check_header = compile_schema(_HEADER)
+VALIDATORS: dict[str, Validator] = {name: compile_schema(schema) for name, schema in MESSAGE_SCHEMAS.items()}
+
+
+def schema_name(schema_ref: str) -> str | None:
+    """
+    Extract the '<name>/<version>' from an EDDN `$schemaRef`.
+
+    :param schema_ref: The `$schemaRef`.
+    :return: The name and version, or `None` if this isn't an EDDN schema URL.
+    """
+    if m := SCHEMA_REF_RE.match(schema_ref):
+        return m['name']
+
+    return None
+
+
+def validate(msg: Mapping[str, Any]) -> str | None:
+    """
+    Check a fully formed EDDN message against the schema in its `$schemaRef`.
+
+    Messages for schemas we don't have are assumed to be fine.
+
+    :param msg: The message, including `header`.
+    :return: A description of the first problem found, or `None` if there wasn't one.
+    """
+    name = schema_name(msg.get('$schemaRef', ''))
+    if name is None:
+        return f'$schemaRef {msg.get("$schemaRef")!r} is not an EDDN schema'
+
+    if error := _check_header(msg.get('header'), 'header'):
+        return error
+
+    if (check := VALIDATORS.get(name)) is None:
+        return None
+
+    return check(msg.get('message'), 'message')
@@ -24,13 +24,14 @@ from __future__ import annotations
 import json
 import threading
 import tkinter as tk
+from collections import Counter
 from datetime import datetime, timedelta, timezone
-from queue import Queue
+from queue import Empty, Queue
 from threading import Thread
-from time import sleep
+from time import sleep, time
 from tkinter import ttk
 from typing import Any, Literal, cast
-from collections.abc import Mapping, MutableMapping, Sequence
+from collections.abc import Iterator, Mapping, MutableMapping, Sequence
 import requests
 import killswitch
 import monitor
@@ -61,12 +62,185 @@ logger = get_main_logger()
 EDSM_POLL = 0.1
 _TIMEOUT = 20
 DISCARDED_EVENTS_SLEEP = 10
+RATE_LIMIT_RETRY = 60  # Seconds to hold off after a 429 that didn't say for how long
 
 # trace-if events
 CMDR_EVENTS = 'plugin.edsm.cmdr-events'
 CMDR_CREDS = 'plugin.edsm.cmdr-credentials'
 
 
+class RateLimit:
+    """
+    EDSM's API budget, as advertised in the `X-Rate-Limit-*` headers of its responses.
+
+    This is a token bucket that the server fills for us.  Each response says
+    how many requests are left and when the budget is next reset, and until
+    then we only spend what we've been told we have.  Until EDSM has said
+    anything there's no limit.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset: float = 0.0  # time() at which `remaining` goes back up to `limit`
+
+    def update(self, headers: Mapping[str, str], exhausted: bool = False, now: float | None = None) -> None:
+        """
+        Take the budget from the headers of a response.
+
+        :param headers: The response headers.
+        :param exhausted: Whether the request was refused for being over the limit.
+        :param now: The current `time()`, for testing.
+        """
+        now = time() if now is None else now
+        try:
+            limit, remaining, reset, retry_after = (
+                int(headers[h]) if headers.get(h) else None
+                for h in ('X-Rate-Limit-Limit', 'X-Rate-Limit-Remaining', 'X-Rate-Limit-Reset', 'Retry-After')
+            )
+
+        except ValueError:
+            logger.debug(f'Unparseable rate limit headers: {dict(headers)!r}')
+            limit = remaining = reset = retry_after = None
+
+        with self.lock:
+            if limit is not None:
+                self.limit = limit
+
+            if exhausted:
+                remaining = 0
+                reset = reset or retry_after or RATE_LIMIT_RETRY
+
+            if remaining is not None:
+                self.remaining = remaining
+                # EDSM has sent both an epoch timestamp and seconds from now here
+                self.reset = now if reset is None else float(reset if reset > 1_000_000_000 else now + reset)
+
+    def spend(self) -> None:
+        """Record that a request is being made."""
+        with self.lock:
+            if self.remaining:
+                self.remaining -= 1
+
+    def delay(self, now: float | None = None) -> float:
+        """
+        How long until a request can be made.
+
+        :param now: The current `time()`, for testing.
+        :return: Seconds to wait, `0.0` if there's budget left now.
+        """
+        now = time() if now is None else now
+        with self.lock:
+            if self.remaining is None or self.remaining > 0:
+                return 0.0
+
+            if now >= self.reset:
+                # Refilled.  If we never learnt the limit, assume none until told otherwise.
+                self.remaining = self.limit
+                return 0.0
+
+            return self.reset - now
+
+    def status(self) -> dict[str, Any]:
+        """
+        Report on the budget.
+
+        :return: The known `limit`, what's `remaining` of it, and seconds until it's reset (`reset_in`).
+        """
+        with self.lock:
+            return {
+                'limit': self.limit,
+                'remaining': self.remaining,
+                'reset_in': max(self.reset - time(), 0.0) if self.remaining is not None else None,
+            }
+
+
+class PendingEvents:
+    """
+    Events waiting to be sent to EDSM.
+
+    What `should_send()` needs to know about them is kept as counts by event
+    name, updated as events are added, so deciding whether to send doesn't
+    depend on how many there are.  Kill switches are applied to each event as
+    it's added, and only re-applied to all of them when the set of kill
+    switches has been refreshed.
+    """
+
+    LOCATION_EVENTS = ('CarrierJump', 'FSDJump', 'Location', 'Docked')
+    # Only worth sending on their own when starting a new game
+    DEFERRABLE_EVENTS = (
+        'CommunityGoal', 'ModuleBuy', 'ModuleSell', 'ModuleSwap', 'ShipyardBuy', 'ShipyardNew', 'ShipyardSwap'
+    )
+
+    def __init__(self) -> None:
+        self.events: list[Mapping[str, Any]] = []
+        self.counts: Counter[str] = Counter()
+        self.killswitches = killswitch.active
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return iter(self.events)
+
+    def _add(self, entry: Mapping[str, Any]) -> None:
+        skip, entry = killswitch.check_killswitch(f'plugin.edsm.worker.{entry["event"]}', entry, logger)
+        if not skip:
+            self.events.append(entry)
+            self.counts[entry['event']] += 1
+
+    def append(self, entry: Mapping[str, Any]) -> None:
+        """
+        Add an event, unless a kill switch drops it.
+
+        :param entry: The event.
+        """
+        self._add(entry)
+
+    def clear(self) -> None:
+        """Drop all the events."""
+        self.events = []
+        self.counts.clear()
+
+    def check_killswitches(self) -> None:
+        """Re-apply kill switches to all the events, if they've changed since they were last applied."""
+        if self.killswitches is killswitch.active:
+            return
+
+        self.killswitches = killswitch.active
+        events = self.events
+        self.clear()
+        for entry in events:
+            self._add(entry)
+
+    @property
+    def last_event(self) -> str | None:
+        """The name of the most recently added event."""
+        return self.events[-1]['event'] if self.events else None
+
+    @property
+    def has_location(self) -> bool:
+        """Whether any of the events are for a change of location."""
+        return any(self.counts[event] for event in self.LOCATION_EVENTS)
+
+    def sendable(self, newgame: bool, newgame_docked: bool) -> bool:
+        """
+        Whether any of the events are worth sending now.
+
+        :param newgame: Whether a new game has just been started.
+        :param newgame_docked: Whether it was started docked.
+        :return: `True` if so.
+        """
+        counts = self.counts
+        cargo, docked = counts['Cargo'], counts['Docked']
+        others = len(self.events) - cargo
+        if (cargo and not newgame_docked) or docked or (newgame and others):
+            return True
+
+        return others - docked - sum(counts[event] for event in self.DEFERRABLE_EVENTS) > 0
+
+
 class This:
     """Holds module globals."""
 
@@ -82,6 +256,8 @@ class This:
         self.session: requests.Session = requests.Session()
         self.session.headers['User-Agent'] = user_agent
         self.queue: Queue = Queue()		# Items to be sent to EDSM by worker thread
+        self.rate_limit = RateLimit()
+        self.pending_count = 0  # Events the worker is holding, for sender_status()
         self.discarded_events: set[str] = set()  # List discarded events from EDSM
         self.lastlookup: dict[str, Any]  # Result of last system lookup
 
@@ -712,31 +888,15 @@ def send_to_edsm(  # noqa: CCR001
     data: dict[str, Sequence[object]], pending: list[Mapping[str, Any]], closing: bool
 ) -> list[Mapping[str, Any]]:
     """Send data to the EDSM API endpoint and handle the API response."""
+    this.rate_limit.spend()
     response = this.session.post(TARGET_URL, data=data, timeout=_TIMEOUT)
     logger.trace_if('plugin.edsm.api', f'API response content: {response.content!r}')
 
-    # Check for rate limit headers
-    rate_limit_remaining = response.headers.get('X-Rate-Limit-Remaining')
-    rate_limit_reset = response.headers.get('X-Rate-Limit-Reset')
-
-    # Convert headers to integers if they exist
-    try:
-        remaining = int(rate_limit_remaining) if rate_limit_remaining else None
-        reset = int(rate_limit_reset) if rate_limit_reset else None
-    except ValueError:
-        remaining = reset = None
-
-    if remaining is not None and reset is not None:
-        # Respect rate limits if they exist
-        if remaining == 0:
-            # Calculate sleep time until the rate limit reset time
-            reset_time = datetime.fromtimestamp(reset, tz=timezone.utc)
-            current_time = datetime.now(timezone.utc)
-
-            sleep_time = (reset_time - current_time).total_seconds()
-
-            if sleep_time > 0:
-                sleep(sleep_time)
+    # Rather than waiting here for the budget to be reset, the worker holds on to events until it is
+    this.rate_limit.update(response.headers, exhausted=response.status_code == 429)
+    if response.status_code == 429:
+        logger.info(f'EDSM rate limit reached, holding {len(pending)} events for {this.rate_limit.delay():.0f}s')
+        return pending
 
     response.raise_for_status()
     reply = response.json()
@@ -775,6 +935,103 @@ def send_to_edsm(  # noqa: CCR001
     return pending
 
 
+def send_pending(cmdr: str, game_version: str, game_build: str, pending: PendingEvents, closing: bool) -> None:
+    """
+    Send a batch of events to EDSM.
+
+    :param cmdr: The Cmdr the events are for.
+    :param game_version: The game version the events came from.
+    :param game_build: The game build the events came from.
+    :param pending: The events, cleared if they were sent.
+    :param closing: Whether the plugin is shutting down.
+    """
+    creds = credentials(cmdr)
+    if creds is None:
+        raise ValueError("Unexpected lack of credentials")
+
+    username, apikey = creds
+    logger.trace_if(CMDR_EVENTS, f'({cmdr=}, {len(pending)=}): Using {username=} from credentials()')
+
+    data = {
+        'commanderName': username.encode('utf-8'),
+        'apiKey': apikey,
+        'fromSoftware': applongname,
+        'fromSoftwareVersion': str(appversion()),
+        'fromGameVersion': game_version,
+        'fromGameBuild': game_build,
+        'message': json.dumps(pending.events, ensure_ascii=False).encode('utf-8'),
+    }
+
+    if pending.has_location:
+        data_elided = data.copy()
+        data_elided['apiKey'] = '<elided>'
+        if isinstance(data_elided['message'], bytes):
+            data_elided['message'] = data_elided['message'].decode('utf-8')
+        if isinstance(data_elided['commanderName'], bytes):
+            data_elided['commanderName'] = data_elided['commanderName'].decode('utf-8')
+        logger.trace_if(
+            'journal.locations',
+            "pending has at least one of ('CarrierJump', 'FSDJump', 'Location', 'Docked')"
+            " Attempting API call with the following events:"
+        )
+        for p in pending:
+            logger.trace_if('journal.locations', f"Event: {p!r}")
+            if p['event'] in 'Location':
+                logger.trace_if(
+                    'journal.locations',
+                    f'Attempting API call for "Location" event with timestamp: {p["timestamp"]}'
+                )
+        logger.trace_if(
+            'journal.locations', f'Overall POST data (elided) is:\n{json.dumps(data_elided, indent=2)}'
+        )
+
+    if not send_to_edsm(data, pending.events, closing):
+        pending.clear()
+
+
+def send_held(cmdr: str, game_version: str, game_build: str, pending: PendingEvents, closing: bool) -> None:
+    """
+    Send events held back by the rate limit, as the session they belong to is ending.
+
+    Waits for the budget to be reset first, unless the plugin is closing. Whatever
+    still can't be sent is dropped.
+
+    :param cmdr: The Cmdr the events are for.
+    :param game_version: The game version the events came from.
+    :param game_build: The game build the events came from.
+    :param pending: The events, cleared once this returns.
+    :param closing: Whether the plugin is shutting down.
+    """
+    delay = this.rate_limit.delay()
+    if delay and not closing:
+        logger.info(f'Waiting {delay:.0f}s for the EDSM rate limit to send {len(pending)} held events')
+        while this.rate_limit.delay() and not this.shutting_down:
+            sleep(min(this.rate_limit.delay(), EDSM_POLL))
+
+    try:
+        send_pending(cmdr, game_version, game_build, pending, closing or this.shutting_down)
+
+    except Exception as e:
+        logger.debug('Attempt to send held API events failed', exc_info=e)
+        # LANG: EDSM Plugin - Error connecting to EDSM API
+        plug.show_error(tr.tl("Error: Can't connect to EDSM"))
+
+    if pending:
+        logger.warning(f'Dropping {len(pending)} events held back by the EDSM rate limit')
+        pending.clear()
+
+
+def sender_status() -> dict[str, Any]:
+    """
+    Report on the state of sending to EDSM, for monitoring.
+
+    :return: The API budget, as from `RateLimit.status()`, plus the number of
+      events waiting to be processed (`queued`) and processed but not yet sent
+      (`pending`).
+    """
+    return {**this.rate_limit.status(), 'queued': this.queue.qsize(), 'pending': this.pending_count}
+
+
 def worker() -> None:  # noqa: CCR001 C901
     """
     Handle uploading events to EDSM API.
@@ -785,11 +1042,13 @@ def worker() -> None:  # noqa: CCR001 C901
     :return: None
     """
     logger.debug('Starting...')
-    pending: list[Mapping[str, Any]] = []  # Unsent events
+    pending = PendingEvents()  # Unsent events
     closing = False
     cmdr: str = ""
+    last_cmdr = ""
     last_game_version = ""
     last_game_build = ""
+    send_due = False  # `pending` should have been sent, but we were out of budget
 
     # Process the Discard Queue
     process_discarded_events()
@@ -799,7 +1058,28 @@ def worker() -> None:  # noqa: CCR001 C901
             logger.debug(f'{this.shutting_down=}, so setting closing = True')
             closing = True
 
-        item: tuple[str, str, str, Mapping[str, Any]] | None = this.queue.get()
+        this.pending_count = len(pending)
+        item: tuple[str, str, str, Mapping[str, Any]] | None
+        if send_due:
+            try:
+                item = this.queue.get(timeout=max(this.rate_limit.delay(), EDSM_POLL))
+
+            except Empty:
+                # Budget's been reset, so send everything that's built up while waiting
+                try:
+                    send_pending(cmdr, last_game_version, last_game_build, pending, closing)
+
+                except Exception as e:
+                    logger.debug('Attempt to send held API events failed', exc_info=e)
+                    # LANG: EDSM Plugin - Error connecting to EDSM API
+                    plug.show_error(tr.tl("Error: Can't connect to EDSM"))
+
+                send_due = bool(pending) and this.rate_limit.delay() > 0
+                continue
+
+        else:
+            item = this.queue.get()
+
         if item:
             (cmdr, game_version, game_build, entry) = item
             logger.trace_if(CMDR_EVENTS, f'De-queued ({cmdr=}, {game_version=}, {game_build=}, {entry["event"]=})')
@@ -840,73 +1120,42 @@ def worker() -> None:  # noqa: CCR001 C901
                         entry['event'].lower() == 'fileheader'
                         or last_game_version != game_version or last_game_build != game_build
                     ):
-                        pending = []
+                        if send_due:
+                            # These should have been sent already, so don't lose them with the session
+                            send_held(last_cmdr, last_game_version, last_game_build, pending, closing)
+                            send_due = False
+
+                        pending.clear()
                     pending.append(entry)
                 # drop events if required by killswitch
-                new_pending = []
-                for e in pending:
-                    skip, new = killswitch.check_killswitch(f'plugin.edsm.worker.{e["event"]}', e, logger)
-                    if skip:
-                        continue
-                    new_pending.append(new)
-                pending = new_pending
-
-                if pending and should_send(pending, entry['event']):
-                    logger.trace_if(CMDR_EVENTS, f'({cmdr=}, {entry["event"]=}): should_send() said True')
-                    logger.trace_if(CMDR_EVENTS, f'pending contains:\n{chr(0x0A).join(str(p) for p in pending)}')
-
-                    if any(p for p in pending if p['event'] in ('CarrierJump', 'FSDJump', 'Location', 'Docked')):
-                        logger.trace_if('journal.locations', "pending has at least one of "
-                                        "('CarrierJump', 'FSDJump', 'Location', 'Docked')"
-                                        " and it passed should_send()")
-                        for p in pending:
-                            if p['event'] in 'Location':
-                                logger.trace_if(
-                                    'journal.locations',
-                                    f'"Location" event in pending passed should_send(), timestamp: {p["timestamp"]}'
-                                )
-
-                    creds = credentials(cmdr)
-                    if creds is None:
-                        raise ValueError("Unexpected lack of credentials")
-
-                    username, apikey = creds
-                    logger.trace_if(CMDR_EVENTS, f'({cmdr=}, {entry["event"]=}): Using {username=} from credentials()')
-
-                    data = {
-                        'commanderName': username.encode('utf-8'),
-                        'apiKey': apikey,
-                        'fromSoftware': applongname,
-                        'fromSoftwareVersion': str(appversion()),
-                        'fromGameVersion': game_version,
-                        'fromGameBuild': game_build,
-                        'message': json.dumps(pending, ensure_ascii=False).encode('utf-8'),
-                    }
-
-                    if any(p for p in pending if p['event'] in ('CarrierJump', 'FSDJump', 'Location', 'Docked')):
-                        data_elided = data.copy()
-                        data_elided['apiKey'] = '<elided>'
-                        if isinstance(data_elided['message'], bytes):
-                            data_elided['message'] = data_elided['message'].decode('utf-8')
-                        if isinstance(data_elided['commanderName'], bytes):
-                            data_elided['commanderName'] = data_elided['commanderName'].decode('utf-8')
-                        logger.trace_if(
-                            'journal.locations',
-                            "pending has at least one of ('CarrierJump', 'FSDJump', 'Location', 'Docked')"
-                            " Attempting API call with the following events:"
-                        )
-                        for p in pending:
-                            logger.trace_if('journal.locations', f"Event: {p!r}")
-                            if p['event'] in 'Location':
-                                logger.trace_if(
-                                    'journal.locations',
-                                    f'Attempting API call for "Location" event with timestamp: {p["timestamp"]}'
-                                )
-                        logger.trace_if(
-                            'journal.locations', f'Overall POST data (elided) is:\n{json.dumps(data_elided, indent=2)}'
-                        )
-
-                    pending = send_to_edsm(data, pending, closing)
+                pending.check_killswitches()
+
+                if pending and (should_send(pending, entry['event']) or send_due):
+                    delay = this.rate_limit.delay()
+                    if delay and not closing:
+                        # Out of budget, so keep collecting events, to send together when it's reset
+                        if not send_due:
+                            logger.info(f'EDSM rate limit reached, holding events for {delay:.0f}s')
+
+                        send_due = True
+
+                    else:
+                        logger.trace_if(CMDR_EVENTS, f'({cmdr=}, {entry["event"]=}): should_send() said True')
+                        logger.trace_if(CMDR_EVENTS, f'pending contains:\n{chr(0x0A).join(str(p) for p in pending)}')
+
+                        if pending.has_location:
+                            logger.trace_if('journal.locations', "pending has at least one of "
+                                            "('CarrierJump', 'FSDJump', 'Location', 'Docked')"
+                                            " and it passed should_send()")
+                            for p in pending:
+                                if p['event'] in 'Location':
+                                    logger.trace_if(
+                                        'journal.locations',
+                                        f'"Location" event in pending passed should_send(), timestamp: {p["timestamp"]}'
+                                    )
+
+                        send_pending(cmdr, game_version, game_build, pending, closing)
+                        send_due = bool(pending) and this.rate_limit.delay() > 0
 
                 break  # No exception, so assume success
 
@@ -919,17 +1168,22 @@ def worker() -> None:  # noqa: CCR001 C901
             plug.show_error(tr.tl("Error: Can't connect to EDSM"))
         if entry['event'].lower() in ('shutdown', 'commander', 'fileheader'):
             # Game shutdown or new login, so we MUST not hang on to pending
-            pending = []
+            if send_due:
+                send_held(cmdr, game_version, game_build, pending, closing)
+
+            pending.clear()
             logger.trace_if(CMDR_EVENTS, f'Blanked pending because of event: {entry["event"]}')
+        send_due = send_due and bool(pending)
         if closing:
             logger.debug('closing, so returning.')
             return
 
+        last_cmdr = cmdr
         last_game_version = game_version
         last_game_build = game_build
 
 
-def should_send(entries: list[Mapping[str, Any]], event: str) -> bool:  # noqa: CCR001
+def should_send(entries: PendingEvents, event: str) -> bool:
     """
     Whether or not any of the given entries should be sent to EDSM.
 
@@ -937,31 +1191,12 @@ def should_send(entries: list[Mapping[str, Any]], event: str) -> bool:  # noqa:
     :param event: The latest event being processed
     :return: bool indicating whether or not to send said entries
     """
-    def should_send_entry(entry: Mapping[str, Any]) -> bool:
-        if entry['event'] == 'Cargo':
-            return not this.newgame_docked
-        if entry['event'] == 'Docked':
-            return True
-        if this.newgame:
-            return True
-        if entry['event'] not in (
-            'CommunityGoal',
-            'ModuleBuy',
-            'ModuleSell',
-            'ModuleSwap',
-            'ShipyardBuy',
-            'ShipyardNew',
-            'ShipyardSwap'
-        ):
-            return True
-        return False
-
     if event.lower() in ('shutdown', 'fileheader'):
         logger.trace_if(CMDR_EVENTS, f'True because {event=}')
         return True
 
     if this.navbeaconscan:
-        if entries and entries[-1]['event'] == 'Scan':
+        if entries.last_event == 'Scan':
             this.navbeaconscan -= 1
             should_send_result = this.navbeaconscan == 0
             logger.trace_if(CMDR_EVENTS, f'False because {this.navbeaconscan=}' if not should_send_result else '')
@@ -970,7 +1205,7 @@ def should_send(entries: list[Mapping[str, Any]], event: str) -> bool:  # noqa:
                      "doesn't exist or doesn't have the expected content")
         this.navbeaconscan = 0
 
-    should_send_result = any(should_send_entry(entry) for entry in entries)
+    should_send_result = entries.sendable(this.newgame, this.newgame_docked)
     logger.trace_if(CMDR_EVENTS, f'False as default: {this.newgame_docked=}' if not should_send_result else '')
     return should_send_result
 
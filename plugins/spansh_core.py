@@ -33,6 +33,9 @@ from plugins.common_coreutils import (station_link_common, this_format_common,
 
 logger = get_main_logger()
 
+# We never modify the entry or state we're passed, so can share plug.py's read-only snapshot.
+plugin_readonly_data = True
+
 
 class This:
     """Holds module globals."""
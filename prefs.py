@@ -50,6 +50,8 @@ def open_folder(file: Path) -> None:
 
 def help_open_system_profiler(parent) -> None:
     """Open the EDMC System Profiler."""
+    # So that the profiler can report on how long each plugin's callbacks are taking
+    plug.dump_timings()
     if IS_FROZEN:
         cmd = [str(Path(config.respath_path) / 'EDMCSystemProfiler.exe')]
     else:
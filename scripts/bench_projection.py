@@ -0,0 +1,126 @@
+"""Time util.projection.Projection against the recursive filters it replaced in the EDDN plugin."""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import re
+import sys
+import timeit
+from collections.abc import Mapping
+from typing import Any
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from util.projection import Projection  # noqa: E402
+
+CAPI_LOCALISATION_RE = re.compile(r'^loc[A-Z].+')
+
+
+def capi_filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
+    """Filter as plugins/eddn.py did before it used Projection."""
+    filtered: dict[str, Any] = {}
+    for k, v in d.items():
+        if CAPI_LOCALISATION_RE.search(k):
+            pass
+
+        elif hasattr(v, 'items'):  # dict -> recurse
+            filtered[k] = capi_filter_localised(v)
+
+        elif isinstance(v, list):  # list of dicts -> recurse
+            filtered[k] = [capi_filter_localised(x) if hasattr(x, 'items') else x for x in v]
+
+        else:
+            filtered[k] = v
+
+    return filtered
+
+
+def filter_localised(d: Mapping[str, Any]) -> dict[str, Any]:
+    """Filter as plugins/eddn.py did before it used Projection."""
+    filtered: dict[str, Any] = {}
+    for k, v in d.items():
+        if k.endswith('_Localised'):
+            pass
+
+        elif hasattr(v, 'items'):  # dict -> recurse
+            filtered[k] = filter_localised(v)
+
+        elif isinstance(v, list):  # list of dicts -> recurse
+            filtered[k] = [filter_localised(x) if hasattr(x, 'items') else x for x in v]
+
+        else:
+            filtered[k] = v
+
+    return filtered
+
+
+def capi_market(commodities: int, orders: int) -> dict[str, Any]:
+    """Build a CAPI /market response of the given size."""
+    return {
+        'id': 128016640,
+        'name': 'Abraham Lincoln',
+        'outpostType': 'starport',
+        'imported': {str(i): f'Import{i}' for i in range(20)},
+        'exported': {str(i): f'Export{i}' for i in range(20)},
+        'services': {'commodities': 'ok', 'outfitting': 'ok', 'shipyard': 'ok'},
+        'economies': {'0': {'name': 'Service', 'proportion': 1.0}},
+        'prohibited': {'1': 'BasicNarcotics'},
+        'commodities': [
+            {
+                'id': 128049152 + i, 'name': f'Commodity{i}', 'locName': f'Commodity {i}', 'legality': '',
+                'buyPrice': 100 + i, 'sellPrice': 90 + i, 'meanPrice': 95 + i, 'demandBracket': 2,
+                'stockBracket': 2, 'stock': 1000, 'demand': 1000, 'statusFlags': [], 'categoryname': 'Metals',
+                'locCategoryname': 'Metals',
+            }
+            for i in range(commodities)
+        ],
+        'orders': {
+            'onfootmicroresources': {
+                'sales': {
+                    str(i): {'name': f'resource{i}', 'locName': f'Resource {i}', 'price': 10, 'stock': 5}
+                    for i in range(orders)
+                },
+            },
+        },
+    }
+
+
+def scan_event() -> dict[str, Any]:
+    """Build a detailed Scan journal event."""
+    return {
+        'timestamp': '2024-05-12T18:21:07Z', 'event': 'Scan', 'ScanType': 'Detailed', 'BodyName': 'Sol 3',
+        'BodyID': 3, 'Parents': [{'Star': 0}], 'StarSystem': 'Sol', 'SystemAddress': 10477373803,
+        'DistanceFromArrivalLS': 499.0, 'TidalLock': False, 'TerraformState': '', 'PlanetClass': 'Earthlike body',
+        'Atmosphere': 'earth-like atmosphere', 'AtmosphereType': 'EarthLike',
+        'AtmosphereComposition': [{'Name': n, 'Percent': 10.0} for n in ('Nitrogen', 'Oxygen', 'Water', 'Argon')],
+        'Volcanism': '', 'Volcanism_Localised': '', 'MassEM': 1.0, 'Radius': 6371000.0, 'SurfaceGravity': 9.8,
+        'SurfaceTemperature': 288.0, 'SurfacePressure': 101325.0, 'Landable': False,
+        'Materials': [{'Name': f'mat{i}', 'Name_Localised': f'Mat {i}', 'Percent': 5.0} for i in range(10)],
+        'Composition': {'Ice': 0.0, 'Rock': 0.7, 'Metal': 0.3},
+        'Rings': [{'Name': 'Sol 3 A Ring', 'RingClass': 'eRingClass_Rocky', 'MassMT': 1.0}],
+        'WasDiscovered': True, 'WasMapped': True,
+    }
+
+
+def main() -> None:
+    """Print the time per call of each filter, old and new."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=200, help='Calls per timing run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs, the best of which is reported')
+    args = parser.parse_args()
+
+    cases = (
+        ('CAPI market, 400 commodities, 200 orders', capi_market(400, 200),
+         capi_filter_localised, Projection(drop_key=CAPI_LOCALISATION_RE)),
+        ('Detailed Scan', scan_event(), filter_localised, Projection(drop_key=r'_Localised$')),
+    )
+    for name, data, old, new in cases:
+        assert old(data) == new(data), name
+        print(name)
+        for label, func in (('recursive', old), ('Projection', new)):
+            best = min(timeit.repeat(lambda: func(data), number=args.number, repeat=args.repeat))  # noqa: B023
+            print(f'  {label:>10}: {best / args.number * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
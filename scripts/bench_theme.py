@@ -0,0 +1,70 @@
+"""Time re-theming the widgets of many plugin frames, as a theme switch does. Needs a display."""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import sys
+import timeit
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from theme import theme  # noqa: E402
+
+# Fixed palettes, rather than _colors(), which would write defaults into the user's settings
+PALETTES = (
+    {
+        'background': 'grey4', 'foreground': '#ff8000', 'activebackground': '#ff8000', 'activeforeground': 'grey4',
+        'disabledforeground': '#aa5500', 'highlight': 'white', 'font': 'TkDefaultFont',
+    },
+    {
+        'background': '#d9d9d9', 'foreground': 'black', 'activebackground': '#ececec', 'activeforeground': 'black',
+        'disabledforeground': '#a3a3a3', 'highlight': 'blue', 'font': 'TkDefaultFont',
+    },
+)
+
+
+def plugin_frame(parent: tk.Misc, n: int) -> tk.Frame:
+    """Build a frame like a typical plugin's, a handful of labels, buttons and entries."""
+    frame = tk.Frame(parent)
+    for row in range(3):
+        tk.Label(frame, text=f'Plugin {n} label {row}').grid(row=row, column=0)
+        ttk.Label(frame, text='value').grid(row=row, column=1)
+
+    tk.Button(frame, text='Go').grid(row=3, column=0)
+    tk.Entry(frame).grid(row=3, column=1)
+    tk.Label(frame, text='link', cursor='hand2').grid(row=4, column=0)
+    tk.Canvas(frame, width=10, height=10).grid(row=4, column=1)
+    return frame
+
+
+def main() -> None:
+    """Print the time to re-theme every registered widget."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--plugins', type=int, default=30, help='Plugin frames to build')
+    parser.add_argument('--number', type=int, default=20, help='Theme switches per timing run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs, the best of which is reported')
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    for n in range(args.plugins):
+        frame = plugin_frame(root, n)
+        frame.grid(row=n, column=0)
+        theme.register(frame)
+
+    root.update_idletasks()
+    switches = iter(range(sys.maxsize))
+
+    def switch() -> None:
+        theme.current = PALETTES[next(switches) % 2]
+        for widget in list(theme.widgets):
+            theme._update_widget(widget)
+
+    best = min(timeit.repeat(switch, number=args.number, repeat=args.repeat))
+    print(f'{len(theme.widgets)} widgets in {args.plugins} plugin frames: {best / args.number * 1e3:.1f} ms per switch')
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main()
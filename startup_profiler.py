@@ -0,0 +1,152 @@
+"""
+startup_profiler.py - Wall time and import cost of application startup.
+
+Copyright (c) EDCD, All Rights Reserved
+Licensed under the GNU General Public License v2 or later.
+See LICENSE file.
+
+Enabled with `--profile-startup`.  This has to be usable before config and
+logging are set up, so must only ever import from the standard library.
+"""
+from __future__ import annotations
+
+import builtins
+import pathlib
+import sys
+import threading
+from time import perf_counter
+from typing import Any, Callable
+
+PROFILE_FILENAME = 'startup_profile.txt'
+MODULE_BUDGET_MS = 100  # A top-level import taking longer than this is reported as over budget
+
+
+class ImportNode:
+    """One module import, and the imports it triggered in turn."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.cumulative = 0.0
+        self.children: list[ImportNode] = []
+
+    @property
+    def self_time(self) -> float:
+        """Time spent in this module, excluding the profiled imports it made."""
+        return self.cumulative - sum(child.cumulative for child in self.children)
+
+
+class StartupProfiler:
+    """Record named startup phases and a tree of the imports made during them."""
+
+    def __init__(self) -> None:
+        self.active = False
+        self.phases: list[tuple[str, float]] = []
+        self.root = ImportNode('')
+        self._stack: list[ImportNode] = [self.root]
+        self._original_import: Callable[..., Any] | None = None
+        self._started = 0.0
+        self._last = 0.0
+
+    def start(self) -> None:
+        """Begin timing, hooking imports made on the main thread."""
+        if self.active:
+            return
+
+        self.active = True
+        self._started = self._last = perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def _import(self, name: str, globals=None, locals=None, fromlist=(), level=0):  # noqa: A002
+        assert self._original_import is not None
+        # Relative imports are attributed to their parent, and other threads would corrupt the stack.
+        if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        node = ImportNode(name)
+        self._stack[-1].children.append(node)
+        self._stack.append(node)
+        start = perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        finally:
+            node.cumulative = perf_counter() - start
+            self._stack.pop()
+
+    def mark(self, phase: str) -> None:
+        """
+        Record the end of a startup phase.
+
+        Does nothing unless profiling was started.
+
+        :param phase: Name of the phase that has just finished.
+        """
+        if not self.active:
+            return
+
+        now = perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def over_budget(self) -> list[ImportNode]:
+        """
+        Get the top-level imports that took longer than MODULE_BUDGET_MS.
+
+        :return: The offending imports, slowest first.
+        """
+        slow = [node for node in self.root.children if node.cumulative * 1000 > MODULE_BUDGET_MS]
+        return sorted(slow, key=lambda node: node.cumulative, reverse=True)
+
+    def summary(self) -> str:
+        """
+        Summarise the recorded phases.
+
+        :return: One line per phase, then the total.
+        """
+        lines = [f'{phase:<20} {elapsed * 1000:8.1f} ms' for phase, elapsed in self.phases]
+        lines.append(f'{"total":<20} {(self._last - self._started) * 1000:8.1f} ms')
+        return '\n'.join(lines)
+
+    def import_tree(self) -> str:
+        """
+        Format the import tree in the style of `python -X importtime`.
+
+        :return: The tree, children listed before the module that imported them.
+        """
+        lines = ['import time: self [us] | cumulative | imported package']
+
+        def walk(node: ImportNode, depth: int) -> None:
+            for child in node.children:
+                walk(child, depth + 1)
+                lines.append(
+                    f'import time: {int(child.self_time * 1e6):>9} | {int(child.cumulative * 1e6):>10} | '
+                    f'{"  " * depth}{child.name}'
+                )
+
+        walk(self.root, 0)
+        return '\n'.join(lines)
+
+    def finish(self, path: pathlib.Path) -> pathlib.Path:
+        """
+        Stop profiling and write the phase summary and import tree out.
+
+        :param path: File to write to.
+        :return: The path written.
+        """
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+        self.active = False
+        budget = [f'{node.name}: {node.cumulative * 1000:.1f} ms' for node in self.over_budget()]
+        path.write_text(
+            f'{self.summary()}\n\n'
+            f'Imports over {MODULE_BUDGET_MS} ms:\n' + ''.join(f'  {line}\n' for line in budget) + '\n'
+            f'{self.import_tree()}\n',
+            encoding='utf-8'
+        )
+        return path
+
+
+profiler = StartupProfiler()
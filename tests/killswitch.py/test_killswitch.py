@@ -5,7 +5,9 @@
 from __future__ import annotations
 
 import copy
+import json
 import pytest
+from unittest.mock import patch
 import semantic_version
 
 import killswitch
@@ -70,7 +72,9 @@ def test_killswitch(
 
     assert (
         not should_return
-    ) == should_pass, f'expected to {"pass" if should_pass else "fail"}, but {"passed" if not should_pass else "failed"}'
+    ) == should_pass, (
+        f'expected to {"pass" if should_pass else "fail"}, but {"passed" if not should_pass else "failed"}'
+    )
 
     if result is None:
         return  # we didn't expect any result
@@ -141,3 +145,46 @@ def test_check_multiple(
     )
     assert should_return == expected_return
     assert data == result
+
+
+CACHED_JSON = {
+    "version": 2,
+    "last_updated": "today",
+    "kill_switches": [{"version": "1.0.0", "kills": {"cached-kill": {"reason": "from the cache"}}}],
+}
+
+
+def test_cache_round_trip(tmp_path) -> None:
+    """Fetched kill switches are cached, and load back as the same set."""
+    cache_path = tmp_path / killswitch.CACHE_FILENAME
+    with patch("killswitch.fetch_kill_switches", return_value=CACHED_JSON):
+        fetched = killswitch.get_kill_switches(cache_path=cache_path)
+
+    cached = killswitch.load_cached_kill_switches(cache_path)
+    assert cached is not None
+    assert cached.is_disabled("cached-kill", version=semantic_version.Version("1.0.0"))
+    assert fetched.is_disabled("cached-kill", version=semantic_version.Version("1.0.0"))
+
+
+def test_cache_missing_or_corrupt(tmp_path) -> None:
+    """No usable cache is reported as None rather than raising."""
+    cache_path = tmp_path / killswitch.CACHE_FILENAME
+    assert killswitch.load_cached_kill_switches(cache_path) is None
+    cache_path.write_text("{not json")
+    assert killswitch.load_cached_kill_switches(cache_path) is None
+
+
+def test_setup_uses_cache_then_refreshes(tmp_path) -> None:
+    """With a cache present, it's used immediately and the fetch happens off thread."""
+    (tmp_path / killswitch.CACHE_FILENAME).write_text(json.dumps(CACHED_JSON))
+    refreshed = killswitch.KillSwitchSet([])
+    with patch.object(killswitch.config.config, "app_dir_path", tmp_path), \
+            patch("killswitch.get_kill_switches_thread") as mock_thread, \
+            patch.object(killswitch, "active", killswitch.KillSwitchSet([])):
+        killswitch.setup_main_list(None, refresh_interval=None)
+        assert killswitch.is_disabled("cached-kill", version=semantic_version.Version("1.0.0"))
+
+        mock_thread.assert_called_once()
+        callback = mock_thread.call_args.args[1]
+        callback(refreshed)
+        assert killswitch.active is refreshed
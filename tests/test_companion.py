@@ -0,0 +1,301 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the CAPI query worker."""
+
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import companion
+
+PROFILE = {
+    "commander": {"name": "Cmdr", "docked": True},
+    "lastSystem": {"name": "Sol"},
+    "lastStarport": {"name": "Abraham Lincoln +", "id": 128016640, "services": {"commodities": "ok", "shipyard": "ok"}},
+}
+MARKET = {"id": 128016640, "commodities": []}
+SHIPYARD = {"id": 128016640, "modules": {}, "ships": {}}
+
+
+def fake_get(responses, barrier=None):
+    """
+    Build a requests.Session.get that answers from `responses`.
+
+    If `barrier` is given every request waits on it, so only completes once enough are in flight at once.
+    A response that's an exception is raised instead.
+    """
+    calls = []
+
+    def get(url, timeout=None):
+        endpoint = url[len("https://capi"):]
+        calls.append(endpoint)
+        if barrier is not None:
+            barrier.wait()
+
+        if isinstance(responses[endpoint], Exception):
+            raise responses[endpoint]
+
+        body = json.dumps(responses[endpoint]).encode()
+        response = MagicMock(content=body, headers={"Date": "Sat, 01 Jan 2022 00:00:00 GMT"}, status_code=200)
+        response.json.return_value = json.loads(body)
+        return response
+
+    return get, calls
+
+
+@pytest.fixture
+def session():
+    """A Session with its worker running, torn down afterwards."""
+    session = companion.Session()
+    session.requests_session = MagicMock()
+    session.capi_raw_data = companion.CAPIDataRaw()
+    yield session
+    session.capi_query_close_worker()
+    session.capi_query_thread.join(5)
+
+
+def query_station(session):
+    session.station(int(time.time()))
+    return session.capi_response_queue.get(timeout=5)
+
+
+class TestStationQueries:
+
+    def test_market_and_shipyard_fetched_alongside_profile(self, session):
+        """With a docked journal state all three queries overlap, and are merged."""
+        # Each query only gets its response once all three are in flight together
+        session.requests_session.get, calls = fake_get(
+            {"/profile": PROFILE, "/market": MARKET, "/shipyard": SHIPYARD}, threading.Barrier(3, timeout=5)
+        )
+        with patch.object(session, "capi_host_for_galaxy", return_value="https://capi"), \
+                patch.dict(companion.monitor.state, {"MarketID": 128016640, "OnFoot": False}), \
+                patch.object(companion.monitor, "stationservices", ["dock", "commodities", "shipyard"]):
+            response = query_station(session)
+
+        assert isinstance(response, companion.EDMCCAPIResponse)
+        assert sorted(calls) == ["/market", "/profile", "/shipyard"]
+        last_starport = response.capi_data["lastStarport"]
+        assert last_starport["name"] == "Abraham Lincoln"
+        assert "commodities" in last_starport and "ships" in last_starport
+
+    def test_speculative_results_discarded_when_undocked(self, session):
+        """If /profile says we're not docked the speculative data isn't merged."""
+        profile = dict(PROFILE, commander={"name": "Cmdr", "docked": False})
+        session.requests_session.get, calls = fake_get(
+            {"/profile": profile, "/market": MARKET, "/shipyard": SHIPYARD}
+        )
+        with patch.object(session, "capi_host_for_galaxy", return_value="https://capi"), \
+                patch.dict(companion.monitor.state, {"MarketID": 128016640, "OnFoot": False}), \
+                patch.object(companion.monitor, "stationservices", ["commodities"]):
+            response = query_station(session)
+
+        assert "commodities" not in response.capi_data["lastStarport"]
+
+    def test_unused_speculative_failure_logged(self, session):
+        """A speculative query that isn't wanted still has its failure logged, rather than lost."""
+        import requests
+
+        profile = dict(PROFILE, commander={"name": "Cmdr", "docked": False})
+        session.requests_session.get, _ = fake_get({"/profile": profile, "/market": requests.ConnectionError()})
+        with patch.object(session, "capi_host_for_galaxy", return_value="https://capi"), \
+                patch.dict(companion.monitor.state, {"MarketID": 128016640, "OnFoot": False}), \
+                patch.object(companion.monitor, "stationservices", ["commodities"]), \
+                patch.object(companion, "logger") as mock_logger:
+            response = query_station(session)
+            assert isinstance(response, companion.EDMCCAPIResponse)
+            # The query may still be finishing
+            for _ in range(50):
+                if any("Unused CAPI station query failed" in str(c) for c in mock_logger.warning.call_args_list):
+                    break
+
+                time.sleep(0.1)
+
+            else:
+                pytest.fail("Failed speculative query wasn't logged")
+
+    def test_mismatched_market_is_lagging(self, session):
+        """A /market for a different station than /profile is reported as lagging."""
+        session.requests_session.get, _ = fake_get(
+            {"/profile": PROFILE, "/market": dict(MARKET, id=1), "/shipyard": SHIPYARD}
+        )
+        with patch.object(session, "capi_host_for_galaxy", return_value="https://capi"), \
+                patch.dict(companion.monitor.state, {"MarketID": None, "OnFoot": False}):
+            response = query_station(session)
+
+        assert isinstance(response, companion.EDMCCAPIFailedRequest)
+        assert isinstance(response.exception, companion.ServerLagging)
+
+    def test_lagging_market_refetched_on_retry(self, session):
+        """After a lagging /market the retry queries CAPI again, rather than getting it back from the cache."""
+        responses = {"/profile": PROFILE, "/market": dict(MARKET, id=1), "/shipyard": SHIPYARD}
+        session.requests_session.get, calls = fake_get(responses)
+        with patch.object(session, "capi_host_for_galaxy", return_value="https://capi"), \
+                patch.dict(companion.monitor.state, {"MarketID": 128016640, "OnFoot": False}), \
+                patch.object(companion.monitor, "stationservices", ["commodities", "shipyard"]):
+            response = query_station(session)
+            assert isinstance(response.exception, companion.ServerLagging)
+
+            responses["/market"] = MARKET
+            session.retrying = True
+            response = query_station(session)
+
+        assert isinstance(response, companion.EDMCCAPIResponse)
+        assert "commodities" in response.capi_data["lastStarport"]
+        assert calls.count("/market") == 2
+        assert calls.count("/profile") == 2
+
+
+class TestCAPIResponseCache:
+
+    def test_fresh_hit_is_a_copy(self):
+        """A second query inside the TTL is served from cache, as a separate copy."""
+        cache = companion.CAPIResponseCache({"/profile": 60})
+        fetch = MagicMock(return_value=companion.CAPIData({"commander": {"name": "Cmdr"}}))
+        key = ("Cmdr", "https://capi", "/profile", None)
+
+        first = cache.get_or_fetch(key, fetch)
+        first["commander"]["name"] = "Mutated"
+        second = cache.get_or_fetch(key, fetch)
+
+        fetch.assert_called_once()
+        assert second["commander"]["name"] == "Cmdr"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_expired_and_uncached(self):
+        """Stale entries, endpoints without a TTL, and killswitched (empty) data are refetched."""
+        cache = companion.CAPIResponseCache({"/profile": 60, "/market": 0})
+        fetch = MagicMock(return_value=companion.CAPIData({"id": 1}))
+        with patch("companion.time.monotonic", side_effect=[0, 61, 61]):
+            cache.get_or_fetch(("Cmdr", "h", "/profile", None), fetch)
+            cache.get_or_fetch(("Cmdr", "h", "/profile", None), fetch)
+
+        cache.get_or_fetch(("Cmdr", "h", "/market", 1), fetch)
+        cache.get_or_fetch(("Cmdr", "h", "/market", 1), fetch)
+        empty = MagicMock(return_value=companion.CAPIData())
+        cache.get_or_fetch(("Cmdr", "h", "/profile", 2), empty)
+        cache.get_or_fetch(("Cmdr", "h", "/profile", 2), empty)
+
+        assert fetch.call_count == 4
+        assert empty.call_count == 2
+
+    def test_in_flight_coalesced(self):
+        """Concurrent queries for the same key share one fetch."""
+        import threading
+
+        cache = companion.CAPIResponseCache({})
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            return companion.CAPIData({"id": 1})
+
+        fetch_mock = MagicMock(side_effect=fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_fetch(("Cmdr", "h", "/market", 1), fetch_mock)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        fetch_mock.assert_called_once()
+        assert [r["id"] for r in results] == [1, 1, 1]
+        assert cache.coalesced == 2
+
+    def test_refresh_and_forget(self):
+        """A refresh always fetches, and forgetting a station's entries only drops those."""
+        cache = companion.CAPIResponseCache({"/profile": 60, "/market": 60})
+        fetch = MagicMock(return_value=companion.CAPIData({"id": 1}))
+        cache.get_or_fetch(("Cmdr", "h", "/profile", 1), fetch)
+        cache.get_or_fetch(("Cmdr", "h", "/profile", 1), fetch, refresh=True)
+        assert fetch.call_count == 2
+
+        cache.get_or_fetch(("Cmdr", "h", "/market", 1), fetch)
+        cache.get_or_fetch(("Cmdr", "h", "/market", 2), fetch)
+        cache.get_or_fetch(("Other", "h", "/market", 1), fetch)
+        cache.forget("Cmdr", 1, ["/market"])
+        cache.get_or_fetch(("Cmdr", "h", "/profile", 1), fetch)
+        assert fetch.call_count == 5
+        cache.get_or_fetch(("Cmdr", "h", "/market", 1), fetch)
+        assert fetch.call_count == 6
+
+        cache.forget("Cmdr", 1)
+        for key in (("Cmdr", "h", "/profile", 1), ("Cmdr", "h", "/market", 2), ("Other", "h", "/market", 1)):
+            cache.get_or_fetch(key, fetch)
+
+        assert fetch.call_count == 7
+
+    def test_errors_not_cached(self):
+        """A failed query is raised to every waiter, and retried next time."""
+        cache = companion.CAPIResponseCache({"/profile": 60})
+        fetch = MagicMock(side_effect=[companion.ServerError("down"), companion.CAPIData({"id": 1})])
+        with pytest.raises(companion.ServerError):
+            cache.get_or_fetch(("Cmdr", "h", "/profile", None), fetch)
+
+        assert cache.get_or_fetch(("Cmdr", "h", "/profile", None), fetch)["id"] == 1
+
+
+class TestCAPIDataRawStore:
+
+    def test_lookup_by_endpoint_and_time(self, tmp_path):
+        """The newest response at or before a time is returned, and survives reopening the store."""
+        from datetime import datetime, timedelta, timezone
+
+        now = datetime.now(timezone.utc)
+        store = companion.CAPIDataRawStore(tmp_path)
+        raw = companion.CAPIDataRaw(store)
+        raw.record_endpoint("/profile", '{"n": 1}', now - timedelta(minutes=10))
+        raw.record_endpoint("/market", '{"m": 1}', now - timedelta(minutes=9))
+        raw.record_endpoint("/profile", '{"n": 2}', now - timedelta(minutes=5))
+
+        reopened = companion.CAPIDataRawStore(tmp_path)
+        assert reopened.latest("/profile").raw_data == '{"n": 2}'
+        assert reopened.latest("/profile", now - timedelta(minutes=6)).raw_data == '{"n": 1}'
+        assert reopened.latest("/profile", now - timedelta(minutes=11)) is None
+        assert len(reopened.times("/profile")) == 2
+
+        snapshot = companion.CAPIDataRaw(reopened).as_of(now - timedelta(minutes=8))
+        assert snapshot["/profile"].raw_data == '{"n": 1}'
+        assert snapshot["/market"].raw_data == '{"m": 1}'
+
+    def test_directory_untouched_until_used(self, tmp_path):
+        """Creating the store doesn't scan or prune the history, that waits for the first use."""
+        from datetime import datetime, timedelta, timezone
+
+        path = tmp_path / "history"
+        store = companion.CAPIDataRawStore(path, max_age=timedelta(days=1))
+        assert not path.exists()
+
+        path.mkdir()
+        old = path / f"{int((datetime.now(timezone.utc) - timedelta(days=2)).timestamp() * 1000)}.profile.json.gz"
+        old.write_bytes(b"")
+        store = companion.CAPIDataRawStore(path, max_age=timedelta(days=1))
+        assert old.exists()
+        store.record("/profile", "new", datetime.now(timezone.utc))
+        assert not old.exists()
+        assert store.latest("/profile").raw_data == "new"
+
+    def test_bounded_by_size_and_age(self, tmp_path):
+        """The oldest responses are dropped once over the byte or age limit."""
+        from datetime import datetime, timedelta, timezone
+
+        now = datetime.now(timezone.utc)
+        store = companion.CAPIDataRawStore(tmp_path, max_bytes=10_000, max_age=timedelta(days=1))
+        store.record("/profile", "old", now - timedelta(days=2))
+        assert store.latest("/profile") is None
+
+        body = json.dumps([str(i) * 40 for i in range(200)])
+        for minutes in range(20):
+            store.record("/market", body + str(minutes), now - timedelta(minutes=20 - minutes))
+
+        times = store.times("/market")
+        assert 0 < len(times) < 20
+        assert store.latest("/market").raw_data.endswith("19")
+        assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 10_000
+        assert len(list(tmp_path.iterdir())) == len(times)
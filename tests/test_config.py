@@ -161,6 +161,24 @@ class TestConfigClass:
         assert c.toml_path == alt_config
         assert c.get("mode") == "alternate"
 
+    def test_typed_reads_cached_until_changed(self, mock_app_dir):
+        """Typed reads are served from cache, and see set() and delete() straight away."""
+        with patch("config.Config._init_platform"):
+            c = Config(mock_app_dir)
+
+        c.set("output", Config.OUT_SHIP)
+        assert c.output == Config.OUT_SHIP
+        with patch.object(c, "_read_int", side_effect=AssertionError("not cached")):
+            assert c.get_int("output") == Config.OUT_SHIP
+
+        c.set("output", Config.OUT_MKT_TD)
+        assert c.output == Config.OUT_MKT_TD
+        c.set("hide_private_group", "true")
+        assert c.hide_private_group is True
+        c.delete("hide_private_group")
+        assert c.hide_private_group is False
+        assert c.get_str("missing", "fallback") == "fallback"
+
 
 def test_init_platform_calls_linux_helper(mock_app_dir):
     with patch("sys.platform", "linux"):
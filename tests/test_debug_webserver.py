@@ -0,0 +1,88 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the debug webserver's stand-in behaviour."""
+
+import gzip
+import json
+import pytest
+import requests
+from unittest.mock import patch
+import debug_webserver
+
+
+@pytest.fixture
+def listener(tmp_path):
+    """A listener on a free port, with fixtures and output in tmp_path."""
+    (tmp_path / "profile.json").write_text('{"commander": {"name": "Cmdr"}}')
+    with patch.object(debug_webserver, "output_data_path", tmp_path), \
+            patch.object(debug_webserver, "capi_fixtures_path", tmp_path), \
+            patch.object(debug_webserver, "faults", debug_webserver.Faults()), \
+            patch.object(debug_webserver, "stats", debug_webserver.RequestStats()):
+        server = debug_webserver.run_listener("127.0.0.1", 0)
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+
+class TestStandIn:
+
+    def test_capi_fixture_served(self, listener):
+        """Recorded CAPI responses are served as JSON, with a Date header."""
+        r = requests.get(listener + "/profile", timeout=5)
+
+        assert r.status_code == 200
+        assert r.json()["commander"]["name"] == "Cmdr"
+        assert "Date" in r.headers
+
+    def test_faults_injected_and_counted(self, listener):
+        """Configured failure rates are applied, and show up in the stats."""
+        debug_webserver.faults.maintenance_rate = 1.0
+        assert requests.get(listener + "/profile", timeout=5).status_code == 418
+
+        debug_webserver.faults.maintenance_rate = 0.0
+        debug_webserver.faults.rate_limit_rate = 1.0
+        assert requests.get(listener + "/market", timeout=5).status_code == 429
+
+        report = requests.get(listener + debug_webserver.STATS_PATH, timeout=5).json()
+        assert report["total"] == 2
+        assert {(r["path"], r["status"]) for r in report["requests"]} == {("/profile", 418), ("/market", 429)}
+
+    def test_eddn_gzip_upload(self, listener, tmp_path):
+        """Gzipped EDDN uploads are accepted and logged decompressed."""
+        body = json.dumps({"$schemaRef": "https://eddn.edcd.io/schemas/journal/1"})
+        r = requests.post(
+            listener + "/eddn", data=gzip.compress(body.encode()), headers={"Content-Encoding": "gzip"}, timeout=5
+        )
+
+        assert r.status_code == 200
+        assert body in (tmp_path / "eddn.log").read_text()
+
+    def test_fault_pick_status(self):
+        """Each fault kind takes its own share of requests."""
+        faults = debug_webserver.Faults(rate_limit_rate=0.2, maintenance_rate=0.3, error_rate=0.5)
+        with patch("debug_webserver.random.random", side_effect=[0.1, 0.4, 0.9]):
+            assert faults.pick_status() == 429
+            assert faults.pick_status() == 418
+            assert faults.pick_status() in (500, 502, 503, 504)
+
+    def test_capi_history_read_only(self, tmp_path):
+        """The newest recorded response is served, and the history directory is left untouched."""
+        history = tmp_path / "capi_history"
+        history.mkdir()
+        (history / "1000.profile.json.gz").write_bytes(gzip.compress(b'{"n": 1}'))
+        (history / "2000.profile.json.gz").write_bytes(gzip.compress(b'{"n": 2}'))
+        (history / "1500.market.json.gz").write_bytes(gzip.compress(b'{"m": 1}'))
+        before = sorted(history.iterdir())
+
+        store = debug_webserver.CAPIHistory(history)
+        with patch.object(debug_webserver, "capi_fixtures_path", None), \
+                patch.object(debug_webserver, "capi_history", store):
+            assert debug_webserver.capi_fixture("/profile") == '{"n": 2}'
+            assert debug_webserver.capi_fixture("/market") == '{"m": 1}'
+            assert debug_webserver.capi_fixture("/shipyard") is None
+            # Falls back to the next newest if one has gone since
+            (history / "2000.profile.json.gz").unlink()
+            assert debug_webserver.capi_fixture("/profile") == '{"n": 1}'
+
+        # Long past the age CAPIDataRawStore would have pruned them at
+        assert sorted(history.iterdir()) == before[:2]
@@ -0,0 +1,131 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the EDDN plugin's batching of FSSSignalDiscovered."""
+
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+
+with patch.dict(os.environ, {"EDMC_NO_UI": "1"}):  # No Tk root to hang the plugin's UI variables off
+    from plugins import eddn
+
+HERE = 1
+THERE = 2
+SOL = ("Sol", [0.0, 0.0, 0.0])
+
+
+def signal(n, system_address=HERE, **extra):
+    return {
+        "timestamp": f"2024-05-12T18:{n // 60:02d}:{n % 60:02d}Z", "event": "FSSSignalDiscovered",
+        "SystemAddress": system_address, "SignalName": f"Signal {n}", "horizons": True, "odyssey": True, **extra,
+    }
+
+
+@pytest.fixture
+def sender():
+    """An EDDN instance, without a sender or database, in the system with SystemAddress HERE."""
+    instance = eddn.EDDN.__new__(eddn.EDDN)
+    instance.parent = MagicMock()
+    instance.fss_signals = []
+    instance.fss_signals_systemaddress = None
+    instance.fss_signals_started = 0.0
+    instance.fss_signals_bytes = 0
+    instance.fss_signals_beta = False
+    instance.send_message = MagicMock()
+    with patch.multiple(
+        eddn.this, eddn=instance, cmdr_name="cmdr", system_address=HERE, system_name=SOL[0], coordinates=SOL[1],
+        horizons=True, odyssey=True, create=True,
+    ):
+        yield instance
+
+
+def sent(instance):
+    """The messages sent, in order."""
+    return [c.args[1]["message"] for c in instance.send_message.call_args_list]
+
+
+class TestFSSSignalBatching:
+
+    def test_count_flush(self, sender):
+        """A batch for the current system is sent as soon as it holds FSS_SIGNALS_MAX_COUNT signals."""
+        for n in range(sender.FSS_SIGNALS_MAX_COUNT - 1):
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(n))
+
+        sender.send_message.assert_not_called()
+        sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(99))
+
+        assert [len(m["signals"]) for m in sent(sender)] == [sender.FSS_SIGNALS_MAX_COUNT]
+        assert sender.fss_signals == []
+
+    def test_size_flush(self, sender):
+        """A batch is sent once its signals reach FSS_SIGNALS_MAX_BYTES."""
+        with patch.object(eddn.EDDN, "FSS_SIGNALS_MAX_BYTES", 200):
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(0, SpawningState="x" * 100))
+            sender.send_message.assert_not_called()
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(1, SpawningState="x" * 100))
+
+        assert [len(m["signals"]) for m in sent(sender)] == [2]
+
+    def test_age_flush(self, sender):
+        """A batch is sent when a signal arrives late, or by the timer, once FSS_SIGNALS_MAX_AGE has passed."""
+        # Started, then checked on each arrival
+        clock = [100.0, 100.0, 101.0, 100.0 + sender.FSS_SIGNALS_MAX_AGE]
+        with patch("plugins.eddn.time.monotonic", side_effect=clock):
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(0))
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(1))
+            sender.send_message.assert_not_called()
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(2))
+
+        assert [len(m["signals"]) for m in sent(sender)] == [3]
+
+        # The timer for that batch is now stale, and mustn't send the next one early
+        sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(3))
+        sender.fss_signals_timeout(100.0)
+        assert len(sent(sender)) == 1
+
+        delay, callback, started = sender.parent.after.call_args.args
+        assert delay == sender.FSS_SIGNALS_MAX_AGE * 1000
+        callback(started)
+        assert [len(m["signals"]) for m in sent(sender)] == [3, 1]
+
+    def test_odyssey_order_split(self, sender):
+        """Signals logged before the jump wait for it, and are then sent within the count and size limits."""
+        for n in range(250):
+            sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(n, system_address=THERE))
+
+        sender.fss_signals_timeout(sender.fss_signals_started)
+        sender.send_message.assert_not_called()
+
+        jump = {"event": "FSDJump", "SystemAddress": THERE, "StarSystem": "Achenar", "StarPos": [67.5, -119.5, 24.8]}
+        assert sender.export_journal_fsssignaldiscovered("cmdr", *SOL, False, jump) is None
+
+        messages = sent(sender)
+        assert [len(m["signals"]) for m in messages] == [100, 100, 50]
+        assert [m["timestamp"] for m in messages] == [signal(n)["timestamp"] for n in (0, 100, 200)]
+        assert {(m["SystemAddress"], m["StarSystem"]) for m in messages} == {(THERE, "Achenar")}
+        assert [s["SignalName"] for m in messages for s in m["signals"]] == [f"Signal {n}" for n in range(250)]
+
+        sender.send_message.reset_mock()
+        with patch.object(eddn.EDDN, "FSS_SIGNALS_MAX_BYTES", 200):
+            for n in range(3):
+                sender.enqueue_journal_fsssignaldiscovered(
+                    "cmdr", False, signal(n, system_address=THERE, SpawningState="x" * 100)
+                )
+
+            sender.export_journal_fsssignaldiscovered("cmdr", *SOL, False, jump)
+
+        assert [len(m["signals"]) for m in sent(sender)] == [2, 1]
+
+    @pytest.mark.parametrize("horizons,odyssey", [(True, True), (True, False), (False, False)])
+    def test_game_flags(self, sender, horizons, odyssey):
+        """The message carries the game's flags, and the per-signal copies are elided."""
+        eddn.this.horizons = horizons
+        eddn.this.odyssey = odyssey
+        sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(0))
+        sender.enqueue_journal_fsssignaldiscovered("cmdr", False, signal(1, USSType="$USS_Type_MissionTarget;"))
+        docked = {"event": "Docked"}
+        sender.export_journal_fsssignaldiscovered("cmdr", *SOL, False, docked)
+
+        (message,) = sent(sender)
+        assert (message["horizons"], message["odyssey"]) == (horizons, odyssey)
+        assert message["signals"] == [{"timestamp": signal(0)["timestamp"], "SignalName": "Signal 0"}]
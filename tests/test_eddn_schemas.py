@@ -0,0 +1,175 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test checking EDDN messages against the bundled schemas."""
+
+import pytest
+
+from plugins import eddn_schemas
+
+HEADER = {"uploaderID": "cmdr", "softwareName": "E:D Market Connector [Windows]", "softwareVersion": "6.2.0"}
+
+
+def navroute_msg(**changes):
+    message = {
+        "timestamp": "2024-01-01T00:00:00Z",
+        "event": "NavRoute",
+        "Route": [{"StarSystem": "Sol", "SystemAddress": 10477373803, "StarPos": [0.0, 0.0, 0.0], "StarClass": "G"}],
+    }
+    message.update(changes)
+    return {"$schemaRef": "https://eddn.edcd.io/schemas/navroute/1/test", "header": HEADER, "message": message}
+
+
+T = "2024-05-12T18:21:07Z"
+SOL = {"StarSystem": "Sol", "StarPos": [0.0, 0.0, 0.0], "SystemAddress": 10477373803}
+CAPI_HEADER = {**HEADER, "gameversion": "CAPI-Live-market", "gamebuild": ""}
+
+# One message for each bundled schema, as sent to the live Gateway
+CAPTURED = {
+    "commodity/3": ({
+        "systemName": "Sol", "stationName": "Abraham Lincoln", "marketId": 128016640, "timestamp": T,
+        "horizons": True, "odyssey": True,
+        "commodities": [{
+            "name": "gold", "meanPrice": 47609, "buyPrice": 0, "stock": 0, "stockBracket": 0,
+            "sellPrice": 46803, "demand": 13962, "demandBracket": 3
+        }],
+        "economies": [{"name": "Service", "proportion": 1.0}], "prohibited": ["BasicNarcotics"],
+    }, CAPI_HEADER),
+    "outfitting/2": ({
+        "systemName": "Sol", "stationName": "Abraham Lincoln", "marketId": 128016640, "timestamp": T,
+        "horizons": True, "odyssey": True, "modules": ["Hpt_BeamLaser_Fixed_Small", "Int_Hyperdrive_Size5_Class5"],
+    }, CAPI_HEADER),
+    "shipyard/2": ({
+        "systemName": "Sol", "stationName": "Abraham Lincoln", "marketId": 128016640, "timestamp": T,
+        "horizons": True, "odyssey": True, "allowCobraMkIV": False, "ships": ["anaconda", "krait_mkii"],
+    }, CAPI_HEADER),
+    "journal/1": ({
+        "timestamp": T, "event": "Docked", **SOL, "StationName": "Abraham Lincoln", "StationType": "Orbis",
+        "MarketID": 128016640, "StationFaction": {"Name": "Mother Gaia"}, "DistFromStarLS": 505.7,
+        "StationServices": ["dock", "autodock", "commodities"], "StationEconomies": [
+            {"Name": "$economy_Service;", "Proportion": 1.0}
+        ], "horizons": True, "odyssey": True,
+    }, HEADER),
+    "approachsettlement/1": ({
+        "timestamp": T, "event": "ApproachSettlement", "Name": "Ochoa Vista", "MarketID": 3510380288,
+        "SystemAddress": 2415659059555, "BodyID": 10, "BodyName": "Col 285 Sector UT-Q c5-14 7 a",
+        "Latitude": -19.47, "Longitude": -125.31, "StarSystem": "Col 285 Sector UT-Q c5-14",
+        "StarPos": [-31.5, 91.75, 30.03], "horizons": True, "odyssey": True,
+    }, HEADER),
+    "codexentry/1": ({
+        "timestamp": T, "event": "CodexEntry", "EntryID": 1400162, "Name": "$Codex_Ent_Osseus_05_A_Name;",
+        "SubCategory": "$Codex_SubCategory_Organic_Structures;", "Category": "$Codex_Category_Biology;",
+        "Region": "$Codex_RegionName_18;", "System": "Sol", "SystemAddress": 10477373803,
+        "StarPos": [0.0, 0.0, 0.0], "BodyID": 4, "BodyName": "Earth", "Latitude": 12.5, "Longitude": -3.1,
+        "horizons": True, "odyssey": True,
+    }, HEADER),
+    "dockingdenied/1": ({
+        "timestamp": T, "event": "DockingDenied", "MarketID": 128016640, "StationName": "Abraham Lincoln",
+        "StationType": "Orbis", "Reason": "NoSpace", "horizons": True, "odyssey": True,
+    }, HEADER),
+    "dockinggranted/1": ({
+        "timestamp": T, "event": "DockingGranted", "MarketID": 128016640, "StationName": "Abraham Lincoln",
+        "StationType": "Orbis", "LandingPad": 23, "horizons": True, "odyssey": True,
+    }, HEADER),
+    "fcmaterials_capi/1": ({
+        "timestamp": T, "event": "FCMaterials", "MarketID": 3700005632, "CarrierID": "K7Q-BQL",
+        "Items": {"purchases": [], "sales": {"128961533": {"id": 128961533, "name": "$agriculturalprocesssample_name;",
+                                                         "price": 500, "stock": 10}}},
+        "horizons": True, "odyssey": True,
+    }, CAPI_HEADER),
+    "fcmaterials_journal/1": ({
+        "timestamp": T, "event": "FCMaterials", "MarketID": 3700005632, "CarrierName": "Jolly Roger",
+        "CarrierID": "K7Q-BQL", "Items": [{"id": 128961533, "Name": "$agriculturalprocesssample_name;",
+                                          "Price": 500, "Stock": 10, "Demand": 0}],
+        "horizons": True, "odyssey": True,
+    }, HEADER),
+    "fssallbodiesfound/1": ({
+        "timestamp": T, "event": "FSSAllBodiesFound", "SystemName": "Sol", "SystemAddress": 10477373803,
+        "Count": 40, "StarPos": [0.0, 0.0, 0.0], "horizons": True, "odyssey": True,
+    }, HEADER),
+    "fssbodysignals/1": ({
+        "timestamp": T, "event": "FSSBodySignals", "BodyName": "Earth", "BodyID": 4, **SOL,
+        "Signals": [{"Type": "$SAA_SignalType_Biological;", "Count": 3}], "horizons": True, "odyssey": True,
+    }, HEADER),
+    "fssdiscoveryscan/1": ({
+        "timestamp": T, "event": "FSSDiscoveryScan", "Progress": 1.0, "BodyCount": 40, "NonBodyCount": 60,
+        "SystemName": "Sol", "SystemAddress": 10477373803, "StarPos": [0.0, 0.0, 0.0],
+        "horizons": True, "odyssey": True,
+    }, HEADER),
+    "fsssignaldiscovered/1": ({
+        "timestamp": T, "event": "FSSSignalDiscovered", **SOL, "horizons": True, "odyssey": True,
+        "signals": [
+            {"timestamp": T, "SignalName": "$MULTIPLAYER_SCENARIO42_TITLE;", "IsStation": False},
+            {"timestamp": T, "SignalName": "Abraham Lincoln", "SignalType": "StationCoriolis", "IsStation": True},
+        ],
+    }, HEADER),
+    "navbeaconscan/1": ({
+        "timestamp": T, "event": "NavBeaconScan", **SOL, "NumBodies": 40, "horizons": True, "odyssey": True,
+    }, HEADER),
+    "navroute/1": ({
+        "timestamp": T, "event": "NavRoute", "horizons": True, "odyssey": True,
+        "Route": [
+            {"StarSystem": "Sol", "SystemAddress": 10477373803, "StarPos": [0.0, 0.0, 0.0], "StarClass": "G"},
+            {"StarSystem": "Alpha Centauri", "SystemAddress": 1178708478315, "StarPos": [3.03125, -0.09375, 3.15625],
+             "StarClass": "K"},
+        ],
+    }, HEADER),
+    "scanbarycentre/1": ({
+        "timestamp": T, "event": "ScanBaryCentre", **SOL, "BodyID": 2, "SemiMajorAxis": 79876192.0,
+        "Eccentricity": 0.0195, "OrbitalInclination": 0.28, "Periapsis": 115.9, "OrbitalPeriod": 2360591.0,
+        "AscendingNode": 156.7, "MeanAnomaly": 58.6, "horizons": True, "odyssey": True,
+    }, HEADER),
+}
+
+
+class TestValidate:
+
+    def test_every_schema_covered(self):
+        """There's a captured message below for each bundled schema."""
+        assert set(CAPTURED) == set(eddn_schemas.MESSAGE_SCHEMAS)
+
+    @pytest.mark.parametrize("name", sorted(CAPTURED))
+    def test_captured_message_passes(self, name):
+        """Messages the Gateway accepts pass here too."""
+        message, header = CAPTURED[name]
+        msg = {"$schemaRef": f"https://eddn.edcd.io/schemas/{name}", "header": header, "message": message}
+        assert eddn_schemas.validate(msg) is None
+
+    def test_no_stricter_than_gateway(self):
+        """Empty strings the live schemas allow, e.g. an empty gamebuild or uploaderID, aren't rejected."""
+        msg = navroute_msg()
+        msg["header"] = {**HEADER, "uploaderID": "", "gamebuild": "", "gameversion": ""}
+        assert eddn_schemas.validate(msg) is None
+
+    def test_valid(self):
+        """A well formed message passes, on either the live or test schema."""
+        msg = navroute_msg()
+        assert eddn_schemas.validate(msg) is None
+        msg["$schemaRef"] = "https://eddn.edcd.io/schemas/navroute/1"
+        assert eddn_schemas.validate(msg) is None
+
+    @pytest.mark.parametrize("changes,error", [
+        ({"Route": [{"StarSystem": "Sol", "SystemAddress": 1, "StarPos": [0, 0], "StarClass": "G"}]},
+         "message.Route[0].StarPos has fewer than 3 items"),
+        ({"Route": [{"StarSystem": "Sol", "SystemAddress": True, "StarPos": [0, 0, 0], "StarClass": "G"}]},
+         "message.Route[0].SystemAddress is not of type integer"),
+        ({"Name_Localised": "Sol"}, "message.Name_Localised is not allowed"),
+        ({"Route": [{"StarSystem": "", "SystemAddress": 1, "StarPos": [0, 0, 0], "StarClass": "G"}]},
+         "message.Route[0].StarSystem is shorter than 1"),
+    ])
+    def test_invalid_message(self, changes, error):
+        """The first problem found is described."""
+        assert eddn_schemas.validate(navroute_msg(**changes)) == error
+
+    def test_header_checked(self):
+        """A header without an uploaderID, e.g. before the Cmdr is known, is rejected."""
+        msg = navroute_msg()
+        msg["header"] = {**HEADER, "uploaderID": None}
+        assert eddn_schemas.validate(msg) == "header.uploaderID is not of type string"
+
+    def test_unknown_schema_passed(self):
+        """Schemas we don't bundle are left for the Gateway to check."""
+        msg = navroute_msg()
+        msg["$schemaRef"] = "https://eddn.edcd.io/schemas/newthing/1"
+        assert eddn_schemas.validate(msg) is None
+        msg["$schemaRef"] = "https://example.com/schemas/navroute/1"
+        assert eddn_schemas.validate(msg) is not None
@@ -0,0 +1,279 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the EDSM plugin's rate limiting and sending."""
+
+import itertools
+import os
+import pytest
+import semantic_version
+from queue import Empty
+from unittest.mock import MagicMock, patch
+
+import killswitch
+
+with patch.dict(os.environ, {"EDMC_NO_UI": "1"}):  # No Tk root to hang the plugin's UI variables off
+    from plugins import edsm
+
+NOW = 1_700_000_000.0
+DOCKED = ("cmdr", "4.0.0.1900", "r300000/r0 ", {"timestamp": "2024-05-12T18:21:07Z", "event": "Docked"})
+OK_REPLY = {"msgnum": 100, "msg": "OK", "events": [{"msgnum": 100, "msg": "OK"}]}
+
+
+def response(status, headers=None, reply=None):
+    r = MagicMock()
+    r.status_code = status
+    r.headers = headers or {}
+    r.content = b""
+    r.json.return_value = reply
+    return r
+
+
+def limit_headers(limit, remaining, reset):
+    return {
+        "X-Rate-Limit-Limit": str(limit), "X-Rate-Limit-Remaining": str(remaining), "X-Rate-Limit-Reset": str(reset)
+    }
+
+
+class TestRateLimit:
+
+    def test_unlimited_until_told(self):
+        """Until EDSM has sent any headers there's no limit, and spending doesn't invent one."""
+        rate_limit = edsm.RateLimit()
+        rate_limit.spend()
+        assert rate_limit.delay(now=NOW) == 0.0
+        assert rate_limit.remaining is None
+
+    @pytest.mark.parametrize("reset", [60, int(NOW) + 60], ids=["relative", "epoch"])
+    def test_reset_forms(self, reset):
+        """The reset is taken both as seconds from now and as a timestamp."""
+        rate_limit = edsm.RateLimit()
+        rate_limit.update(limit_headers(360, 1, reset), now=NOW)
+        assert rate_limit.delay(now=NOW) == 0.0
+
+        rate_limit.spend()
+        assert rate_limit.remaining == 0
+        assert rate_limit.delay(now=NOW) == 60.0
+        assert rate_limit.delay(now=NOW + 59) == 1.0
+
+        # Refilled once the reset has passed
+        assert rate_limit.delay(now=NOW + 60) == 0.0
+        assert rate_limit.remaining == 360
+
+    @pytest.mark.parametrize("headers,hold", [
+        ({}, edsm.RATE_LIMIT_RETRY),
+        ({"Retry-After": "30"}, 30.0),
+        (limit_headers(360, 5, 90), 90.0),
+    ], ids=["bare", "retry-after", "reset"])
+    def test_429_holds(self, headers, hold):
+        """A 429 means no budget is left, whatever the headers say, until the reset or Retry-After."""
+        rate_limit = edsm.RateLimit()
+        rate_limit.update(headers, exhausted=True, now=NOW)
+        assert rate_limit.remaining == 0
+        assert rate_limit.delay(now=NOW) == hold
+
+    def test_unparseable_ignored(self):
+        """Headers that aren't numbers leave the budget as it was."""
+        rate_limit = edsm.RateLimit()
+        rate_limit.update(limit_headers(360, 0, 60), now=NOW)
+        rate_limit.update(limit_headers("lots", "some", "soon"), now=NOW)
+        assert rate_limit.delay(now=NOW) == 60.0
+
+
+class ScriptedQueue:
+    """
+    Stands in for the worker's queue, handing out items in turn.
+
+    `Empty` in the script raises it, after moving the clock on by the timeout, as if nothing arrived in time.
+    """
+
+    def __init__(self, clock, *items):
+        self.clock = clock
+        self.items = list(items)
+        self.timeouts = []
+
+    def get(self, timeout=None):
+        self.timeouts.append(timeout)
+        item = self.items.pop(0)
+        if item is Empty:
+            self.clock[0] += timeout
+            raise Empty
+
+        return item
+
+    def qsize(self):
+        return len(self.items)
+
+
+@pytest.fixture
+def worker_env():
+    """Run the worker against a mocked session, with a controllable clock, and credentials for "cmdr"."""
+    clock = [NOW]
+    session = MagicMock()
+    with patch.multiple(
+        edsm.this, session=session, rate_limit=edsm.RateLimit(), discarded_events={"Nonesuch"}, shutting_down=False,
+        newgame=False, newgame_docked=False, navbeaconscan=0, system_link=None,
+    ), patch("plugins.edsm.time", lambda: clock[0]), \
+            patch("plugins.edsm.sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds)), \
+            patch("plugins.edsm.credentials", return_value=("user", "key")), \
+            patch("plugins.edsm.plug.show_error") as show_error:
+        yield clock, session, show_error
+
+
+class TestWorker:
+
+    def test_held_events_resent_on_empty(self, worker_env):
+        """Events refused for the rate limit are sent once the wait for more events times out at the reset."""
+        clock, session, show_error = worker_env
+        session.post.side_effect = [
+            response(429, {"Retry-After": "60"}),
+            response(200, limit_headers(360, 359, 3600), OK_REPLY),
+            response(200, limit_headers(360, 358, 3600), OK_REPLY),
+        ]
+        queue = ScriptedQueue(clock, DOCKED, Empty, None)
+        with patch.object(edsm.this, "queue", queue):
+            edsm.worker()
+
+        # The last is the ShutDown sent on closing
+        assert session.post.call_count == 3
+        first, second, _ = (c.kwargs["data"]["message"] for c in session.post.call_args_list)
+        assert first == second
+        # Waited for exactly the hold, without polling
+        assert queue.timeouts == [None, 60.0, None]
+        assert clock[0] == NOW + 60
+        show_error.assert_not_called()
+
+    def test_held_events_sent_when_closing(self, worker_env):
+        """Events held for the rate limit are still sent on shutdown, rather than waiting for the reset."""
+        clock, session, show_error = worker_env
+        session.post.side_effect = [
+            response(429, {"Retry-After": "60"}),
+            response(200, limit_headers(360, 359, 3600), OK_REPLY),
+        ]
+        queue = ScriptedQueue(clock, DOCKED, None)
+        with patch.object(edsm.this, "queue", queue):
+            edsm.worker()
+
+        assert session.post.call_count == 2
+        assert session.post.call_args.kwargs["data"]["message"].count(b'"Docked"') == 1
+        assert queue.timeouts == [None, 60.0]
+        assert clock[0] == NOW
+        show_error.assert_not_called()
+
+    def test_held_while_out_of_budget(self, worker_env):
+        """More events arriving while out of budget are collected, and sent together at the reset."""
+        clock, session, show_error = worker_env
+        session.post.side_effect = [
+            response(429, {"Retry-After": "60"}),
+            response(200, limit_headers(360, 359, 3600), OK_REPLY),
+            response(200, limit_headers(360, 358, 3600), OK_REPLY),
+        ]
+        queue = ScriptedQueue(clock, DOCKED, DOCKED, Empty, None)
+        with patch.object(edsm.this, "queue", queue):
+            edsm.worker()
+
+        assert session.post.call_count == 3
+        assert session.post.call_args_list[1].kwargs["data"]["message"].count(b'"Docked"') == 2
+        show_error.assert_not_called()
+
+    def test_held_events_sent_at_game_shutdown(self, worker_env):
+        """The game shutting down while out of budget waits for the reset to send what's held, not drops it."""
+        clock, session, show_error = worker_env
+        session.post.side_effect = [
+            response(429, {"Retry-After": "60"}),
+            response(200, limit_headers(360, 359, 3600), OK_REPLY),
+            response(200, limit_headers(360, 358, 3600), OK_REPLY),
+        ]
+        shutdown = DOCKED[:3] + ({"timestamp": "2024-05-12T18:30:00Z", "event": "Shutdown"},)
+        queue = ScriptedQueue(clock, DOCKED, shutdown, None)
+        with patch.object(edsm.this, "queue", queue):
+            edsm.worker()
+
+        assert session.post.call_count == 3
+        held = session.post.call_args_list[1].kwargs["data"]["message"]
+        assert held.count(b'"Docked"') == 1
+        assert held.count(b'"Shutdown"') == 1
+        assert clock[0] >= NOW + 60
+        show_error.assert_not_called()
+
+    def test_held_events_sent_with_their_session(self, worker_env):
+        """A new game session while out of budget sends what's held first, as the game version it came from."""
+        clock, session, show_error = worker_env
+        session.post.side_effect = [
+            response(429, {"Retry-After": "60"}),
+            response(200, limit_headers(360, 359, 3600), OK_REPLY),
+            response(200, limit_headers(360, 358, 3600), OK_REPLY),
+            response(200, limit_headers(360, 357, 3600), OK_REPLY),
+        ]
+        fileheader = ("cmdr", "4.0.0.2000", "r310000/r0 ", {"timestamp": "2024-05-13T18:00:00Z", "event": "Fileheader"})
+        queue = ScriptedQueue(clock, DOCKED, fileheader, None)
+        with patch.object(edsm.this, "queue", queue):
+            edsm.worker()
+
+        data = [c.kwargs["data"] for c in session.post.call_args_list]
+        assert [d["fromGameVersion"] for d in data] == ["4.0.0.1900", "4.0.0.1900", "4.0.0.2000", "4.0.0.2000"]
+        assert data[1]["message"].count(b'"Docked"') == 1
+        assert b'"Docked"' not in data[2]["message"]
+        assert data[2]["message"].count(b'"Fileheader"') == 1
+        show_error.assert_not_called()
+
+
+def old_should_send_entry(entry, newgame, newgame_docked):
+    """The per-entry test should_send() made before PendingEvents kept counts."""
+    if entry["event"] == "Cargo":
+        return not newgame_docked
+    if entry["event"] == "Docked":
+        return True
+    if newgame:
+        return True
+    if entry["event"] not in (
+        "CommunityGoal", "ModuleBuy", "ModuleSell", "ModuleSwap", "ShipyardBuy", "ShipyardNew", "ShipyardSwap"
+    ):
+        return True
+    return False
+
+
+BATCHES = [
+    [], ["Cargo"], ["Cargo", "Cargo"], ["Docked"], ["Cargo", "Docked"], ["Scan"], ["Cargo", "Scan"],
+    ["ModuleBuy"], ["ModuleBuy", "CommunityGoal", "ShipyardSwap"], ["Cargo", "ModuleSell"], ["Docked", "ModuleBuy"],
+    ["ShipyardNew", "Scan"], ["Cargo", "Docked", "ShipyardBuy", "Scan"],
+]
+
+
+def pending_events(*names):
+    pending = edsm.PendingEvents()
+    for name in names:
+        pending.append({"event": name})
+
+    return pending
+
+
+class TestPendingEvents:
+
+    @pytest.mark.parametrize(
+        "names,newgame,newgame_docked", list(itertools.product(BATCHES, (False, True), (False, True))),
+        ids=lambda v: "+".join(v) or "none" if isinstance(v, list) else str(v),
+    )
+    def test_sendable_matches_per_entry(self, names, newgame, newgame_docked):
+        """The counts give the same answer as testing each entry did."""
+        expected = any(old_should_send_entry({"event": name}, newgame, newgame_docked) for name in names)
+        assert pending_events(*names).sendable(newgame, newgame_docked) is expected
+
+    def test_killswitches_reapplied_when_replaced(self):
+        """Events are only filtered again once the set of kill switches has been replaced."""
+        pending = pending_events("Docked", "Scan", "Scan")
+        with patch("killswitch.check_killswitch", wraps=killswitch.check_killswitch) as check:
+            pending.check_killswitches()
+            check.assert_not_called()
+
+        kills = killswitch.KillSwitchSet([killswitch.KillSwitches(
+            version=semantic_version.SimpleSpec(f"=={killswitch._current_version}"),
+            kills={"plugin.edsm.worker.Scan": killswitch.SingleKill("plugin.edsm.worker.Scan", "test")},
+        )])
+        with patch.object(killswitch, "active", kills):
+            pending.check_killswitches()
+            assert [e["event"] for e in pending] == ["Docked"]
+            assert pending.counts["Scan"] == 0
+            assert pending.last_event == "Docked"
+            # New events are checked as they're added
+            pending.append({"event": "Scan"})
+            assert len(pending) == 1
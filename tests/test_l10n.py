@@ -4,10 +4,18 @@
 
 import pytest
 from unittest.mock import patch
+import os
 import sys
 import l10n
 
 
+@pytest.fixture(autouse=True)
+def catalogue_dir(tmp_path):
+    """Keep translation catalogues out of the real app directory."""
+    with patch.object(l10n.Translations, "catalogue_dir", tmp_path / "catalogues"):
+        yield tmp_path / "catalogues"
+
+
 @pytest.fixture
 def mock_l10n_dir(tmp_path):
     """Creates a mock L10n directory with some sample .strings files."""
@@ -79,6 +87,84 @@ class TestTranslations:
                 trans.install()
                 assert trans.translations[None]["Hello"] == "Hola"
 
+    def test_contents_cached(self, mock_l10n_dir):
+        """Files are parsed once, and read afresh after a (re)install."""
+        trans = l10n.Translations()
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            with patch.object(trans, "_parse", wraps=trans._parse) as parse:
+                assert trans.translate("Hello", lang="de") == "Hallo"
+                assert trans.translate("Hello", lang="de") == "Hallo"
+                assert parse.call_count == 1
+
+                (mock_l10n_dir / "de.strings").write_text('"Hello" = "Guten Tag";', encoding="utf-8")
+                assert trans.contents("de")["Hello"] == "Hallo"
+                trans.install("es")
+                assert trans.contents("de")["Hello"] == "Guten Tag"
+
+    def test_available_cached(self, mock_l10n_dir):
+        """The directory is only listed once, and callers can't change the cached result."""
+        trans = l10n.Translations()
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            trans.available().add("xx")
+            (mock_l10n_dir / "fr.strings").write_text('"Hello" = "Bonjour";', encoding="utf-8")
+            assert trans.available() == {"es", "de"}
+
+
+class TestCatalogue:
+
+    def test_reused_across_instances(self, mock_l10n_dir, catalogue_dir):
+        """A saved catalogue is used instead of parsing the file again."""
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            l10n.Translations().install("es")
+            assert (catalogue_dir / "es.catalogue").exists()
+
+            trans = l10n.Translations()
+            with patch.object(trans, "_read") as read:
+                trans.install("es")
+                assert read.call_count == 0
+                assert trans.translations[None]["Hello"] == "Hola"
+
+    def test_rebuilt_when_source_changes(self, mock_l10n_dir):
+        """An edit of the same size is caught by the hash, and a touched but unchanged file is trusted."""
+        source = mock_l10n_dir / "de.strings"
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            l10n.Translations().install("de")
+            stat = source.stat()
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            trans = l10n.Translations()
+            with patch.object(trans, "_read") as read:
+                trans.install("de")
+                assert read.call_count == 0
+
+            source.write_text('"Hello" = "Halli";', encoding="utf-8")
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+            trans = l10n.Translations()
+            trans.install("de")
+            assert trans.translations[None]["Hello"] == "Halli"
+
+    def test_only_installed_saved(self, mock_l10n_dir, catalogue_dir):
+        """Listing the language names, or an overridden language, doesn't leave a catalogue behind for each."""
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            trans = l10n.Translations()
+            assert trans.available_names()["es"] == "Español"
+            assert trans.translate("Hello", lang="es") == "Hola"
+            assert not catalogue_dir.exists()
+
+            trans.install("de")
+            trans.clear_cache()
+            assert sorted(p.name for p in catalogue_dir.iterdir()) == ["de.catalogue"]
+
+    def test_compile_catalogues(self, tmp_path, mock_l10n_dir):
+        """The build step leaves a catalogue next to each .strings file."""
+        with patch.object(l10n.Translations, "respath", return_value=mock_l10n_dir):
+            assert [p.name for p in l10n.compile_catalogues()] == ["de.catalogue", "es.catalogue"]
+
+            # An install then starts from those
+            trans = l10n.Translations()
+            with patch.object(trans, "_read") as read:
+                assert trans.contents("de")["Hello"] == "Hallo"
+                assert read.call_count == 0
+
 
 class TestLocaleUtils:
 
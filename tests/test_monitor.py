@@ -0,0 +1,86 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the Journal monitor's state tracking."""
+
+import json
+from unittest.mock import patch
+
+import monitor
+
+
+class TestItemCounts:
+
+    def test_lookup_doesnt_store(self):
+        """Missing items read as zero without being added."""
+        counts = monitor.ItemCounts()
+        assert counts["gold"] == 0
+        assert "gold" not in counts
+
+    def test_zero_removed(self):
+        """Counts that fall to zero or below are dropped rather than going negative."""
+        counts = monitor.ItemCounts({"gold": 2})
+        counts["gold"] += 3
+        assert counts == {"gold": 5}
+        counts["gold"] -= 7
+        assert counts == {}
+        counts["silver"] -= 1
+        assert counts == {}
+
+    def test_every_write_drops_zero(self):
+        """The constructor, update(), setdefault(), | and |= keep to the same rule as assignment."""
+        import copy
+
+        counts = monitor.ItemCounts({"gold": 0, "silver": 1}, tin=-1)
+        assert counts == {"silver": 1}
+        counts.update({"silver": 0, "iron": 2}, copper=0)
+        counts.update([("lead", 0)])
+        assert counts == {"iron": 2}
+        assert counts.setdefault("zinc") == 0
+        assert counts.setdefault("iron", 5) == 2
+        assert counts.setdefault("nickel", 3) == 3
+        counts |= {"nickel": 0}
+        assert counts == {"iron": 2}
+        merged = counts | {"iron": 0, "tin": 1}
+        assert merged == {"tin": 1}
+        assert type(merged) is monitor.ItemCounts
+        assert counts == {"iron": 2}
+        assert isinstance(counts, monitor.ItemCounts)
+        assert copy.deepcopy(counts) == counts
+        assert type(copy.deepcopy(counts)) is monitor.ItemCounts
+
+
+class TestStateTracking:
+
+    def test_materials_discarded(self):
+        """Discarding everything of a material leaves nothing behind."""
+        logs = monitor.EDLogs()
+        logs.parse_entry(json.dumps({
+            "timestamp": "2024-01-01T00:00:00Z", "event": "Materials",
+            "Raw": [{"Name": "iron", "Count": 3}], "Manufactured": [], "Encoded": []
+        }).encode())
+        logs.parse_entry(json.dumps({
+            "timestamp": "2024-01-01T00:00:01Z", "event": "MaterialDiscarded",
+            "Category": "Raw", "Name": "iron", "Count": 5
+        }).encode())
+
+        assert isinstance(logs.state["Raw"], monitor.ItemCounts)
+        assert logs.state["Raw"] == {}
+
+    def test_state_size(self):
+        """Raw JSON is counted, and objects shared between keys are only counted once."""
+        blob = {"Route": [{"StarSystem": f"System {i}"} for i in range(100)]}
+        sizes = monitor.state_size({"NavRoute": blob, "Other": blob, "Credits": 1})
+
+        assert next(iter(sizes)) == "NavRoute"
+        assert sizes["Other"] == 0
+        assert sizes["NavRoute"] > 100 * 64
+
+    def test_store_raw_json_logs_size(self):
+        """Storing raw JSON checks the state size, but not every time."""
+        logs = monitor.EDLogs()
+        with patch.object(logs, "log_state_size", wraps=logs.log_state_size) as log_size:
+            assert logs.store_raw_json("ModuleInfo", {"Modules": []}) == {"Modules": []}
+            logs.store_raw_json("ModuleInfo", {"Modules": []})
+
+        assert log_size.call_count == 1
+        assert logs.state["ModuleInfo"] == {"Modules": []}
@@ -0,0 +1,312 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the plugin API event dispatch."""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import plug
+
+
+def make_plugin(name, readonly=False, **funcs):
+    """Build a Plugin without going through the loader."""
+    plugin = plug.Plugin.__new__(plug.Plugin)
+    plugin.name = name
+    plugin.folder = name
+    plugin.logger = None
+    plugin.readonly_data = readonly
+    plugin.threadsafe = False
+    plugin.worker = None
+    plugin.module = SimpleNamespace(**funcs)
+    return plugin
+
+
+@pytest.fixture
+def plugins():
+    """Swap in an empty plugin list, and hook tables, for the duration of a test."""
+    with patch.object(plug, "PLUGINS", []) as plugin_list, patch("plug.config") as mock_config, \
+            patch.dict(plug._hook_table, clear=True), patch.dict(plug._plugins_by_name, clear=True):
+        mock_config.skip_timecheck = True
+        yield plugin_list
+
+
+class TestNotifyJournalEntry:
+
+    def test_legacy_plugins_get_own_copies(self, plugins):
+        """Plugins that don't opt in get mutable copies they can't leak between each other."""
+        seen = []
+
+        def mutator(cmdr, is_beta, system, station, entry, state):
+            entry["event"] = "Mutated"
+            state["Credits"] = 0
+
+        def watcher(cmdr, is_beta, system, station, entry, state):
+            seen.append((entry["event"], state["Credits"]))
+
+        plugins.extend([make_plugin("a", journal_entry=mutator), make_plugin("b", journal_entry=watcher)])
+        entry = {"event": "Docked"}
+        state = {"Credits": 100}
+        plug.notify_journal_entry("cmdr", False, None, None, entry, state)
+
+        assert seen == [("Docked", 100)]
+        assert entry == {"event": "Docked"}
+        assert state == {"Credits": 100}
+
+    def test_readonly_plugins_share_snapshot(self, plugins):
+        """Opted-in plugins all receive the same read-only snapshot."""
+        received = []
+
+        def reader(cmdr, is_beta, system, station, entry, state):
+            received.append((entry, state))
+
+        plugins.extend([make_plugin("a", True, journal_entry=reader), make_plugin("b", True, journal_entry=reader)])
+        plug.notify_journal_entry("cmdr", False, None, None, {"event": "Docked"}, {"Credits": 100})
+
+        assert len(received) == 2
+        assert received[0][0] is received[1][0]
+        assert received[0][1] is received[1][1]
+        with pytest.raises(TypeError):
+            received[0][0]["event"] = "Mutated"
+
+    def test_old_timestamp_skipped(self, plugins):
+        """Events older than the time delta aren't passed on."""
+        callback = MagicMock()
+        plugins.append(make_plugin("a", journal_entry=callback))
+        with patch("plug.config") as mock_config:
+            mock_config.skip_timecheck = False
+            error = plug.notify_journal_entry(
+                "cmdr", False, None, None, {"event": "Docked", "timestamp": "2020-01-01T00:00:00Z"}, {}
+            )
+
+        assert error is not None
+        callback.assert_not_called()
+
+
+class TestNotifyDashboardEntry:
+
+    def test_readonly_and_legacy_mix(self, plugins):
+        """Legacy plugins still get a plain dict alongside opted-in ones."""
+        types_seen = []
+
+        def status(cmdr, is_beta, entry):
+            types_seen.append(type(entry))
+
+        plugins.extend([make_plugin("a", True, dashboard_entry=status), make_plugin("b", dashboard_entry=status)])
+        plug.notify_dashboard_entry("cmdr", False, {"Flags": 0})
+
+        assert types_seen[1] is dict
+        assert types_seen[0] is not dict
+
+
+class TestNotifyCapiFleetcarrier:
+
+    def test_readonly_plugins_get_original(self, plugins):
+        """Opted-in plugins are passed the CAPIData itself, with its attributes, and others a copy."""
+        import companion
+
+        received = []
+        plugins.extend([
+            make_plugin("a", True, capi_fleetcarrier=received.append),
+            make_plugin("b", capi_fleetcarrier=received.append),
+        ])
+        data = companion.CAPIData({"name": {"callsign": "X9Z-B0B"}}, source_host=companion.SERVER_LIVE)
+        plug.notify_capi_fleetcarrierdata(data)
+
+        assert received[0] is data
+        assert received[1] is not data
+        assert received[1] == data
+        assert received[1]["name"] is not data["name"]
+
+
+class TestHookTable:
+
+    def test_only_subscribers_called(self, plugins):
+        """Plugins without the hook aren't in its subscriber list."""
+        callback = MagicMock(return_value=None)
+        plugins.extend([make_plugin("a"), make_plugin("b", dashboard_entry=callback)])
+        plug._build_hook_table()
+
+        assert [p.name for p, _ in plug._subscribers("dashboard_entry")] == ["b"]
+        assert plug._subscribers("journal_entry") == []
+        plug.notify_dashboard_entry("cmdr", False, {"Flags": 0})
+        callback.assert_called_once()
+
+    def test_provides_and_invoke(self, plugins):
+        """provides() and invoke() resolve via the tables, including the fallback."""
+        plugins.extend([
+            make_plugin("EDSY", shipyard_url=lambda loadout, is_beta: "edsy"),
+            make_plugin("Other"),
+        ])
+        plug._build_hook_table()
+
+        assert plug.provides("shipyard_url") == ["EDSY"]
+        assert plug.invoke("EDSY", None, "shipyard_url", {}, False) == "edsy"
+        assert plug.invoke("Other", "EDSY", "shipyard_url", {}, False) == "edsy"
+        assert plug.invoke("Missing", None, "shipyard_url", {}, False) is None
+        with pytest.raises(ValueError):
+            plug.invoke("Missing", "Other", "shipyard_url", {}, False)
+
+
+class TestTimings:
+
+    def test_callbacks_timed_and_dumped(self, plugins, tmp_path):
+        """Each hook call is recorded against its plugin and can be written out as JSON."""
+        import json
+
+        plugins.append(make_plugin("a", dashboard_entry=lambda cmdr, is_beta, entry: None))
+        with patch.dict(plug.plugin_timings, clear=True):
+            plug.notify_dashboard_entry("cmdr", False, {"Flags": 0})
+            plug.notify_dashboard_entry("cmdr", False, {"Flags": 0})
+
+            report = plug.timings_report()
+            assert report["a"]["dashboard_entry"]["calls"] == 2
+            assert sum(report["a"]["dashboard_entry"]["histogram"].values()) == 2
+
+            path = plug.dump_timings(tmp_path / "timings.json")
+            assert json.loads(path.read_text())["plugins"]["a"]["dashboard_entry"]["calls"] == 2
+
+    def test_report_while_workers_record(self, tmp_path):
+        """Reporting takes a snapshot, so worker threads can add plugins and hooks meanwhile."""
+        import sys
+        import threading
+
+        def record(n):
+            plugin = make_plugin(f"p{n}")
+            for i in range(5000):
+                plug._call_timed(plugin, f"hook{i}", lambda: None)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Make thread switches mid-iteration likely
+        with patch.dict(plug.plugin_timings, clear=True):
+            threads = [threading.Thread(target=record, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+
+            try:
+                while any(thread.is_alive() for thread in threads):
+                    plug.timings_report()
+
+            finally:
+                sys.setswitchinterval(switch_interval)
+
+            assert sum(len(hooks) for hooks in plug.timings_report().values()) == 20000
+            assert plug.dump_timings(tmp_path / "timings.json") is not None
+
+    def test_slow_callback_counted(self):
+        """Calls over the threshold are counted as slow and land in the right bucket."""
+        timing = plug.HookTiming()
+        timing.record(plug.SLOW_CALLBACK_MS + 1)
+        timing.record(0.5)
+        timing.record(10 * plug.TIMING_BUCKETS_MS[-1])
+
+        assert timing.slow == 2
+        assert timing.buckets[0] == 1
+        assert timing.buckets[-1] == 1
+
+    def test_slow_warning_once(self, plugins):
+        """A persistently slow plugin is only warned about once per hook, and plugin_stop never."""
+        plugin = make_plugin("a")
+        with patch.dict(plug.plugin_timings, clear=True), patch("plug.time.perf_counter", side_effect=range(0, 100)), \
+                patch.object(plug, "logger") as mock_logger:
+            for _ in range(3):
+                plug._call_timed(plugin, "dashboard_entry", lambda: None)
+
+            plug._call_timed(plugin, "journal_entry", lambda: None)
+            plug._call_timed(plugin, "plugin_stop", lambda: None)
+
+            assert mock_logger.warning.call_count == 2
+            assert plug.plugin_timings["a"]["dashboard_entry"].slow == 3
+            assert plug.plugin_timings["a"]["plugin_stop"].slow == 0
+
+
+class TestPluginWorker:
+
+    def test_events_delivered_in_order_off_main_thread(self, plugins):
+        """A thread-safe plugin gets its events, in order, on its own thread."""
+        import threading
+
+        received = []
+
+        def status(cmdr, is_beta, entry):
+            received.append((entry["Flags"], threading.current_thread() is threading.main_thread()))
+
+        plugin = make_plugin("a", dashboard_entry=status)
+        plugin.worker = plug.PluginWorker(plugin)
+        plugins.append(plugin)
+        for flags in range(5):
+            assert plug.notify_dashboard_entry("cmdr", False, {"Flags": flags}) is None
+
+        plugin.worker.stop()
+        assert received == [(flags, False) for flags in range(5)]
+        assert plugin.worker.stats()["delivered"] == 5
+
+    def test_overflow_dropped(self, plugins):
+        """Events beyond the queue size are dropped and counted, not blocked on."""
+        import threading
+
+        release = threading.Event()
+        plugin = make_plugin("a", dashboard_entry=lambda cmdr, is_beta, entry: release.wait(5))
+        plugin.worker = plug.PluginWorker(plugin, maxsize=1)
+        plugins.append(plugin)
+        for flags in range(5):
+            plug.notify_dashboard_entry("cmdr", False, {"Flags": flags})
+
+        release.set()
+        plugin.worker.stop()
+        assert plugin.worker.overflows >= 3
+
+
+class TestLoadFoundPlugins:
+
+    def test_start_threadsafe_concurrent(self, tmp_path):
+        """Plugins that opt in start alongside each other, and a failure is recorded as broken."""
+        import sys
+        import threading
+
+        # Each of these only returns once the other has started, so they must run at the same time
+        started = SimpleNamespace(barrier=threading.Barrier(2, timeout=5), main_thread=[])
+        for folder, body in (
+            ("StartA", "plugin_start_threadsafe = True\ndef plugin_start3(p):\n    started.barrier.wait()\n"
+                       "    return 'A'\n"),
+            ("StartB", "plugin_start_threadsafe = True\ndef plugin_start3(p):\n    started.barrier.wait()\n"
+                       "    return 'B'\n"),
+            ("Broken", "plugin_start_threadsafe = True\ndef plugin_start3(p):\n    raise RuntimeError('nope')\n"),
+            ("EventsOnly", "plugin_threadsafe = True\ndef plugin_start3(p):\n"
+                           "    started.main_thread.append(threading.current_thread() is threading.main_thread())\n"
+                           "    return 'EventsOnly'\n"),
+        ):
+            (tmp_path / folder).mkdir()
+            (tmp_path / folder / "load.py").write_text(
+                "import threading\nfrom edmc_test_plugin_start import started\n" + body
+            )
+
+        with patch.object(plug.config, "plugin_dir_path", tmp_path), patch.object(plug, "PLUGINS_broken", []), \
+                patch.object(sys, "path", sys.path + [str(tmp_path)]), patch.dict(sys.modules), \
+                patch.dict(plug.plugin_load_timings, clear=True):
+            sys.modules["edmc_test_plugin_start"] = SimpleNamespace(started=started)
+            found = plug._load_found_plugins()
+            broken = [p.name for p in plug.PLUGINS_broken]
+            load_timings = dict(plug.plugin_load_timings)
+
+        assert sorted(p.name for p in found) == ["A", "B", "EventsOnly"]
+        assert broken == ["Broken"]
+        # Only opting in to thread-safe events doesn't move plugin_start3() off the main thread
+        assert started.main_thread == [True]
+        assert sorted(load_timings) == ["A", "B", "EventsOnly"]
+        assert "StartA" not in sys.modules
+        assert str(tmp_path) not in sys.path
+
+
+class TestNotifyJournalEntryCQC:
+
+    def test_raw_json_shared(self, plugins):
+        """Legacy plugins get their own copy of state, but the raw .json file contents are shared."""
+        received = []
+        plugins.append(make_plugin("a", journal_entry_cqc=lambda cmdr, is_beta, entry, state: received.append(state)))
+        route = {"Route": [{"StarSystem": "Sol"}]}
+        state = {"NavRoute": route, "Rank": {"Combat": (1, 0)}}
+        plug.notify_journal_entry_cqc("cmdr", False, {"event": "Docked"}, state)
+
+        assert received[0]["NavRoute"] is route
+        assert received[0]["Rank"] == state["Rank"]
+        assert received[0]["Rank"] is not state["Rank"]
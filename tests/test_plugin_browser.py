@@ -0,0 +1,179 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the Plugin Browser's registry index and icon handling."""
+
+import os
+import time
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import requests
+from PIL import Image
+
+import plugin_browser
+
+
+def png(width, height):
+    out = BytesIO()
+    Image.new("RGB", (width, height), (255, 0, 0)).save(out, format="PNG")
+    return out.getvalue()
+
+
+PLUGINS = [
+    {"pluginName": "beta", "pluginDesc": "Exploration helper", "pluginCategory": ["Exploration"],
+     "pluginLastUpdate": "2024-03-01T00:00:00Z", "pluginStars": 5},
+    {"pluginName": "Alpha", "pluginDesc": "Trade routes and mining", "pluginCategory": ["Trading", "Mining"],
+     "pluginLastUpdate": "2024-01-01", "pluginStars": "12"},
+    {"pluginName": "Gamma", "pluginDesc": "Explore the galaxy", "pluginCategory": ["Exploration"],
+     "pluginLastUpdate": None, "pluginStars": None},
+]
+
+
+def response(status, content=b"", etag=None):
+    r = MagicMock()
+    r.status_code = status
+    r.content = content
+    r.headers = {"ETag": etag} if etag else {}
+    return r
+
+
+class TestPluginRegistry:
+
+    def test_sort(self):
+        """Sort orders are worked out up front, coping with missing and mixed-format values."""
+        registry = plugin_browser.PluginRegistry(PLUGINS)
+        assert registry.select(sort="pluginName") == [1, 0, 2]
+        assert registry.select(sort="pluginLastUpdate") == [2, 1, 0]
+        assert registry.select(sort="pluginStars", reverse=True) == [1, 0, 2]
+        assert registry.select() == [0, 1, 2]
+
+    def test_descending_keeps_ties_in_order(self):
+        """Sorting descending leaves tied plugins in the registry's order, as list.sort(reverse=True) does."""
+        plugins = [
+            {"pluginName": name, "pluginStars": stars} for name, stars in (("a", 1), ("b", 2), ("c", 1), ("d", 2))
+        ]
+        registry = plugin_browser.PluginRegistry(plugins)
+        assert registry.select(sort="pluginStars", reverse=True) == [1, 3, 0, 2]
+        assert registry.select(sort="pluginStars") == [0, 2, 1, 3]
+        expected = sorted(plugins, key=lambda p: p["pluginStars"], reverse=True)
+        assert [plugins[i] for i in registry.select(sort="pluginStars", reverse=True)] == expected
+
+    def test_bad_stars(self):
+        """A star count that isn't a number sorts as none, rather than stopping the registry loading."""
+        plugins = [{"pluginName": "a", "pluginStars": "lots"}, {"pluginName": "b", "pluginStars": 3},
+                   {"pluginName": "c", "pluginStars": [1]}]
+        registry = plugin_browser.PluginRegistry(plugins)
+        assert registry.select(sort="pluginStars", reverse=True) == [1, 0, 2]
+
+    def test_filter_and_search(self):
+        """Category and search filters combine, and search terms match the start of words."""
+        registry = plugin_browser.PluginRegistry(PLUGINS)
+        assert registry.select(category="Exploration") == [0, 2]
+        assert registry.select(text="expl") == [0, 2]
+        assert registry.select(text="EXPL gal") == [2]
+        assert registry.select(category="Trading", text="expl") == []
+        assert registry.select(text="xplor") == []
+        assert registry.select(category="Nonesuch") == []
+
+    def test_cached_until_reloaded(self):
+        """The registry file is only read again after it's been updated."""
+        with patch.object(plugin_browser, "read_plugin_list", return_value=(PLUGINS, {})) as read:
+            plugin_browser.reload_plugin_list()
+            registry = plugin_browser.plugin_registry()
+            assert plugin_browser.plugin_registry() is registry
+            plugin_browser.reload_plugin_list()
+            assert plugin_browser.plugin_registry() is not registry
+            assert read.call_count == 2
+
+        plugin_browser.reload_plugin_list()
+
+
+class TestIcons:
+
+    def test_make_icon(self):
+        """Icons are fitted into a square, keeping their aspect ratio."""
+        icon = Image.open(BytesIO(plugin_browser.make_icon(png(200, 100))))
+        assert icon.size == (plugin_browser.ICON_SIZE, plugin_browser.ICON_SIZE)
+        assert icon.getpixel((0, 0))[3] == 0  # Transparent padding
+        assert icon.getpixel((32, 32))[:3] == (255, 0, 0)
+
+    def test_fetch_cached_and_revalidated(self, tmp_path):
+        """A fetched icon is stored with its ETag, and only delivered again if it's changed."""
+        url = "https://example.com/icon.png"
+        delivered = []
+
+        cache = plugin_browser.PluginIconCache(tmp_path, MagicMock(), None)
+        cache._loaded = lambda u, icon: delivered.append(icon)
+        cache.session = MagicMock()
+        cache.session.get.return_value = response(200, png(10, 10), etag='"v1"')
+        cache._fetch(url)
+
+        assert len(delivered) == 1
+        assert cache.path(url).read_bytes() == delivered[0]
+        assert cache.path(url).with_suffix(".etag").read_text() == '"v1"'
+
+        # Next run: the stored copy is delivered, and a 304 means that's it
+        cache.session.get.return_value = response(304)
+        cache._fetch(url)
+        assert len(delivered) == 2
+        assert cache.session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+        # Changed on the server
+        cache.session.get.return_value = response(200, png(20, 10), etag='"v2"')
+        cache._fetch(url)
+        assert len(delivered) == 4
+        assert delivered[3] != delivered[2]
+        cache.close()
+
+    def test_request_once(self, tmp_path):
+        """Each URL is only fetched once per run."""
+        cache = plugin_browser.PluginIconCache(tmp_path, MagicMock(), None)
+        cache.executor = MagicMock()
+        cache.request("a")
+        cache.request("a")
+        assert cache.executor.submit.call_count == 1
+
+    def test_failed_fetch_requested_again(self, tmp_path):
+        """A URL that couldn't be fetched is tried again the next time it's wanted."""
+        cache = plugin_browser.PluginIconCache(tmp_path, MagicMock(), None)
+        cache.executor.shutdown(wait=True)
+        cache.executor = MagicMock()
+        cache.executor.submit.side_effect = lambda fn, *args: fn(*args)
+        cache._loaded = MagicMock()
+        cache.session = MagicMock()
+        cache.session.get.side_effect = requests.ConnectionError
+        cache.request("https://example.com/icon.png")
+        assert cache.requested == set()
+
+        cache.session.get.side_effect = None
+        cache.session.get.return_value = response(200, png(10, 10))
+        cache.request("https://example.com/icon.png")
+        cache.request("https://example.com/icon.png")
+        assert cache.session.get.call_count == 2
+        cache._loaded.assert_called_once()
+
+    def test_pruned(self, tmp_path):
+        """Icons unused for too long go, then the least recently used until they fit."""
+        now = time.time()
+        for name, age in (("old", 200 * 86400), ("b", 300), ("c", 200), ("d", 100)):
+            icon = tmp_path / f"{name}.png"
+            icon.write_bytes(b"x" * 100)
+            icon.with_suffix(".etag").write_text('"v1"')
+            os.utime(icon, (now - age, now - age))
+
+        cache = plugin_browser.PluginIconCache(tmp_path, MagicMock(), None, max_bytes=250, max_age=90 * 86400)
+        cache.executor.shutdown(wait=True)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["c.etag", "c.png", "d.etag", "d.png"]
+
+    def test_use_counts_as_recent(self, tmp_path):
+        """Delivering a stored icon marks it as used, even if it's not changed on the server."""
+        url = "https://example.com/icon.png"
+        cache = plugin_browser.PluginIconCache(tmp_path, MagicMock(), None)
+        cache.executor.shutdown(wait=True)
+        cache._loaded = MagicMock()
+        cache.path(url).write_bytes(png(10, 10))
+        os.utime(cache.path(url), (0, 0))
+        cache.session = MagicMock()
+        cache.session.get.return_value = response(304)
+        cache._fetch(url)
+        assert cache.path(url).stat().st_mtime > time.time() - 60
@@ -0,0 +1,57 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the single-pass field filter."""
+
+from collections import UserDict
+from types import MappingProxyType
+
+from util.projection import Projection
+
+SCAN = {
+    "event": "Scan",
+    "BodyName": "Sol 3",
+    "Materials": [{"Name": "iron", "Name_Localised": "Iron", "Percent": 18.0}],
+    "Factions": [{"Name": "A", "HomeSystem": True, "MyReputation": 1.0, "State": "Boom"}],
+    "Wanted": True,
+}
+
+
+class TestProjection:
+
+    def test_deny_and_drop_key(self):
+        """Denied paths, through lists, and matching keys at any depth are dropped."""
+        projection = Projection(
+            deny=("Wanted", "Factions.HomeSystem", "Factions.MyReputation"), drop_key=r"_Localised$"
+        )
+        assert projection(SCAN) == {
+            "event": "Scan",
+            "BodyName": "Sol 3",
+            "Materials": [{"Name": "iron", "Percent": 18.0}],
+            "Factions": [{"Name": "A", "State": "Boom"}],
+        }
+        # The original isn't touched, and a second pass uses the cached decisions
+        assert SCAN["Wanted"] is True
+        assert projection(SCAN) == projection(SCAN)
+
+    def test_allow(self):
+        """Only allowed paths are kept, and unfiltered values are shared rather than copied."""
+        projection = Projection(allow=("event", "Materials", "Factions.Name"))
+        result = projection(MappingProxyType(SCAN))
+
+        assert result == {"event": "Scan", "Materials": SCAN["Materials"], "Factions": [{"Name": "A"}]}
+        assert result["Materials"] is SCAN["Materials"]
+
+    def test_wildcard(self):
+        """`*` matches any key at its level."""
+        projection = Projection(deny=("*.Secret",))
+        assert projection({"a": {"Secret": 1, "b": 2}, "c": [{"Secret": 3}]}) == {"a": {"b": 2}, "c": [{}]}
+
+    def test_nested_mappings(self):
+        """Mappings other than dict, inside dicts and lists, are filtered too."""
+        projection = Projection(deny=("a.Secret",), drop_key=r"_Localised$")
+        data = UserDict({
+            "a": MappingProxyType({"Secret": 1, "b": 2}),
+            "c": [UserDict({"Name": "x", "Name_Localised": "X"}), [MappingProxyType({"d_Localised": "D"})]],
+            "e": {"f": UserDict({"g_Localised": "G", "h": 3})},
+        })
+        assert projection(data) == {"a": {"b": 2}, "c": [{"Name": "x"}, [{}]], "e": {"f": {"h": 3}}}
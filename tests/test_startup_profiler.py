@@ -0,0 +1,51 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test the startup profiler."""
+
+import builtins
+import sys
+import startup_profiler
+
+
+class TestStartupProfiler:
+
+    def test_inactive_does_nothing(self):
+        """Marks before start() aren't recorded, and imports aren't hooked."""
+        profiler = startup_profiler.StartupProfiler()
+        original = builtins.__import__
+        profiler.mark('phase')
+
+        assert profiler.phases == []
+        assert builtins.__import__ is original
+
+    def test_phases_and_import_tree(self, tmp_path):
+        """Phases are recorded in order, and fresh imports nest under the module that made them."""
+        (tmp_path / 'sp_outer.py').write_text('import sp_inner\n')
+        (tmp_path / 'sp_inner.py').write_text('import time\ntime.sleep(0.01)\n')
+        sys.path.insert(0, str(tmp_path))
+        original = builtins.__import__
+        profiler = startup_profiler.StartupProfiler()
+        try:
+            profiler.start()
+            profiler.mark('first')
+            import sp_outer  # noqa: F401
+            profiler.mark('second')
+            path = profiler.finish(tmp_path / 'profile.txt')
+
+        finally:
+            builtins.__import__ = original
+            sys.path.remove(str(tmp_path))
+            sys.modules.pop('sp_outer', None)
+            sys.modules.pop('sp_inner', None)
+
+        assert builtins.__import__ is original
+        assert [phase for phase, _ in profiler.phases] == ['first', 'second']
+        outer = profiler.root.children[-1]
+        assert outer.name == 'sp_outer'
+        assert [child.name for child in outer.children] == ['sp_inner']
+        assert outer.children[0].cumulative >= 0.01
+        assert outer.self_time < outer.cumulative
+
+        text = path.read_text()
+        assert '  sp_inner' in text
+        assert text.index('sp_inner') < text.index('sp_outer')
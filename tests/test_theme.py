@@ -0,0 +1,120 @@
+# flake8: noqa
+# mypy: ignore-errors
+"""Test applying the theme to registered widgets."""
+
+import os
+import pytest
+import tkinter as tk
+from types import SimpleNamespace
+from unittest.mock import patch
+
+with patch.dict(os.environ, {"EDMC_NO_UI": "1"}):  # Don't go looking for a display
+    import theme as theme_module
+
+CURRENT = {
+    "foreground": "#ff8000", "background": "#000000", "highlight": "#ffffff", "activeforeground": "#ffffff",
+    "activebackground": "#ff8000", "disabledforeground": "#808080", "font": "TkDefaultFont",
+}
+
+
+class FakeLabel(tk.Label):
+    """A tk.Label as far as the theme can tell, without needing Tk."""
+
+    def __init__(self, refuse=()):
+        self._w = f".fake{id(self)}"
+        self.options = dict.fromkeys(
+            ("foreground", "background", "font", "activeforeground", "activebackground", "disabledforeground"), ""
+        )
+        self.refuse = set(refuse)
+        self.exists = True
+        self.keys_calls = 0
+        self.configure_calls = []
+        self.bindings = {}
+
+    def keys(self):
+        self.keys_calls += 1
+        return list(self.options)
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+    def configure(self, **kw):
+        self.configure_calls.append(kw)
+        if not self.exists or self.refuse & kw.keys():
+            raise tk.TclError("nope")
+
+        self.options.update(kw)
+
+    def bind(self, sequence, func, add=None):
+        self.bindings[sequence] = func
+
+    def winfo_exists(self):
+        return self.exists
+
+    def winfo_children(self):
+        return []
+
+
+class FakeButton(FakeLabel):
+    pass
+
+
+@pytest.fixture
+def theme():
+    """A theme with its defaults and current colours already worked out."""
+    instance = theme_module._Theme()
+    instance.defaults = {"fg": "", "bg": "", "font": ""}
+    instance.current = dict(CURRENT)
+    return instance
+
+
+class TestUpdateWidget:
+
+    def test_keys_looked_up_once_per_class(self, theme):
+        """Option names are asked of Tk for the first widget of each class only."""
+        labels = [FakeLabel() for _ in range(3)]
+        buttons = [FakeButton() for _ in range(2)]
+        for widget in labels + buttons:
+            theme.register(widget)
+            theme._update_widget(widget)
+
+        for widget in labels + buttons:
+            theme._update_widget(widget)
+
+        assert [w.keys_calls for w in labels + buttons] == [1, 0, 0, 1, 0]
+        assert set(theme.widget_keys) == {FakeLabel, FakeButton}
+        assert all(len(w.configure_calls) == 2 for w in labels + buttons)
+        assert labels[2]["foreground"] == CURRENT["foreground"]
+
+    def test_destroyed_widgets_forgotten(self, theme):
+        """A registered widget is dropped by its <Destroy> binding, or if configuring it finds it gone."""
+        destroyed, vanished, kept = FakeLabel(), FakeLabel(), FakeLabel()
+        for widget in (destroyed, vanished, kept):
+            theme.register(widget)
+
+        destroyed.bindings["<Destroy>"](SimpleNamespace(widget=destroyed))
+        assert destroyed not in theme.widgets
+
+        vanished.exists = False
+        with patch.object(theme_module, "logger") as logger:
+            for widget in list(theme.widgets):
+                theme._update_widget(widget)
+
+        assert list(theme.widgets) == [kept]
+        assert len(vanished.configure_calls) == 1
+        logger.exception.assert_not_called()
+
+    def test_refused_option_set_separately(self, theme):
+        """If Tk refuses one option, the others are still set, and the failure is reported."""
+        widget = FakeLabel(refuse=("activebackground",))
+        theme.register(widget)
+        with patch.object(theme_module, "logger") as logger:
+            theme._update_widget(widget)
+
+        assert widget["foreground"] == CURRENT["foreground"]
+        assert widget["background"] == CURRENT["background"]
+        assert widget["font"] == CURRENT["font"]
+        assert widget["activebackground"] == ""
+        assert len(widget.configure_calls) == 1 + 6
+        logger.exception.assert_called_once()
+        assert widget in theme.widgets
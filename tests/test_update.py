@@ -95,6 +95,79 @@ class TestUpdateLogic:
             assert file_path.read_text() == "new_content"
 
 
+class TestConditionalUpdates:
+    @patch("requests.get")
+    def test_fetch_remote_file_not_modified(self, mock_get):
+        """Verify stored validators are sent, and a 304 is reported as not modified."""
+        mock_get.return_value.status_code = 304
+
+        result = update.fetch_remote_file("http://fake.url", {"etag": '"abc"', "last_modified": "yesterday"})
+
+        assert result is update.NOT_MODIFIED
+        headers = mock_get.call_args.kwargs["headers"]
+        assert headers == {"If-None-Match": '"abc"', "If-Modified-Since": "yesterday"}
+
+    @patch("requests.get")
+    def test_fetch_remote_file_updates_validators(self, mock_get):
+        """Verify new validators are captured from a full response."""
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.text = "content"
+        mock_get.return_value.headers = {"ETag": '"new"'}
+        validators = {"etag": '"old"', "last_modified": "yesterday"}
+
+        content, _ = update.fetch_remote_file("http://fake.url", validators)
+
+        assert content == "content"
+        assert validators == {"etag": '"new"'}
+
+    def test_update_single_file_stores_validators(self, mock_directory):
+        """Verify validators are stored alongside the file and reused next time."""
+        filename = "commodity.csv"
+        (mock_directory / filename).write_text("old_content")
+
+        def fake_fetch(url, validators):
+            validators["etag"] = '"v1"'
+            return "new_content", hashlib.sha256(b"new_content").hexdigest()
+
+        with patch("update.fetch_remote_file", side_effect=fake_fetch):
+            assert update.update_single_file(mock_directory, filename, "http://url") is True
+
+        assert update.read_validators(mock_directory / filename) == {"etag": '"v1"'}
+
+        with patch("update.fetch_remote_file", return_value=update.NOT_MODIFIED) as mock_fetch:
+            assert update.update_single_file(mock_directory, filename, "http://url") is False
+            assert mock_fetch.call_args.args[1] == {"etag": '"v1"'}
+
+        assert (mock_directory / filename).read_text() == "new_content"
+
+    def test_failed_write_keeps_old_validators(self, mock_directory):
+        """Verify validators aren't stored for a file that couldn't be written, so it's fetched in full again."""
+        filename = "commodity.csv"
+        update.write_validators(mock_directory / filename, {"etag": '"v1"'})
+        (mock_directory / filename).write_text("old_content")
+
+        def fake_fetch(url, validators):
+            validators["etag"] = '"v2"'
+            return "new_content", hashlib.sha256(b"new_content").hexdigest()
+
+        with patch("update.fetch_remote_file", side_effect=fake_fetch), \
+                patch.object(pathlib.Path, "replace", side_effect=OSError("disk full")), \
+                pytest.raises(OSError):
+            update.update_single_file(mock_directory, filename, "http://url")
+
+        assert update.read_validators(mock_directory / filename) == {"etag": '"v1"'}
+        assert (mock_directory / filename).read_text() == "old_content"
+
+    def test_refresh_in_background_reports_changes(self):
+        """Verify the background refresh passes the changed files to the callback."""
+        changed = []
+        with patch("update.check_for_datafile_updates", return_value=["ships.json"]), \
+                patch("update.check_for_fdev_updates", return_value=[]):
+            update.refresh_datafiles_in_background(changed.extend).join(5)
+
+        assert changed == ["ships.json"]
+
+
 class TestVersionChecking:
     @patch("requests.get")
     def test_check_appcast_newer_version(self, mock_get):
@@ -15,6 +15,7 @@ import sys
 import tkinter as tk
 from tkinter import font as tk_font
 from tkinter import ttk
+from typing import Any
 from collections.abc import Callable
 from l10n import translations as tr
 from config import config
@@ -139,6 +140,8 @@ class _Theme:
         self.active: int | None = None  # Starts out with no theme
         self.minwidth: int | None = None
         self.widgets: dict[tk.Widget | tk.BitmapImage, set] = {}
+        # Configuration option names by widget class.  Asking Tk means fetching all of a widget's options.
+        self.widget_keys: dict[type, frozenset[str]] = {}
         self.widgets_pair: list = []
         self.defaults: dict = {}
         self.current: dict = {}
@@ -168,6 +171,7 @@ class _Theme:
             }
 
         if widget not in self.widgets:
+            keys = self._keys(widget)
             # No general way to tell whether the user has overridden, so compare against widget-type specific defaults
             attribs = set()
             if isinstance(widget, tk.BitmapImage):
@@ -180,11 +184,11 @@ class _Theme:
                     attribs.add('fg')
                 if widget['background'] not in ['', self.defaults['entrybg']]:
                     attribs.add('bg')
-                if 'font' in widget.keys() and str(widget['font']) not in ['', self.defaults['entryfont']]:
+                if 'font' in keys and str(widget['font']) not in ['', self.defaults['entryfont']]:
                     attribs.add('font')
             elif isinstance(widget, (tk.Canvas, tk.Frame, ttk.Frame)):
                 if (
-                    ('background' in widget.keys() or isinstance(widget, tk.Canvas))
+                    ('background' in keys or isinstance(widget, tk.Canvas))
                     and widget['background'] not in ['', self.defaults['frame']]
                 ):
                     attribs.add('bg')
@@ -198,18 +202,41 @@ class _Theme:
                 if widget['font'] not in ['', self.defaults['menufont']]:
                     attribs.add('font')
             else:      # tk.Button, tk.Label
-                if 'foreground' in widget.keys() and widget['foreground'] not in ['', self.defaults['fg']]:
+                if 'foreground' in keys and widget['foreground'] not in ['', self.defaults['fg']]:
                     attribs.add('fg')
-                if 'background' in widget.keys() and widget['background'] not in ['', self.defaults['bg']]:
+                if 'background' in keys and widget['background'] not in ['', self.defaults['bg']]:
                     attribs.add('bg')
-                if 'font' in widget.keys() and widget['font'] not in ['', self.defaults['font']]:
+                if 'font' in keys and widget['font'] not in ['', self.defaults['font']]:
                     attribs.add('font')
             self.widgets[widget] = attribs
+            if isinstance(widget, tk.Widget):
+                widget.bind('<Destroy>', self._forget, add='+')
 
         if isinstance(widget, (tk.Frame, ttk.Frame)):
             for child in widget.winfo_children():
                 self.register(child)  # type: ignore
 
+    def _keys(self, widget: tk.Widget | tk.BitmapImage) -> frozenset[str]:
+        """
+        Get the names of a widget's configuration options.
+
+        :param widget: The widget.
+        :return: The option names, as looked up once per class.
+        """
+        if isinstance(widget, tk.BitmapImage):
+            return frozenset()  # Not a widget, and always themed the same way
+
+        w_type = type(widget)
+        if (keys := self.widget_keys.get(w_type)) is None:
+            keys = self.widget_keys[w_type] = frozenset(widget.keys())
+
+        return keys
+
+    def _forget(self, event: tk.Event) -> None:
+        """Stop tracking a widget once it's destroyed."""
+        # Bindings on a toplevel see its descendants' events too, which is fine, as they're going as well
+        self.widgets.pop(event.widget, None)  # type: ignore
+
     def register_alternate(self, pair: tuple, gridopts: dict) -> None:
         self.widgets_pair.append((pair, gridopts))
 
@@ -355,64 +382,91 @@ class _Theme:
             raise ValueError(assert_str)
 
         attribs: set = self.widgets.get(widget, set())
+        current = self.current
+        opts: dict[str, Any] = {}
 
         try:
             if isinstance(widget, tk.BitmapImage):
                 # not a widget
                 if 'fg' not in attribs:
-                    widget['foreground'] = self.current['foreground']
+                    opts['foreground'] = current['foreground']
 
                 if 'bg' not in attribs:
-                    widget['background'] = self.current['background']
+                    opts['background'] = current['background']
 
-            elif 'cursor' in widget.keys() and str(widget['cursor']) not in ['', 'arrow']:
+            elif 'cursor' in (keys := self._keys(widget)) and str(widget['cursor']) not in ['', 'arrow']:
                 # Hack - highlight widgets like HyperlinkLabel with a non-default cursor
                 if 'fg' not in attribs:
-                    widget['foreground'] = self.current['highlight']
-                    if 'insertbackground' in widget.keys():  # tk.Entry
-                        widget['insertbackground'] = self.current['foreground']
+                    opts['foreground'] = current['highlight']
+                    if 'insertbackground' in keys:  # tk.Entry
+                        opts['insertbackground'] = current['foreground']
 
                 if 'bg' not in attribs:
-                    widget['background'] = self.current['background']
-                    if 'highlightbackground' in widget.keys():  # tk.Entry
-                        widget['highlightbackground'] = self.current['background']
+                    opts['background'] = current['background']
+                    if 'highlightbackground' in keys:  # tk.Entry
+                        opts['highlightbackground'] = current['background']
 
                 if 'font' not in attribs:
-                    widget['font'] = self.current['font']
+                    opts['font'] = current['font']
 
-            elif 'activeforeground' in widget.keys():
+            elif 'activeforeground' in keys:
                 # e.g. tk.Button, tk.Label, tk.Menu
                 if 'fg' not in attribs:
-                    widget['foreground'] = self.current['foreground']
-                    widget['activeforeground'] = self.current['activeforeground']
-                    widget['disabledforeground'] = self.current['disabledforeground']
+                    opts['foreground'] = current['foreground']
+                    opts['activeforeground'] = current['activeforeground']
+                    opts['disabledforeground'] = current['disabledforeground']
 
                 if 'bg' not in attribs:
-                    widget['background'] = self.current['background']
-                    widget['activebackground'] = self.current['activebackground']
+                    opts['background'] = current['background']
+                    opts['activebackground'] = current['activebackground']
 
                 if 'font' not in attribs:
-                    widget['font'] = self.current['font']
+                    opts['font'] = current['font']
 
-            elif 'foreground' in widget.keys():
+            elif 'foreground' in keys:
                 # e.g. ttk.Label
                 if 'fg' not in attribs:
-                    widget['foreground'] = self.current['foreground']
+                    opts['foreground'] = current['foreground']
 
                 if 'bg' not in attribs:
-                    widget['background'] = self.current['background']
+                    opts['background'] = current['background']
 
                 if 'font' not in attribs:
-                    widget['font'] = self.current['font']
+                    opts['font'] = current['font']
 
-            elif 'background' in widget.keys() or isinstance(widget, tk.Canvas):
+            elif 'background' in keys or isinstance(widget, tk.Canvas):
                 # e.g. Frame, Canvas
                 if 'bg' not in attribs:
-                    widget['background'] = self.current['background']
-                    widget['highlightbackground'] = self.current['disabledforeground']
+                    opts['background'] = current['background']
+                    opts['highlightbackground'] = current['disabledforeground']
+
+            if opts:
+                try:
+                    # All at once, as each option set separately is a round trip to Tk
+                    widget.configure(**opts)
+
+                except tk.TclError:
+                    if isinstance(widget, tk.Widget) and not widget.winfo_exists():
+                        raise
+
+                    # Tk sets none of them if it refuses one, so set the rest one at a time before reporting it
+                    error: tk.TclError | None = None
+                    for option, value in opts.items():
+                        try:
+                            widget.configure(**{option: value})
+
+                        except tk.TclError as e:
+                            error = error or e
+
+                    if error:
+                        raise error
 
         except Exception:
-            logger.exception(f'Plugin widget issue ? {widget=}')
+            if isinstance(widget, tk.Widget) and not widget.winfo_exists():
+                self.widgets.pop(widget, None)  # Destroyed without us seeing it
+
+            else:
+                logger.exception(f'Plugin widget issue ? {widget=}')
 
     # Apply configured theme
 
@@ -420,12 +474,9 @@ class _Theme:
         theme = config.get_int('theme')
         self._colors(root, theme)
 
-        # Apply colors
-        for widget in set(self.widgets):
-            if isinstance(widget, tk.Widget) and not widget.winfo_exists():
-                self.widgets.pop(widget)  # has been destroyed
-            else:
-                self._update_widget(widget)
+        # Apply colors.  Destroyed widgets have already been dropped, by their <Destroy> binding.
+        for widget in list(self.widgets):
+            self._update_widget(widget)
 
         # Switch menus
         for pair, gridopts in self.widgets_pair:
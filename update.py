@@ -7,6 +7,7 @@ See LICENSE file.
 """
 from __future__ import annotations
 
+import json
 import pathlib
 import hashlib
 import shutil
@@ -19,6 +20,7 @@ from dataclasses import dataclass
 from tkinter import messagebox
 from traceback import print_exc
 from typing import TYPE_CHECKING, cast, Any
+from collections.abc import Callable
 from xml.etree import ElementTree
 import requests
 import semantic_version
@@ -35,6 +37,11 @@ HTTP_TIMEOUT = (5, 20)          # (connect, read)
 HTTP_RETRIES = 3
 RETRY_BACKOFF = 1.5             # seconds multiplier
 MAX_WORKERS = 8
+# Suffix of the file, alongside each data file, holding the ETag and
+# Last-Modified headers it was downloaded with.
+VALIDATORS_SUFFIX = '.validators.json'
+# Returned by fetch_remote_file() when a conditional request says our copy is current
+NOT_MODIFIED: tuple[str, str] = ('', '')
 
 
 def read_normalized_file(path: pathlib.Path) -> tuple[str, str, str] | None:
@@ -65,19 +72,68 @@ def copy_bundle_file(filename: str, dest_dir: pathlib.Path) -> tuple[str, str] |
         return None
 
 
-def fetch_remote_file(url: str) -> tuple[str, str] | None:
+def read_validators(file_path: pathlib.Path) -> dict[str, str]:
+    """
+    Read the HTTP cache validators stored alongside a data file.
+
+    :param file_path: The data file.
+    :return: Dict with any of 'etag' and 'last_modified', empty if there are none.
+    """
+    try:
+        validators = json.loads(file_path.with_name(file_path.name + VALIDATORS_SUFFIX).read_text(encoding='utf-8'))
+
+    except (OSError, ValueError):
+        return {}
+
+    return {k: v for k, v in validators.items() if k in ('etag', 'last_modified') and isinstance(v, str)}
+
+
+def write_validators(file_path: pathlib.Path, validators: dict[str, str]) -> None:
+    """
+    Store the HTTP cache validators for a data file alongside it.
+
+    :param file_path: The data file.
+    :param validators: Dict with any of 'etag' and 'last_modified'.
+    """
+    try:
+        file_path.with_name(file_path.name + VALIDATORS_SUFFIX).write_text(json.dumps(validators), encoding='utf-8')
+
+    except OSError as exc:
+        logger.debug(f'Unable to store validators for {file_path.name}: {exc}')
+
+
+def fetch_remote_file(url: str, validators: dict[str, str] | None = None) -> tuple[str, str] | None:
     """
     Fetch a remote file with retries.
 
-    Returns (normalized_text, hash) or None on failure.
+    If `validators` are given the request is made conditional on them, and
+    they're updated in place from the response.
+
+    Returns (normalized_text, hash), NOT_MODIFIED, or None on failure.
     """
     delay = 1.0
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
 
     for attempt in range(1, HTTP_RETRIES + 1):
         try:
-            response = requests.get(url, timeout=HTTP_TIMEOUT)
+            response = requests.get(url, timeout=HTTP_TIMEOUT, headers=headers)
+            if headers and response.status_code == 304:
+                return NOT_MODIFIED
+
             response.raise_for_status()
 
+            if validators is not None:
+                validators.clear()
+                for header, key in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+                    if isinstance(value := response.headers.get(header), str):
+                        validators[key] = value
+
             text = response.text.replace('\r\n', '\n').strip()
             return text, hashlib.sha256(text.encode()).hexdigest()
 
@@ -96,65 +152,97 @@ def update_single_file(
     filename: str,
     url: str,
     silent: bool = False,
-) -> None:
-    """Update a single bundle file."""
+) -> bool:
+    """
+    Update a single bundle file.
+
+    :return: True if the file was changed.
+    """
     file_path = directory / filename
 
     local = read_normalized_file(file_path)
+    validators = read_validators(file_path)
     if local is None:
         local = copy_bundle_file(filename, directory)  # type: ignore
+        # Whatever we had the validators for has gone
+        validators = {}
 
     if local:
         local_text, local_hash, newline = local
     else:
         local_text, local_hash, newline = '', '', '\n'  # noqa: F841
 
-    remote = fetch_remote_file(url)
+    stored_validators = dict(validators)
+    remote = fetch_remote_file(url, validators)
+    if remote is NOT_MODIFIED:
+        if not silent:
+            logger.info(f'{filename} already up to date (not modified).')
+        return False
+
     if not remote:
         if not silent:
             logger.error(f'Failed to download {filename}! Unable to continue.')
-        return
+        return False
 
     remote_text, remote_hash = remote
-
     if local_hash == remote_hash:
         if not silent:
             logger.info(f'{filename} already up to date.')
-        return
+        if validators != stored_validators:
+            write_validators(file_path, validators)
+        return False
 
     if not silent:
         logger.info(f'Updating file {filename}...')
 
     # Restore original newline style
     output = remote_text.replace('\n', newline)
-    file_path.write_text(output, encoding='utf-8', newline='')
+    tmp_path = file_path.with_name(file_path.name + '.tmp')
+    tmp_path.write_text(output, encoding='utf-8', newline='')
+    tmp_path.replace(file_path)
+    # Only once the file is what they describe, else a failed write would be kept by the next 304
+    if validators != stored_validators:
+        write_validators(file_path, validators)
+    return True
 
 
 def update_files(
     directory: pathlib.Path,
     files_urls: dict[str, str],
     silent: bool = False,
-) -> None:
-    """Start threads to update bundle files."""
+) -> list[str]:
+    """
+    Start threads to update bundle files.
+
+    :return: The names of the files which were changed.
+    """
     directory.mkdir(parents=True, exist_ok=True)
 
     max_workers = min(MAX_WORKERS, len(files_urls))
+    changed = []
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(update_single_file, directory, filename, url, silent)
+        futures = {
+            executor.submit(update_single_file, directory, filename, url, silent): filename
             for filename, url in files_urls.items()
-        ]
+        }
 
         for future in as_completed(futures):
             try:
-                future.result()
+                if future.result():
+                    changed.append(futures[future])
             except Exception:
                 logger.exception("Unexpected error while updating files")
 
+    return changed
+
+
+def check_for_fdev_updates(silent: bool = False, local: bool = False) -> list[str]:
+    """
+    Check for and download FDEV ID file updates.
 
-def check_for_fdev_updates(silent: bool = False, local: bool = False) -> None:
-    """Check for and download FDEV ID file updates."""
+    :return: The names of the files which were changed.
+    """
     base_path = config.respath_path if local else config.app_dir_path
     fdevid_dir = pathlib.Path(base_path, 'FDevIDs')
     fdevid_dir.mkdir(parents=True, exist_ok=True)
@@ -165,11 +253,15 @@ def check_for_fdev_updates(silent: bool = False, local: bool = False) -> None:
     }
     if not silent:
         logger.info(f"Checking for {'local ' if local else ''}FDEVID file updates...")
-    update_files(fdevid_dir, files_urls, silent)
+    return update_files(fdevid_dir, files_urls, silent)
+
 
+def check_for_datafile_updates(silent: bool = False, local: bool = False) -> list[str]:
+    """
+    Check for and download data file updates.
 
-def check_for_datafile_updates(silent: bool = False, local: bool = False) -> None:
-    """Check for and download data file updates."""
+    :return: The names of the files which were changed.
+    """
     base_path = config.respath_path if local else config.app_dir_path
     files_urls = {
         'modules.json': 'https://raw.githubusercontent.com/EDCD/EDMarketConnector/refs/heads/releases/modules.json',
@@ -179,7 +271,35 @@ def check_for_datafile_updates(silent: bool = False, local: bool = False) -> Non
     }
     if not silent:
         logger.info(f"Checking for {'local ' if local else ''}datafile file updates...")
-    update_files(pathlib.Path(base_path), files_urls, silent)
+    return update_files(pathlib.Path(base_path), files_urls, silent)
+
+
+def refresh_datafiles_in_background(
+    on_complete: Callable[[list[str]], None] | None = None, silent: bool = False
+) -> threading.Thread:
+    """
+    Check for data file and FDEV ID file updates on a background thread.
+
+    Until they've been checked, and on any failure, the existing copies of the
+    files continue to be used.
+    :param on_complete: Called, on the background thread, with the names of the files which were changed.
+    :param silent: Suppress logging of the checks.
+    :return: The thread doing the checks.
+    """
+    def refresh() -> None:
+        try:
+            changed = check_for_datafile_updates(silent) + check_for_fdev_updates(silent)
+
+        except Exception:
+            logger.exception('Failed checking for data file updates')
+            return
+
+        if on_complete is not None:
+            on_complete(changed)
+
+    thread = threading.Thread(target=refresh, name='datafile refresh', daemon=True)
+    thread.start()
+    return thread
 
 
 @dataclass(slots=True)
@@ -221,6 +341,8 @@ class Updater:
         self.provider: str = provider
         self.thread: threading.Thread | None = None
         self.updater: Any | None = None  # ensure attribute exists
+        # Names of data files changed by the last background refresh
+        self.updated_datafiles: list[str] = []
 
         if not self.use_internal() and sys.platform == 'win32':
             self._init_winsparkle()
@@ -240,8 +362,23 @@ class Updater:
                 self.updater.win_sparkle_check_update_with_ui()
 
         # Always trigger FDEV checks here too
-        check_for_fdev_updates()
-        check_for_datafile_updates()
+        self.refresh_datafiles()
+
+    def refresh_datafiles(self) -> None:
+        """
+        Check for data file updates in the background.
+
+        If any files are changed then `<<DatafilesUpdated>>` is generated on
+        the root window, with their names in `updated_datafiles`.
+        """
+        refresh_datafiles_in_background(self._datafiles_refreshed)
+
+    def _datafiles_refreshed(self, changed: list[str]) -> None:
+        if not changed or config.shutting_down or not self.root:
+            return
+
+        self.updated_datafiles = changed
+        self.root.event_generate('<<DatafilesUpdated>>', when='tail')
 
     def shutdown_request(self) -> None:
         """Receive (Win)Sparkle shutdown request and send it to parent."""
@@ -307,8 +444,7 @@ class Updater:
         elif sys.platform == 'win32' and self.updater:
             self.updater.win_sparkle_check_update_with_ui()
 
-        check_for_fdev_updates()
-        check_for_datafile_updates()
+        self.refresh_datafiles()
 
     def check_appcast(self) -> EDMCVersion | None:
         """
@@ -0,0 +1,161 @@
+"""
+projection.py - Filtering the fields of nested data in a single pass.
+
+Copyright (c) EDCD, All Rights Reserved
+Licensed under the GNU General Public License v2 or later.
+See LICENSE file.
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+__all__ = ['Projection']
+
+_ALL: Any = object()  # Trie leaf: the whole of this value
+_KEEP: Any = object()  # Action: keep this value, only applying `drop_key` below it
+_ACTIONS_MAX = 4096  # Distinct keys per level to remember the decision for
+
+
+class _ContainerTypes(dict):
+    """
+    Whether values of each type are looked inside: any Mapping (e.g. CAPIData) or list.
+
+    Worked out once per type, as a dict lookup is much cheaper than isinstance() against an ABC.
+    """
+
+    def __missing__(self, cls: type) -> bool:
+        is_container = self[cls] = issubclass(cls, (Mapping, list))
+        return is_container
+
+
+_CONTAINERS = _ContainerTypes()
+
+
+def _trie(paths: Iterable[str]) -> dict[str, Any]:
+    """Turn dotted paths into a nested dict, with `_ALL` where a path ends."""
+    root: dict[str, Any] = {}
+    for path in paths:
+        node = root
+        *parents, last = path.split('.')
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is _ALL:
+                break
+
+            node = child
+
+        else:
+            node[last] = _ALL
+
+    return root
+
+
+class _Level:
+    """The allow and deny specs at one depth, and what they decided for each key seen there."""
+
+    __slots__ = ('allow', 'deny', 'drop_key', 'actions')
+
+    def __init__(self, allow: Any, deny: dict[str, Any], drop_key: re.Pattern | None) -> None:
+        self.allow = allow
+        self.deny = deny
+        self.drop_key = drop_key
+        self.actions: dict[str, Any] = {}
+
+    def decide(self, key: str) -> Any:
+        """
+        Work out what to do with a key at this level.
+
+        :param key: The key.
+        :return: `False` to drop it, `_KEEP`, or the `_Level` for its value.
+        """
+        action: Any
+        if self.drop_key is not None and self.drop_key.search(key):
+            action = False
+
+        else:
+            allow = _ALL if self.allow is _ALL else self.allow.get(key, self.allow.get('*'))
+            deny = self.deny.get(key, self.deny.get('*'))
+            if allow is None or deny is _ALL:
+                action = False
+
+            elif allow is _ALL and not deny:
+                action = _KEEP
+
+            else:
+                action = _Level(allow, deny or {}, self.drop_key)
+
+        if len(self.actions) < _ACTIONS_MAX:
+            self.actions[key] = action
+
+        return action
+
+
+class Projection:
+    """
+    A precompiled filter for the keys of a JSON-like structure.
+
+    Paths are dotted key names, where `*` matches any key.  Lists are
+    transparent, so `Factions.HomeSystem` means that key in every dict in the
+    `Factions` list.
+
+    The filtered copy is built in one traversal.  What to do with each key is
+    decided once, the first time it's seen at each level, and then looked up.
+    Dicts and lists are only copied down as far as anything might be removed,
+    below that the values are shared with the original.
+    """
+
+    def __init__(
+        self,
+        allow: Iterable[str] | None = None,
+        deny: Iterable[str] = (),
+        drop_key: str | re.Pattern | None = None,
+    ) -> None:
+        """
+        Compile a projection.
+
+        :param allow: Paths to keep, dropping everything else.  `None` keeps everything not denied.
+        :param deny: Paths to drop.
+        :param drop_key: Regex; any key, at any depth, it matches is dropped.
+        """
+        pattern = re.compile(drop_key) if isinstance(drop_key, str) else drop_key
+        self.strip = pattern is not None
+        self.root = _Level(_ALL if allow is None else _trie(allow), _trie(deny), pattern)
+        # Below any kept key only `drop_key` still applies
+        self.kept = _Level(_ALL, {}, pattern)
+
+    def __call__(self, data: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Filter data.
+
+        :param data: The data to filter.
+        :return: A new dict, with only the wanted keys.
+        """
+        return self._project(data, self.root)
+
+    def _project(self, value: Any, level: _Level) -> Any:
+        if isinstance(value, list):
+            return [self._project(item, level) if _CONTAINERS[type(item)] else item for item in value]
+
+        if not _CONTAINERS[type(value)]:
+            return value
+
+        actions = level.actions
+        project = self._project
+        keep = _KEEP
+        kept = self.kept if self.strip else None
+        containers = _CONTAINERS
+        out = {}
+        for k, v in value.items():
+            action = actions.get(k)
+            if action is None:
+                action = level.decide(k)
+
+            if action is keep:
+                out[k] = project(v, kept) if kept and containers[type(v)] else v
+
+            elif action:
+                out[k] = project(v, action)
+
+        return out